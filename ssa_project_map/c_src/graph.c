@@ -1,13 +1,69 @@
+#define _POSIX_C_SOURCE 200809L
 #include "graph.h"
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+
+/* Header of the binary CSR format, 32 bytes, little-endian */
+typedef struct {
+    char     magic[4];
+    uint32_t version;
+    uint64_t num_nodes;
+    uint64_t num_edges;
+    uint32_t flags;
+    uint32_t reserved;
+} GraphBinHeader;
+
+static Graph* load_graph_bin(const char *filename) {
+    int fd = open(filename, O_RDONLY);
+    if (fd < 0) { perror("open"); return NULL; }
+    struct stat st;
+    if (fstat(fd, &st) != 0 || (size_t)st.st_size < sizeof(GraphBinHeader)) {
+        close(fd);
+        return NULL;
+    }
+    size_t size = (size_t)st.st_size;
+    void *base = mmap(NULL, size, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (base == MAP_FAILED) { perror("mmap"); return NULL; }
+
+    const GraphBinHeader *h = base;
+    size_t n = h->num_nodes, nnz = h->num_edges;
+    size_t needed = sizeof(*h) + 8 * (n + 1) + 8 * nnz;
+    if (h->version != GRAPH_BIN_VERSION || needed > size) {
+        fprintf(stderr, "Error: unsupported or truncated binary graph %s\n", filename);
+        munmap(base, size);
+        return NULL;
+    }
+
+    const char *p = (const char *)base + sizeof(*h);
+    Graph *g = calloc(1, sizeof(*g));
+    g->num_nodes = (int)n;
+    g->row_ptr = (const int64_t *)p;
+    g->col_idx = (const int32_t *)(p + 8 * (n + 1));
+    g->weights = (const float *)(p + 8 * (n + 1) + 4 * nnz);
+    g->map_base = base;
+    g->map_size = size;
+    return g;
+}
 
 Graph* load_graph(const char *filename) {
     FILE *f = fopen(filename, "r");
     if (!f) { perror("fopen"); return NULL; }
+    char magic[4];
+    if (fread(magic, 1, 4, f) == 4 && memcmp(magic, GRAPH_BIN_MAGIC, 4) == 0) {
+        fclose(f);
+        return load_graph_bin(filename);
+    }
+    rewind(f);
     int n;
     if (fscanf(f, "%d", &n) != 1) { fclose(f); return NULL; }
-    Graph *g = malloc(sizeof(*g));
+    Graph *g = calloc(1, sizeof(*g));
     g->num_nodes = n;
     g->adj_matrix = malloc(n * sizeof(double*));
     for (int i = 0; i < n; i++) {
@@ -28,9 +84,66 @@ Graph* load_graph(const char *filename) {
     return g;
 }
 
+double graph_weight(const Graph *g, int u, int v) {
+    if (g->adj_matrix)
+        return g->adj_matrix[u][v];
+    // Binary search the sorted column indices of row u
+    int64_t lo = g->row_ptr[u], hi = g->row_ptr[u + 1];
+    while (lo < hi) {
+        int64_t mid = lo + (hi - lo) / 2;
+        if (g->col_idx[mid] < v) lo = mid + 1;
+        else hi = mid;
+    }
+    if (lo < g->row_ptr[u + 1] && g->col_idx[lo] == v)
+        return g->weights[lo];
+    return 0.0;
+}
+
+int graph_shortest_paths(Graph *g) {
+    int n = g->num_nodes;
+    if (n > GRAPH_SP_MAX_NODES) return -1;
+    double *d = malloc((size_t)n * n * sizeof(double));
+    for (int i = 0; i < n; i++)
+        for (int j = 0; j < n; j++) {
+            double w = graph_weight(g, i, j);
+            d[(size_t)i * n + j] = (i == j) ? 0.0 : (w > 0 ? w : INFINITY);
+        }
+    for (int k = 0; k < n; k++) {
+        const double *dk = d + (size_t)k * n;
+        for (int i = 0; i < n; i++) {
+            double dik = d[(size_t)i * n + k];
+            if (isinf(dik)) continue;
+            double *di = d + (size_t)i * n;
+            for (int j = 0; j < n; j++)
+                if (dik + dk[j] < di[j]) di[j] = dik + dk[j];
+        }
+    }
+    /* Replace unreachable pairs by a penalty above any feasible route */
+    double max_finite = 0.0;
+    for (size_t i = 0; i < (size_t)n * n; i++)
+        if (!isinf(d[i]) && d[i] > max_finite) max_finite = d[i];
+    double penalty = (max_finite + 1.0) * n;
+    for (size_t i = 0; i < (size_t)n * n; i++)
+        if (isinf(d[i])) d[i] = penalty;
+    free(g->dist);
+    g->dist = d;
+    return 0;
+}
+
+double graph_cost(const Graph *g, int u, int v) {
+    if (g->dist)
+        return g->dist[(size_t)u * g->num_nodes + v];
+    return graph_weight(g, u, v);
+}
+
 void free_graph(Graph *g) {
-    for (int i = 0; i < g->num_nodes; i++)
-        free(g->adj_matrix[i]);
-    free(g->adj_matrix);
+    free(g->dist);
+    if (g->map_base) {
+        munmap(g->map_base, g->map_size);
+    } else {
+        for (int i = 0; i < g->num_nodes; i++)
+            free(g->adj_matrix[i]);
+        free(g->adj_matrix);
+    }
     free(g);
 }
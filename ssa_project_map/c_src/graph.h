@@ -1,13 +1,41 @@
 #ifndef GRAPH_H
 #define GRAPH_H
 
+#include <stddef.h>
+#include <stdint.h>
+
+/* Binary CSR graph file (see python/graph_io.py for the layout) */
+#define GRAPH_BIN_MAGIC   "SSAG"
+#define GRAPH_BIN_VERSION 1
+
 typedef struct {
     int  num_nodes;
+    /* Dense n×n weights, NULL when the graph was mapped from a binary file */
     double **adj_matrix;
+    /* CSR view into a memory-mapped binary file (NULL for CSV graphs) */
+    const int64_t *row_ptr;
+    const int32_t *col_idx;
+    const float   *weights;
+    void   *map_base;
+    size_t  map_size;
+    /* All-pairs shortest-path costs (n*n, row-major), NULL until computed */
+    double *dist;
 } Graph;
 
-/* Load a CSV adjacency matrix of size n×n */
+/* Largest graph for which graph_shortest_paths() runs (O(n^3) time, O(n^2) memory) */
+#define GRAPH_SP_MAX_NODES 2000
+
+/* Load a graph: a binary CSR file is mmap'ed, anything else is parsed as an
+ * n×n CSV adjacency matrix */
 Graph* load_graph(const char *filename);
+/* Weight of edge u->v, 0.0 if there is no edge */
+double graph_weight(const Graph *g, int u, int v);
+/* Compute all-pairs shortest-path costs with Floyd-Warshall. Unreachable
+ * pairs get a cost larger than any route of reachable hops. Returns 0 on
+ * success, -1 if the graph is too large. */
+int    graph_shortest_paths(Graph *g);
+/* Cost of travelling u->v: the shortest-path cost if computed, else the edge weight */
+double graph_cost(const Graph *g, int u, int v);
 /* Free all allocated memory for the graph */
 void   free_graph(Graph *g);
 
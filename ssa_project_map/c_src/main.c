@@ -2,6 +2,7 @@
 #include "ssa.h"
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <time.h>
 #include <math.h>
 
@@ -124,18 +125,34 @@ void generate_jams(int n, const char *filename) {
 }
 
 int main(int argc, char **argv) {
-    if (argc < 3) {
-        fprintf(stderr, "Usage: %s <graph.csv> <output_route.txt> [nodes] [density]\n", argv[0]);
+    // Options start with "--" and may appear anywhere; the rest are positional
+    SsaVisitFormat visit_format = SSA_VISITS_TEXT;
+    char *args[4];
+    int nargs = 0;
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "--visits-npy") == 0) {
+            visit_format = SSA_VISITS_NPY;
+        } else if (strncmp(argv[i], "--", 2) == 0) {
+            fprintf(stderr, "Error: Unknown option %s\n", argv[i]);
+            return 1;
+        } else if (nargs < 4) {
+            args[nargs++] = argv[i];
+        }
+    }
+
+    if (nargs < 2) {
+        fprintf(stderr, "Usage: %s <graph.csv> <output_route.txt> [nodes] [density] [--visits-npy]\n", argv[0]);
         fprintf(stderr, "  nodes: number of nodes in the graph (default: 30)\n");
         fprintf(stderr, "  density: connection density 0.0-1.0 (default: 0.2)\n");
+        fprintf(stderr, "  --visits-npy: write visit_matrix.npy instead of visit_matrix.txt\n");
         return 1;
     }
-    const char *graph_file = argv[1];
-    const char *route_file = argv[2];
+    const char *graph_file = args[0];
+    const char *route_file = args[1];
     
     // Optional parameters
-    int n_nodes = (argc > 3) ? atoi(argv[3]) : 30;
-    double density = (argc > 4) ? atof(argv[4]) : 0.2;
+    int n_nodes = (nargs > 2) ? atoi(args[2]) : 30;
+    double density = (nargs > 3) ? atof(args[3]) : 0.2;
     
     if (n_nodes <= 0) {
         fprintf(stderr, "Error: Number of nodes must be positive\n");
@@ -190,7 +207,7 @@ int main(int argc, char **argv) {
         
         // Generate new graph and coordinates
         printf("Generating new graph and coordinates\n");
-        g = malloc(sizeof(Graph));
+        g = calloc(1, sizeof(Graph));
         g->num_nodes = n_nodes;
         g->adj_matrix = malloc(n_nodes * sizeof(double*));
         for (int i = 0; i < n_nodes; i++) {
@@ -211,6 +228,12 @@ int main(int argc, char **argv) {
         return 2;
     }
     
+    // Cost hops between unconnected nodes by their shortest-path distance
+    if (graph_shortest_paths(g) != 0) {
+        fprintf(stderr, "Warning: graph has more than %d nodes, using raw edge weights\n",
+                GRAPH_SP_MAX_NODES);
+    }
+
     // Generate sample files for visualization
     generate_places("places.csv");
     generate_jams(g->num_nodes, "jams.csv");
@@ -224,7 +247,7 @@ int main(int argc, char **argv) {
     int  best_len;
 
     printf("Running SSA optimization with pop_size=%d, max_iter=%d\n", pop_size, max_iter);
-    run_ssa(g, pop_size, max_iter, best_route, &best_len);
+    run_ssa(g, pop_size, max_iter, best_route, &best_len, visit_format);
 
     /* Write route to file */
     FILE *f = fopen(route_file, "w");
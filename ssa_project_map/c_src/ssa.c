@@ -1,6 +1,7 @@
 #include "ssa.h"
 #include <stdlib.h>
 #include <stdio.h>
+#include <math.h>
 #include <string.h>
 #include <time.h>
 
@@ -31,25 +32,78 @@ static double evaluate(const Graph *g, const Sparrow *sp) {
     double sum = 0.0;
     for (int i = 1; i < sp->len; i++) {
         int u = sp->route[i-1], v = sp->route[i];
-        sum += g->adj_matrix[u][v];
+        sum += graph_cost(g, u, v);
     }
     return sum;
 }
 
-void run_ssa(const Graph *g,
-             int population_size,
-             int max_iter,
-             int *best_route,
-             int *out_len)
+/* Weight of the (at most 4) route edges touching positions a and b.
+ * Edge e joins positions e and e+1; a shared edge is counted once. */
+static double swap_edges_cost(const Graph *g, const int *route, int n, int a, int b) {
+    if (a > b) { int t = a; a = b; b = t; }
+    int edges[4] = { a - 1, a, b - 1, b };
+    double sum = 0.0;
+    for (int k = 0; k < 4; k++) {
+        int e = edges[k];
+        if (e < 0 || e > n - 2) continue;
+        if (k == 2 && e == a) continue;
+        sum += graph_cost(g, route[e], route[e + 1]);
+    }
+    return sum;
+}
+
+/* Swap positions a and b of a sparrow's route and update its fitness in O(1) */
+static void swap_with_delta(const Graph *g, Sparrow *sp, int a, int b) {
+    if (a == b) return;
+    sp->fitness -= swap_edges_cost(g, sp->route, sp->len, a, b);
+    int tmp = sp->route[a];
+    sp->route[a] = sp->route[b];
+    sp->route[b] = tmp;
+    sp->fitness += swap_edges_cost(g, sp->route, sp->len, a, b);
+}
+
+/* Write the visit matrix as a version 1.0 .npy file of int32 in host byte order.
+ * Returns 0 on success, -1 if the file cannot be written. */
+static int write_visits_npy(const char *filename, const int *visit_matrix, int n) {
+    FILE *f = fopen(filename, "wb");
+    if (!f) return -1;
+    const unsigned int probe = 1;
+    const char order = (*(const unsigned char *)&probe == 1) ? '<' : '>';
+    char header[128];
+    int len = snprintf(header, sizeof(header),
+                       "{'descr': '%ci4', 'fortran_order': False, 'shape': (%d, %d), }", order, n, n);
+    /* Magic (6) + version (2) + length (2) + header must be a multiple of 64,
+     * the header padded with spaces and ending in a newline */
+    int total = (10 + len + 1 + 63) / 64 * 64;
+    while (10 + len + 1 < total)
+        header[len++] = ' ';
+    header[len++] = '\n';
+    unsigned char preamble[10] = { 0x93, 'N', 'U', 'M', 'P', 'Y', 1, 0,
+                                   (unsigned char)(len & 0xff), (unsigned char)(len >> 8) };
+    int ok = fwrite(preamble, 1, sizeof(preamble), f) == sizeof(preamble)
+          && fwrite(header, 1, len, f) == (size_t)len;
+    for (int i = 0; ok && i < n; i++)
+        ok = fwrite(visit_matrix + (size_t)i * n, sizeof(int), n, f) == (size_t)n;
+    if (fclose(f) != 0) ok = 0;
+    return ok ? 0 : -1;
+}
+
+double ssa_solve(const Graph *g,
+                 int population_size,
+                 int max_iter,
+                 unsigned int seed,
+                 int *best_route,
+                 int *out_len,
+                 int *visit_matrix,
+                 int *node_visits)
 {
-    srand((unsigned int)time(NULL));
+    srand(seed);
 
     int n = g->num_nodes;
-    // Adjacency matrix for visit frequency
-    int **visit_matrix = malloc(n * sizeof(int *));
-    for (int i = 0; i < n; i++) {
-        visit_matrix[i] = calloc(n, sizeof(int));
-    }
+    if (visit_matrix)
+        memset(visit_matrix, 0, (size_t)n * n * sizeof(int));
+    if (node_visits)
+        memset(node_visits, 0, n * sizeof(int));
 
     /* Allocate population */
     Sparrow *pop = calloc(population_size, sizeof(*pop));
@@ -60,6 +114,9 @@ void run_ssa(const Graph *g,
         pop[i].fitness = evaluate(g, &pop[i]);
     }
 
+    /* Sparrows whose route changed beyond a single swap this iteration */
+    char *dirty = malloc(population_size);
+
     double global_best = 1e308;
     int  *gb_route = malloc(g->num_nodes * sizeof(int));
     int   gb_len = 0;
@@ -80,13 +137,12 @@ void run_ssa(const Graph *g,
         // top 20% (by fitness) explore new solutions
         int num_producers = population_size / 5;
         if (num_producers < 1) num_producers = 1;
+        memset(dirty, 0, population_size);
         for (int i = 0; i < num_producers; i++) {
-            // Randomly perturb route (swap two nodes)
+            // Randomly perturb route (swap two nodes), fitness updated from 4 edges
             int a = randint(0, n - 1);
             int b = randint(0, n - 1);
-            int tmp = pop[i].route[a];
-            pop[i].route[a] = pop[i].route[b];
-            pop[i].route[b] = tmp;
+            swap_with_delta(g, &pop[i], a, b);
         }
 
         // Scrounger stage: rest copy parts from best producers
@@ -100,6 +156,7 @@ void run_ssa(const Graph *g,
                 pop[i].route[j] = pop[i].route[k];
                 pop[i].route[k] = tmp;
             }
+            dirty[i] = 1;
         }
 
         /* Danger-awareness stage: random jumps to avoid local optima */
@@ -110,13 +167,35 @@ void run_ssa(const Graph *g,
             int idx = randint(0, population_size - 1);
             random_route(pop[idx].route, n);
             pop[idx].len = n;
+            dirty[idx] = 1;
         }
 
         // Evaluate and track global best, update visit matrix
         for (int i = 0; i < population_size; i++) {
-            pop[i].fitness = evaluate(g, &pop[i]);
-            for (int j = 1; j < pop[i].len; j++)
-                visit_matrix[pop[i].route[j-1]][pop[i].route[j]]++;
+            // Only routes that changed completely need a full re-evaluation
+            if (dirty[i]) {
+                pop[i].fitness = evaluate(g, &pop[i]);
+            }
+#ifdef SSA_CHECK_DELTA
+            else {
+                double full = evaluate(g, &pop[i]);
+                if (fabs(full - pop[i].fitness) > 1e-6 * (1.0 + fabs(full))) {
+                    fprintf(stderr, "Delta fitness mismatch: sparrow %d has %f, full evaluation %f\n",
+                            i, pop[i].fitness, full);
+                    abort();
+                }
+            }
+#endif
+            for (int j = 1; j < pop[i].len; j++) {
+                int u = pop[i].route[j-1], v = pop[i].route[j];
+                if (visit_matrix)
+                    visit_matrix[(size_t)u * n + v]++;
+                // Count both outgoing and incoming visits (for the histogram)
+                if (node_visits && u != v) {
+                    node_visits[u]++;
+                    node_visits[v]++;
+                }
+            }
             if (pop[i].fitness < global_best) {
                 global_best = pop[i].fitness;
                 gb_len = pop[i].len;
@@ -127,55 +206,78 @@ void run_ssa(const Graph *g,
     }
 
     // Output best route
-     *out_len = gb_len;
-     for (int i = 0; i < gb_len; i++)
-         best_route[i] = gb_route[i];
-
-     // Output the visit matrix for visualization
-     FILE *vf = fopen("visit_matrix.txt", "w");
-     for (int i = 0; i < n; i++) {
-         for (int j = 0; j < n; j++)
-             fprintf(vf, "%d%c", visit_matrix[i][j], (j==n-1)?'\n':' ');
-     }
-     fclose(vf);
-
-     // Calculate node visit frequencies (for histogram)
-     int *node_visits = calloc(n, sizeof(int));
-     for (int i = 0; i < n; i++) {
-         for (int j = 0; j < n; j++) {
-             // Count both outgoing and incoming visits
-             if (i != j) {
-                 node_visits[i] += visit_matrix[i][j]; // outgoing
-                 node_visits[j] += visit_matrix[i][j]; // incoming
-             }
-         }
-     }
-
-     // Output node visit frequencies for histogram
-     FILE *nf = fopen("node_visits.txt", "w");
-     for (int i = 0; i < n; i++) {
-         fprintf(nf, "%d %d\n", i, node_visits[i]);
-     }
-     fclose(nf);
-     free(node_visits);
-
-     // Output route statistics
-     FILE *sf = fopen("route_stats.txt", "w");
-     fprintf(sf, "nodes: %d\n", n);
-     fprintf(sf, "route_length: %lf\n", global_best);
-     fprintf(sf, "iterations: %d\n", max_iter);
-     fprintf(sf, "population: %d\n", population_size);
-     fclose(sf);
-
-     // We don't write best_route.txt here as that's done in main.c
-
-     // Cleanup
-     free(gb_route);
-     for (int i = 0; i < population_size; i++)
-         free(pop[i].route);
-     free(pop);
-
-     for (int i = 0; i < n; i++)
-         free(visit_matrix[i]);
-     free(visit_matrix);
- }
+    *out_len = gb_len;
+    for (int i = 0; i < gb_len; i++)
+        best_route[i] = gb_route[i];
+
+    // Cleanup
+    free(dirty);
+    free(gb_route);
+    for (int i = 0; i < population_size; i++)
+        free(pop[i].route);
+    free(pop);
+    return global_best;
+}
+
+double ssa_solve_matrix(int n,
+                        const double *cost,
+                        int population_size,
+                        int max_iter,
+                        unsigned int seed,
+                        int *best_route,
+                        int *visit_matrix,
+                        int *node_visits)
+{
+    /* The caller's matrix serves as the graph's cost table in place; it is
+     * only ever read through graph_cost(), never freed */
+    Graph g = { .num_nodes = n, .dist = (double *)cost };
+    int len;
+    return ssa_solve(&g, population_size, max_iter, seed, best_route, &len, visit_matrix, node_visits);
+}
+
+void run_ssa(const Graph *g,
+             int population_size,
+             int max_iter,
+             int *best_route,
+             int *out_len,
+             SsaVisitFormat visit_format)
+{
+    int n = g->num_nodes;
+    int *visit_matrix = malloc((size_t)n * n * sizeof(int));
+    int *node_visits = malloc(n * sizeof(int));
+    double global_best = ssa_solve(g, population_size, max_iter, (unsigned int)time(NULL),
+                                   best_route, out_len, visit_matrix, node_visits);
+
+    // Output the visit matrix for visualization
+    if (visit_format == SSA_VISITS_NPY) {
+        if (write_visits_npy("visit_matrix.npy", visit_matrix, n) != 0)
+            perror("Error writing visit_matrix.npy");
+    } else {
+        FILE *vf = fopen("visit_matrix.txt", "w");
+        for (int i = 0; i < n; i++) {
+            for (int j = 0; j < n; j++)
+                fprintf(vf, "%d%c", visit_matrix[(size_t)i * n + j], (j==n-1)?'\n':' ');
+        }
+        fclose(vf);
+    }
+
+    // Output node visit frequencies for histogram
+    FILE *nf = fopen("node_visits.txt", "w");
+    for (int i = 0; i < n; i++) {
+        fprintf(nf, "%d %d\n", i, node_visits[i]);
+    }
+    fclose(nf);
+
+    // Output route statistics
+    FILE *sf = fopen("route_stats.txt", "w");
+    fprintf(sf, "nodes: %d\n", n);
+    fprintf(sf, "route_length: %lf\n", global_best);
+    fprintf(sf, "iterations: %d\n", max_iter);
+    fprintf(sf, "population: %d\n", population_size);
+    fclose(sf);
+
+    // We don't write best_route.txt here as that's done in main.c
+
+    free(node_visits);
+    free(visit_matrix);
+}
@@ -3,12 +3,47 @@
 
 #include "graph.h"
 
+/* Output format of the visit matrix written by run_ssa */
+typedef enum {
+    SSA_VISITS_TEXT,   /* visit_matrix.txt, space-separated rows */
+    SSA_VISITS_NPY     /* visit_matrix.npy, NumPy .npy file of int32 */
+} SsaVisitFormat;
+
+/* Run discrete SSA on graph g without touching the filesystem, seeding rand()
+ * with seed. The best route goes to best_route (num_nodes entries) and its
+ * length to *out_len. If not NULL, visit_matrix (n*n, row-major) receives the
+ * count of every route transition and node_visits (n) each node's outgoing
+ * plus incoming transitions; both are zeroed first. Returns the best route cost. */
+double ssa_solve(const Graph *g,
+                 int population_size,
+                 int max_iter,
+                 unsigned int seed,
+                 int *best_route,
+                 int *out_len,
+                 int *visit_matrix,
+                 int *node_visits);
+
+/* Shared-library entry point (libssa.so): ssa_solve on a caller-owned n*n
+ * row-major cost matrix, e.g. a NumPy array, read in place. All outputs are
+ * caller-provided buffers; best_route gets n entries. */
+double ssa_solve_matrix(int n,
+                        const double *cost,
+                        int population_size,
+                        int max_iter,
+                        unsigned int seed,
+                        int *best_route,
+                        int *visit_matrix,
+                        int *node_visits);
+
 /* Run discrete SSA on graph g; write best route (node indices) to best_route,
- * route_len to *out_len, using population_size sparrows for max_iter iterations. */
+ * route_len to *out_len, using population_size sparrows for max_iter iterations.
+ * Seeded from the clock; the visit matrix is written in visit_format, plus
+ * node_visits.txt and route_stats.txt. */
 void run_ssa(const Graph *g,
              int population_size,
              int max_iter,
              int *best_route,
-             int *out_len);
+             int *out_len,
+             SsaVisitFormat visit_format);
 
 #endif /* SSA_H */
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Animate the SSA search on a road network.
+
+The network is drawn once and saved as a background; every frame restores
+that background and redraws only the best-route line, the node colours (each
+node coloured by its position along the current best route) and the caption,
+i.e. blitting. Frames come from the per-iteration records of
+ssa_engine.iter_ssa, taking one every `--frame-every` iterations, and are
+streamed to the output as they are drawn:
+
+    .mp4   raw RGBA frames piped into ffmpeg
+    .gif   encoded frame by frame with Pillow
+    other  a directory of numbered PNG frames
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from PIL import GifImagePlugin, Image
+
+from batch_render import map_limits
+from draw_map import coords_to_array, edge_segments, load_coords, load_edges
+from graph_io import GRAPH_FORMATS
+from shortest_paths import DEFAULT_CACHE_DIR, cached_shortest_paths, expand_route, route_cost_matrix
+from ssa_engine import random_population, ssa_evolve
+
+
+class RouteAnimator:
+    """Blitting renderer for the best route over a static network"""
+
+    def __init__(self, xy, src, dst, dpi=100, size=8):
+        self.xy = xy
+        self.fig = Figure(figsize=(size, size), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_axes([0.02, 0.02, 0.96, 0.96])
+        limits = map_limits(xy)
+        self.ax.set_xlim(*limits[0])
+        self.ax.set_ylim(*limits[1])
+        self.ax.axis('off')
+        self.ax.add_collection(LineCollection(edge_segments(xy, src, dst), colors='lightgrey',
+                                              linewidths=0.8, alpha=0.6))
+
+        # Animated artists are skipped by canvas.draw() and drawn per frame
+        self.nodes = self.ax.scatter(xy[:, 0], xy[:, 1], c=np.zeros(len(xy)), cmap='viridis', vmin=0, vmax=1,
+                                     s=14, edgecolors='black', linewidths=0.3, zorder=2, animated=True)
+        self.line, = self.ax.plot([], [], color='red', lw=1.5, alpha=0.8, zorder=3, animated=True)
+        self.caption = self.ax.text(0.01, 0.99, '', transform=self.ax.transAxes, va='top', fontsize=11,
+                                    bbox=dict(facecolor='white', alpha=0.8, edgecolor='none'), animated=True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.size = self.canvas.get_width_height()
+
+    def frame(self, route, path, caption):
+        """Draw one frame and return it as an RGBA memoryview.
+
+        `route` orders the node colours, `path` is the line drawn.
+        """
+        self.canvas.restore_region(self.background)
+        position = np.empty(len(self.xy))
+        position[route] = np.arange(len(route)) / max(len(route) - 1, 1)
+        self.nodes.set_array(position)
+        self.line.set_data(self.xy[path, 0], self.xy[path, 1])
+        self.caption.set_text(caption)
+        for artist in (self.line, self.nodes, self.caption):
+            self.ax.draw_artist(artist)
+        return self.canvas.buffer_rgba()
+
+
+class FFmpegWriter:
+    """Pipe raw RGBA frames into ffmpeg"""
+
+    def __init__(self, filename, size, fps):
+        command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                   '-s', f"{size[0]}x{size[1]}", '-r', str(fps), '-i', '-',
+                   # libx264 needs even dimensions
+                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', filename]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, rgba):
+        self.process.stdin.write(rgba)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self.process.returncode}")
+
+
+class GifWriter:
+    """Append frames to an animated GIF one at a time.
+
+    Every frame is quantized to the palette of the first frame and written
+    immediately, so memory use does not grow with the number of frames.
+    """
+
+    def __init__(self, filename, size, fps):
+        self.file = open(filename, 'wb')
+        self.size = size
+        self.duration = int(round(1000 / fps))
+        self.palette = None
+
+    def write(self, rgba):
+        image = Image.frombuffer('RGBA', self.size, bytes(rgba), 'raw', 'RGBA', 0, 1).convert('RGB')
+        if self.palette is None:
+            self.palette = image.quantize(256)
+            header, _ = GifImagePlugin.getheader(self.palette, info={'loop': 0, 'duration': self.duration})
+            for chunk in header:
+                self.file.write(chunk)
+            frame = self.palette
+        else:
+            frame = image.quantize(palette=self.palette, dither=Image.Dither.NONE)
+        for chunk in GifImagePlugin.getdata(frame, duration=self.duration):
+            self.file.write(chunk)
+
+    def close(self):
+        self.file.write(b';')
+        self.file.close()
+
+
+class PngWriter:
+    """Write numbered PNG frames into a directory"""
+
+    def __init__(self, directory, size, fps):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.count = 0
+
+    def write(self, rgba):
+        Image.fromarray(np.asarray(rgba)).save(os.path.join(self.directory, f"frame_{self.count:05d}.png"))
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+def open_writer(filename, size, fps):
+    """Pick the frame writer for the output file extension"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.mp4':
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError("Writing MP4 requires ffmpeg on the PATH; use a .gif output instead")
+        return FFmpegWriter(filename, size, fps)
+    if extension == '.gif':
+        return GifWriter(filename, size, fps)
+    return PngWriter(filename, size, fps)
+
+
+def animate(cost_matrix, xy, src, dst, output, max_iter=500, population_size=20, frame_every=10, fps=10,
+            dpi=100, seed=None, pred=None):
+    """Run SSA and stream one frame every `frame_every` iterations to `output`.
+
+    Returns (best_route, best_fitness, frames_written).
+    """
+    animator = RouteAnimator(xy, src, dst, dpi)
+    writer = open_writer(output, animator.size, fps)
+    rng = np.random.default_rng(seed)
+    population = random_population(rng, population_size, len(cost_matrix))
+    frames = 0
+    shown = {}
+
+    def draw(record):
+        nonlocal frames
+        iteration = record['iteration']
+        if iteration % frame_every and iteration != max_iter - 1:
+            return
+        route = record['best_route']
+        # Expand the road path only when the best route changed
+        if shown.get('fitness') != record['best_fitness']:
+            shown['fitness'] = record['best_fitness']
+            shown['route'] = route.copy()
+            shown['path'] = np.asarray(expand_route(route, pred) if pred is not None else route, dtype=np.intp)
+        caption = f"Iteration {iteration + 1}/{max_iter}  best cost {record['best_fitness']:.2f}"
+        writer.write(animator.frame(shown['route'], shown['path'], caption))
+        frames += 1
+
+    try:
+        best_route, best_fitness, _ = ssa_evolve(cost_matrix, population, max_iter, rng, callback=draw)
+    finally:
+        writer.close()
+    return best_route, best_fitness, frames
+
+
+def main():
+    p = argparse.ArgumentParser(description="Animate the SSA search process.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--coords', type=str, default="coords.csv", help="Node coordinates .csv (default: coords.csv)")
+    p.add_argument('--output', type=str, default="ssa_search.gif",
+                   help="Output .gif, .mp4 (needs ffmpeg) or frame directory (default: ssa_search.gif)")
+    p.add_argument('--max-iter', type=int, default=500, help="SSA iterations (default: 500)")
+    p.add_argument('--pop-size', type=int, default=20, help="Population size (default: 20)")
+    p.add_argument('--frame-every', type=int, default=10, help="Iterations per frame (default: 10)")
+    p.add_argument('--fps', type=int, default=10, help="Frames per second (default: 10)")
+    p.add_argument('--dpi', type=int, default=100, help="Frame resolution, 8 inches square (default: 100)")
+    p.add_argument('--raw-weights', action='store_true',
+                   help="Cost hops with raw edge weights instead of shortest-path distances")
+    p.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                   help=f"Directory for cached shortest-path matrices (default: {DEFAULT_CACHE_DIR})")
+    p.add_argument('--seed', type=int, default=None, help="Random seed")
+    args = p.parse_args()
+
+    for name in ('max_iter', 'pop_size', 'frame_every', 'fps', 'dpi'):
+        if getattr(args, name) <= 0:
+            print(f"Error: --{name.replace('_', '-')} must be positive")
+            return 1
+    for filename in (args.graph, args.coords):
+        if not os.path.exists(filename):
+            print(f"Error: Required file '{filename}' doesn't exist")
+            return 1
+
+    coords = load_coords(args.coords)
+    num_nodes, src, dst, weights = load_edges(args.graph, args.graph_format)
+    xy = coords_to_array(coords, num_nodes)
+    adj_matrix = np.zeros((num_nodes, num_nodes))
+    adj_matrix[src, dst] = weights
+    if args.raw_weights:
+        cost_matrix, pred = adj_matrix, None
+    else:
+        dist, pred = cached_shortest_paths(adj_matrix, args.graph, args.cache_dir)
+        cost_matrix = route_cost_matrix(dist)
+
+    try:
+        _, best_fitness, frames = animate(cost_matrix, xy, src, dst, args.output, args.max_iter, args.pop_size,
+                                          args.frame_every, args.fps, args.dpi, args.seed, pred)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Wrote {frames} frames to {args.output} (best cost {best_fitness:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
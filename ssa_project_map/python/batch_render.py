@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Render many routes and jam scenarios over one cached base map.
+
+The static layer (road network, nodes and buildings) is rasterized once and
+cached as an RGBA array keyed by a hash of the graph, coordinates and places
+files. Every output then only draws the route and jam overlays, the legend
+and the title on a transparent figure placed over a copy of the cached
+background, so N routes cost about one full render plus N small overlays.
+Outputs are rendered in parallel by a process pool.
+"""
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from draw_map import (coords_to_array, decorate_map, draw_places, edge_segments, load_coords, load_edges,
+                      load_jams, load_places, load_route)
+from graph_io import GRAPH_FORMATS
+from shortest_paths import DEFAULT_CACHE_DIR, file_digest
+
+FIGURE_SIZE = 8
+# Fixed axes placement shared by the background and the overlays
+AXES_RECT = (0.03, 0.03, 0.94, 0.92)
+# Bumped whenever the background styling changes, so old caches are ignored
+_STYLE_VERSION = 1
+
+# Per-worker state set by _init_worker
+_state = {}
+
+
+def map_limits(xy):
+    """Axis limits around all finite coordinates with a 5% margin"""
+    finite = xy[np.isfinite(xy).all(axis=1)]
+    if len(finite) == 0:
+        return (0.0, 1.0), (0.0, 1.0)
+    lo = finite.min(axis=0)
+    hi = finite.max(axis=0)
+    pad = np.maximum(hi - lo, 1e-9) * 0.05
+    return (lo[0] - pad[0], hi[0] + pad[0]), (lo[1] - pad[1], hi[1] + pad[1])
+
+
+def new_map_figure(limits, dpi):
+    """Figure and axes with the fixed layout used for every layer"""
+    fig = Figure(figsize=(FIGURE_SIZE, FIGURE_SIZE), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes(AXES_RECT)
+    ax.set_xlim(*limits[0])
+    ax.set_ylim(*limits[1])
+    ax.axis('off')
+    return fig, ax
+
+
+def render_background(xy, src, dst, places, limits, dpi):
+    """Rasterize the network, nodes and buildings into an RGBA array"""
+    fig, ax = new_map_figure(limits, dpi)
+    draw_places(ax, places)
+    ax.add_collection(LineCollection(edge_segments(xy, src, dst), colors='lightgrey', linewidths=1, alpha=0.6))
+    nodes = np.unique(np.concatenate([src, dst]))
+    ax.scatter(xy[nodes, 0], xy[nodes, 1], s=30, c='black', zorder=2)
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def background_key(graph_file, coords_file, places_file, dpi):
+    """Cache key from the contents of the files that make up the static layer"""
+    h = hashlib.sha256(f"v{_STYLE_VERSION}:dpi={dpi}".encode())
+    for filename in (graph_file, coords_file, places_file):
+        h.update(file_digest(filename).encode() if filename and os.path.exists(filename) else b'-')
+    return h.hexdigest()
+
+
+def cached_background(key, cache_dir, render):
+    """Return (path, rendered) for the background, calling render() on a cache miss"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"bg-{key}.npy")
+    if os.path.exists(path):
+        return path, False
+    # Write under a temporary name so concurrent runs never read a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, render())
+    os.replace(tmp_path, path)
+    return path, True
+
+
+def _init_worker(background_path, xy, limits, dpi):
+    """Pool initializer: map the cached background and keep the coordinates"""
+    _state['background'] = np.load(background_path, mmap_mode='r')
+    _state['xy'] = xy
+    _state['limits'] = limits
+    _state['dpi'] = dpi
+
+
+def render_overlay(route, jammed_edges, output_file):
+    """Composite the route and jam overlays onto the cached background"""
+    xy = _state['xy']
+    fig, ax = new_map_figure(_state['limits'], _state['dpi'])
+    fig.patch.set_alpha(0)
+    # The background image fills the whole figure underneath the axes
+    fig.figimage(_state['background'], xo=0, yo=0, origin='upper', zorder=-1)
+
+    if jammed_edges:
+        jams = np.asarray(jammed_edges, dtype=np.intp).reshape(-1, 2)
+        ax.add_collection(LineCollection(edge_segments(xy, jams[:, 0], jams[:, 1]),
+                                         colors='red', linewidths=3, alpha=0.8))
+    num_route_edges = 0
+    if route and len(route) > 1:
+        path = np.asarray(route, dtype=np.intp)
+        num_route_edges = len(path) - 1
+        ax.add_collection(LineCollection(edge_segments(xy, path[:-1], path[1:]), colors='green',
+                                         linewidths=4, alpha=0.95, zorder=3))
+        ax.scatter([xy[path[0], 0]], [xy[path[0], 1]], s=200, c='blue', marker='o', edgecolors='white',
+                   zorder=10)
+        ax.scatter([xy[path[-1], 0]], [xy[path[-1], 1]], s=200, c='red', marker='*', edgecolors='white',
+                   zorder=10)
+    decorate_map(ax, route, num_route_edges)
+    fig.savefig(output_file, dpi=_state['dpi'])
+    return output_file
+
+
+def _render_job(route_file, jams_file, output_file):
+    route = load_route(route_file)
+    jammed_edges = load_jams(jams_file) if jams_file else None
+    return render_overlay(route, jammed_edges, output_file)
+
+
+def batch_jobs(route_files, jam_files, output_dir):
+    """(route_file, jams_file, output_file) for every route and jam scenario"""
+    jobs = []
+    for route_file in route_files:
+        route_name = os.path.splitext(os.path.basename(route_file))[0]
+        for jams_file in jam_files or [None]:
+            name = route_name
+            if jams_file is not None and len(jam_files) > 1:
+                name += "_" + os.path.splitext(os.path.basename(jams_file))[0]
+            jobs.append((route_file, jams_file, os.path.join(output_dir, f"{name}.png")))
+    return jobs
+
+
+def main():
+    p = argparse.ArgumentParser(description="Render many routes and jam scenarios over one cached base map.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--coords', type=str, default="coords.csv", help="Node coordinates .csv (default: coords.csv)")
+    p.add_argument('--places', type=str, default="places.csv", help="CSV with building outlines (default: places.csv)")
+    p.add_argument('--routes', type=str, nargs='+', required=True, help="Route files to render")
+    p.add_argument('--jams', type=str, nargs='*', default=[],
+                   help="Jam files; every route is rendered with every jam file")
+    p.add_argument('--output-dir', type=str, default="maps", help="Output directory (default: maps)")
+    p.add_argument('--dpi', type=int, default=300, help="Output resolution (default: 300)")
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                   help="Rendering processes (default: number of CPUs)")
+    p.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                   help=f"Directory for cached base layers (default: {DEFAULT_CACHE_DIR})")
+    p.add_argument('--no-buildings', action='store_true', help="Don't include buildings")
+    args = p.parse_args()
+
+    if args.dpi <= 0:
+        print("Error: DPI must be positive")
+        return 1
+    if args.workers <= 0:
+        print("Error: Number of workers must be positive")
+        return 1
+    for filename in [args.graph, args.coords] + args.routes + args.jams:
+        if not os.path.exists(filename):
+            print(f"Error: Required file '{filename}' doesn't exist")
+            return 1
+
+    coords = load_coords(args.coords)
+    num_nodes, src, dst, _ = load_edges(args.graph, args.graph_format)
+    xy = coords_to_array(coords, num_nodes)
+    limits = map_limits(xy)
+    places_file = None if args.no_buildings else args.places
+
+    key = background_key(args.graph, args.coords, places_file, args.dpi)
+    background_path, rendered = cached_background(
+        key, args.cache_dir,
+        lambda: render_background(xy, src, dst, load_places(places_file), limits, args.dpi))
+    print(f"{'Rendered' if rendered else 'Reusing cached'} base layer {background_path}")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = batch_jobs(args.routes, args.jams, args.output_dir)
+    initargs = (background_path, xy, limits, args.dpi)
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=initargs) as pool:
+            for output_file in pool.map(_render_job, *zip(*jobs)):
+                print(f"Map saved to {output_file}")
+    else:
+        _init_worker(*initargs)
+        for job in jobs:
+            print(f"Map saved to {_render_job(*job)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Reproducible performance benchmarks for the Python pipeline.
+
+Every pipeline stage is timed across graph sizes and densities with fixed
+seeds. Wall time is the best of `--repeat` untraced runs; peak memory comes
+from one extra run under tracemalloc. Results are written to JSON and can be
+compared against a stored baseline to flag regressions.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+import draw_map
+import generate_histogram
+import map_generator
+from plotting import pyplot
+from shortest_paths import all_pairs_shortest_paths, route_cost_matrix
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_DENSITIES = (0.05, 0.1, 0.3)
+QUICK_SIZES = (10, 100)
+# Graphs expected to have more edges than this are skipped
+MAX_EDGES = 5_000_000
+# Timings below this are too noisy to count as regressions
+NOISE_FLOOR = 0.005
+
+
+def measure(func, repeat):
+    """Return (best wall seconds, peak traced MiB) for calling func().
+
+    Output printed by the pipeline functions is discarded.
+    """
+    best = float('inf')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak / 2**20
+
+
+def expected_edges(n, density):
+    """Expected directed edge count of a random geometric graph in the unit square"""
+    return n * (n - 1) * min(1.0, np.pi * density ** 2)
+
+
+def make_graph(n, density, seed):
+    random.seed(seed)
+    return map_generator.generate_random_graph(n, density, sparse=True)
+
+
+def bench_generate(ctx):
+    return lambda: make_graph(ctx['n'], ctx['density'], ctx['seed'])
+
+
+def bench_save_csv(ctx):
+    path = os.path.join(ctx['tmp'], 'graph.csv')
+    return lambda: map_generator.save_graph_to_csv(ctx['adj'], path)
+
+
+def bench_ssa(ctx):
+    # map_generator optimizes over shortest-path costs, not the raw adjacency
+    cost_matrix = route_cost_matrix(all_pairs_shortest_paths(ctx['adj'])[0])
+    return lambda: map_generator.ssa_optimize(cost_matrix, 20, 20, seed=ctx['seed'])
+
+
+def bench_shortest_paths(ctx):
+    # Floyd-Warshall up to FLOYD_WARSHALL_MAX_NODES, batched Dijkstra above
+    return lambda: all_pairs_shortest_paths(ctx['adj'])
+
+
+def bench_load_graph(ctx):
+    path = os.path.join(ctx['tmp'], 'graph.csv')
+    if not os.path.exists(path):
+        map_generator.save_graph_to_csv(ctx['adj'], path)
+    return lambda: draw_map.load_graph(path)
+
+
+def bench_histogram(ctx):
+    # Rendering stages import pyplot (on Agg) here, outside the timed calls
+    pyplot()
+    counts = np.random.default_rng(ctx['seed']).integers(0, 1000, ctx['n'])
+    path = os.path.join(ctx['tmp'], 'hist.png')
+    return lambda: generate_histogram.generate_histogram(counts, path)
+
+
+def bench_draw_map(ctx):
+    pyplot()
+    graph_path = os.path.join(ctx['tmp'], 'graph.csv')
+    if not os.path.exists(graph_path):
+        map_generator.save_graph_to_csv(ctx['adj'], graph_path)
+    G = draw_map.load_graph(graph_path)
+    coords = {i: (float(x), float(y)) for i, (x, y) in enumerate(ctx['coords'])}
+    route = list(range(ctx['n']))
+    out = os.path.join(ctx['tmp'], 'map.png')
+    return lambda: draw_map.draw_map(G, coords, route, None, None, out)
+
+
+def bench_draw_map_fast(ctx):
+    pyplot()
+    src, dst, _ = ctx['edges']
+    coords = {i: (float(x), float(y)) for i, (x, y) in enumerate(ctx['coords'])}
+    route = list(range(ctx['n']))
+    out = os.path.join(ctx['tmp'], 'map_fast.png')
+    return lambda: draw_map.draw_map_fast(ctx['n'], src, dst, coords, route, None, None, out)
+
+
+# name -> (setup returning a zero-argument callable, largest node count, needs dense matrix)
+BENCHMARKS = {
+    'generate_random_graph': (bench_generate, 10000, False),
+    'save_graph_to_csv': (bench_save_csv, 2000, True),
+    'shortest_paths': (bench_shortest_paths, 2000, True),
+    'ssa_optimize': (bench_ssa, 1000, True),
+    'load_graph': (bench_load_graph, 2000, True),
+    'generate_histogram': (bench_histogram, 2000, False),
+    'draw_map': (bench_draw_map, 1000, True),
+    'draw_map_fast': (bench_draw_map_fast, 5000, False),
+}
+
+
+def run_benchmarks(names, sizes, densities, repeat, seed, quiet=False):
+    """Run the selected benchmarks and return (results, skipped) record lists.
+
+    A skipped record names a case that was not run and the reason why.
+    """
+    results = []
+    skipped = []
+
+    def skip(name, n, density, reason):
+        skipped.append({'name': name, 'nodes': n, 'density': density, 'reason': reason})
+        if not quiet:
+            print(f"{name:<22} n={n:<6} density={density:<5} skipped: {reason}")
+
+    for n in sizes:
+        for density in densities:
+            if expected_edges(n, density) > MAX_EDGES:
+                for name in names:
+                    skip(name, n, density, f"more than {MAX_EDGES} expected edges")
+                continue
+            edges, coords = make_graph(n, density, seed)
+            adj = None
+            with tempfile.TemporaryDirectory() as tmp:
+                for name in names:
+                    setup, max_nodes, dense = BENCHMARKS[name]
+                    if n > max_nodes:
+                        skip(name, n, density, f"stage limited to {max_nodes} nodes")
+                        continue
+                    if dense and adj is None:
+                        adj = map_generator.edges_to_dense(n, edges)
+                    ctx = {'n': n, 'density': density, 'seed': seed, 'tmp': tmp,
+                           'edges': edges, 'coords': coords, 'adj': adj}
+                    seconds, peak_mb = measure(setup(ctx), repeat)
+                    record = {'name': name, 'nodes': n, 'density': density, 'edges': int(len(edges[0])),
+                              'seconds': round(seconds, 6), 'peak_mb': round(peak_mb, 3)}
+                    results.append(record)
+                    if not quiet:
+                        print(f"{name:<22} n={n:<6} density={density:<5} edges={record['edges']:<9} "
+                              f"{seconds:9.4f}s {peak_mb:9.2f} MiB")
+    return results, skipped
+
+
+def print_render_scaling(results):
+    """Print rendering time per benchmark ordered by edge count"""
+    renders = sorted((r for r in results if r['name'].startswith('draw_map')),
+                     key=lambda r: (r['name'], r['edges']))
+    if not renders:
+        return
+    print("\nRendering time by edge count:")
+    for r in renders:
+        print(f"  {r['name']:<14} edges={r['edges']:<9} {r['seconds']:9.4f}s "
+              f"({r['seconds'] / max(r['edges'], 1) * 1e6:.2f} us/edge)")
+
+
+def result_key(record):
+    return (record['name'], record['nodes'], record['density'])
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline"""
+    previous = {result_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for record in results:
+        old = previous.get(result_key(record))
+        if old is None:
+            continue
+        if record['seconds'] > NOISE_FLOOR and record['seconds'] > old['seconds'] * (1 + tolerance):
+            regressions.append(f"{record['name']} n={record['nodes']} density={record['density']}: "
+                               f"time {old['seconds']:.4f}s -> {record['seconds']:.4f}s")
+        if record['peak_mb'] > 1.0 and record['peak_mb'] > old['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{record['name']} n={record['nodes']} density={record['density']}: "
+                               f"peak memory {old['peak_mb']:.2f} -> {record['peak_mb']:.2f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SSA pipeline")
+    parser.add_argument('--output', type=str, default='bench_results.json',
+                        help='Output JSON file (default: bench_results.json)')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', type=str, default=None,
+                        help='Also write the results to this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown before flagging a regression (default: 0.25)')
+    parser.add_argument('--bench', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help='Graph sizes (node counts)')
+    parser.add_argument('--densities', type=float, nargs='+', default=list(DEFAULT_DENSITIES),
+                        help='Connection density thresholds')
+    parser.add_argument('--quick', action='store_true', help=f'Only run sizes {QUICK_SIZES}')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (default: 3)')
+    parser.add_argument('--seed', type=int, default=12345, help='Random seed (default: 12345)')
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    results, skipped = run_benchmarks(args.bench, sizes, args.densities, args.repeat, args.seed)
+    print_render_scaling(results)
+    if skipped:
+        print(f"\n{len(skipped)} case(s) skipped; see 'skipped' in the results file")
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results written to {path}")
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            print(f"Warning: Baseline '{args.baseline}' not found, skipping comparison")
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
 import argparse
 import csv
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+import numpy as np
 import os
 import sys
 
+from graph_io import GRAPH_FORMATS, load_digraph, load_graph_edges
+# matplotlib and networkx are imported by the drawing functions only
+from plotting import pyplot
+
+RENDERERS = ('networkx', 'fast')
+
 def load_coords(filename):
     coords = {}
     try:
@@ -22,18 +26,21 @@ def load_coords(filename):
         print(f"Error loading coordinates: {e}")
         sys.exit(1)
 
-def load_graph(filename):
+def load_graph(filename, graph_format='auto'):
     try:
-        with open(filename) as f:
-            reader = csv.reader(f)
-            n = int(next(reader)[0])
-            G = nx.DiGraph()
-            for i in range(n):
-                row = list(map(float, next(reader)))
-                for j, w in enumerate(row):
-                    if w > 0:
-                        G.add_edge(i, j, weight=w)
-        return G
+        return load_digraph(filename, graph_format)
+    except FileNotFoundError:
+        print(f"Error: Graph file '{filename}' not found")
+        print("Make sure to run the C program first: ./ssa_sim graph.csv best_route.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error loading graph: {e}")
+        sys.exit(1)
+
+def load_edges(filename, graph_format='auto'):
+    """Load the graph as (n, src, dst, weights) arrays for the fast renderer"""
+    try:
+        return load_graph_edges(filename, graph_format)
     except FileNotFoundError:
         print(f"Error: Graph file '{filename}' not found")
         print("Make sure to run the C program first: ./ssa_sim graph.csv best_route.txt")
@@ -85,11 +92,10 @@ def load_jams(filename):
         print(f"Warning: Error loading traffic jams: {e}, continuing without jams")
         return []
 
-def draw_map(G, coords, route, places=None, jammed_edges=None, output_file="map.png", show_plot=False):
-    fig, ax = plt.subplots(figsize=(8, 8))
-
-    # Draw buildings/places as rectangles
+def draw_places(ax, places):
+    """Draw buildings/places as labelled rectangles"""
     if places:
+        from matplotlib.patches import Rectangle
         for p in places:
             rect = Rectangle((p['x1'], p['y1']),
                              p['x2'] - p['x1'],
@@ -101,6 +107,44 @@ def draw_map(G, coords, route, places=None, jammed_edges=None, output_file="map.
             cy = (p['y1'] + p['y2']) / 2
             ax.text(cx, cy, p['name'], fontsize=10, ha='center', va='center', color='brown', alpha=0.8)
 
+def decorate_map(ax, route, num_route_edges):
+    """Add the legend and the route title"""
+    from matplotlib.lines import Line2D
+    legend_elements = [
+        Line2D([0], [0], color='lightgrey', lw=2, label='Regular Traffic'),
+        Line2D([0], [0], color='red', lw=3, label='Traffic Jam'),
+        Line2D([0], [0], color='green', lw=4, label='Optimal Route'),
+        Line2D([0], [0], marker='s', color='w', label='Building', markerfacecolor='tan', alpha=0.5, markersize=15),
+        Line2D([0], [0], marker='o', color='blue', label='Start', markersize=10),
+        Line2D([0], [0], marker='*', color='red', label='End', markersize=10)
+    ]
+    ax.legend(handles=legend_elements, loc='upper left')
+
+    # Add title with route information
+    if route:
+        ax.set_title(f"Optimized Route - {len(route)} nodes, {num_route_edges} edges", fontsize=12)
+    else:
+        ax.set_title("Traffic Map (No Route)", fontsize=12)
+
+def finish_map(ax, route, num_route_edges, output_file, show_plot):
+    """Add the legend and title, then save (and optionally show) the figure"""
+    decorate_map(ax, route, num_route_edges)
+    plt = pyplot(show_plot)
+    plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300)
+    print(f"Map saved to {output_file}")
+
+    if show_plot:
+        plt.show()
+    else:
+        plt.close()
+
+def draw_map(G, coords, route, places=None, jammed_edges=None, output_file="map.png", show_plot=False):
+    import networkx as nx
+    fig, ax = pyplot(show_plot).subplots(figsize=(8, 8))
+    draw_places(ax, places)
+
     # Draw all edges as light grey
     nx.draw_networkx_edges(G, coords, ax=ax, edge_color='lightgrey', width=1, alpha=0.6)
 
@@ -127,33 +171,63 @@ def draw_map(G, coords, route, places=None, jammed_edges=None, output_file="map.
         ax.scatter([coords[end_node][0]], [coords[end_node][1]],
                 s=200, c='red', marker='*', edgecolors='white', zorder=10, label='End')
 
-    # Add a legend
-    from matplotlib.lines import Line2D
-    legend_elements = [
-        Line2D([0], [0], color='lightgrey', lw=2, label='Regular Traffic'),
-        Line2D([0], [0], color='red', lw=3, label='Traffic Jam'),
-        Line2D([0], [0], color='green', lw=4, label='Optimal Route'),
-        Line2D([0], [0], marker='s', color='w', label='Building', markerfacecolor='tan', alpha=0.5, markersize=15),
-        Line2D([0], [0], marker='o', color='blue', label='Start', markersize=10),
-        Line2D([0], [0], marker='*', color='red', label='End', markersize=10)
-    ]
-    ax.legend(handles=legend_elements, loc='upper left')
+    finish_map(ax, route, len(route_edges), output_file, show_plot)
 
-    # Add title with route information
-    if route:
-        plt.title(f"Optimized Route - {len(route)} nodes, {len(route_edges)} edges", fontsize=12)
-    else:
-        plt.title("Traffic Map (No Route)", fontsize=12)
+def coords_to_array(coords, num_nodes):
+    """(num_nodes, 2) array of node positions; nodes without coordinates are NaN"""
+    xy = np.full((num_nodes, 2), np.nan)
+    for node, (x, y) in coords.items():
+        if 0 <= node < num_nodes:
+            xy[node] = (x, y)
+    return xy
 
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=300)
-    print(f"Map saved to {output_file}")
+def edge_segments(xy, src, dst):
+    """(m, 2, 2) line segments for the edges src[i] -> dst[i]"""
+    return np.stack([xy[np.asarray(src, dtype=np.intp)], xy[np.asarray(dst, dtype=np.intp)]], axis=1)
 
-    if show_plot:
-        plt.show()
-    else:
-        plt.close()
+def draw_map_fast(num_nodes, src, dst, coords, route, places=None, jammed_edges=None,
+                  output_file="map.png", show_plot=False):
+    """Render the same map as draw_map straight from edge arrays.
+
+    Each edge layer (network, jams, route) is a single LineCollection and the
+    nodes are one scatter, so the cost grows with the number of segments
+    rather than with per-edge artists. Edges are drawn without arrowheads.
+    """
+    from matplotlib.collections import LineCollection
+    xy = coords_to_array(coords, num_nodes)
+    fig, ax = pyplot(show_plot).subplots(figsize=(8, 8))
+    draw_places(ax, places)
+
+    # Draw all edges as light grey
+    ax.add_collection(LineCollection(edge_segments(xy, src, dst), colors='lightgrey', linewidths=1, alpha=0.6))
+
+    # Draw jammed edges as red
+    if jammed_edges:
+        jams = np.asarray(jammed_edges, dtype=np.intp).reshape(-1, 2)
+        ax.add_collection(LineCollection(edge_segments(xy, jams[:, 0], jams[:, 1]),
+                                         colors='red', linewidths=3, alpha=0.8, label="Traffic Jam"))
+
+    # Draw nodes that have at least one edge, like the networkx renderer
+    nodes = np.unique(np.concatenate([src, dst]))
+    ax.scatter(xy[nodes, 0], xy[nodes, 1], s=30, c='black', zorder=2)
+
+    # Highlight optimal route in green
+    num_route_edges = 0
+    if route and len(route) > 1:
+        path = np.asarray(route, dtype=np.intp)
+        num_route_edges = len(path) - 1
+        ax.add_collection(LineCollection(edge_segments(xy, path[:-1], path[1:]), colors='green',
+                                         linewidths=4, alpha=0.95, zorder=3, label="Optimal Route"))
+
+        # Add start and end markers
+        ax.scatter([xy[path[0], 0]], [xy[path[0], 1]],
+                   s=200, c='blue', marker='o', edgecolors='white', zorder=10, label='Start')
+        ax.scatter([xy[path[-1], 0]], [xy[path[-1], 1]],
+                   s=200, c='red', marker='*', edgecolors='white', zorder=10, label='End')
+
+    # Collections do not update the data limits on their own
+    ax.autoscale_view()
+    finish_map(ax, route, num_route_edges, output_file, show_plot)
 
 def load_route(filename):
     route = []
@@ -214,6 +288,8 @@ def print_route_summary(route, stats):
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Draw road network with buildings, jams, and optimal route.")
     p.add_argument('--graph', type=str, default="graph.csv", help="Adjacency matrix .csv (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
     p.add_argument('--coords', type=str, default="coords.csv", help="Node coordinates .csv (default: coords.csv)")
     p.add_argument('--route', type=str, default="best_route.txt", help="File with optimal route (default: best_route.txt)")
     p.add_argument('--places', type=str, default="places.csv", help="CSV with building outlines (default: places.csv)")
@@ -222,6 +298,8 @@ if __name__ == "__main__":
     p.add_argument('--no-buildings', action='store_true', help="Don't include buildings")
     p.add_argument('--no-jams', action='store_true', help="Don't include traffic jams")
     p.add_argument('--show', action='store_true', help="Show map using matplotlib window")
+    p.add_argument('--renderer', choices=RENDERERS, default='networkx',
+                   help="networkx (per-edge artists) or fast (LineCollection, for large networks)")
     args = p.parse_args()
 
     # Check if required files exist
@@ -233,7 +311,10 @@ if __name__ == "__main__":
 
     # Load graph data from C program output files
     coords = load_coords(args.coords)
-    G = load_graph(args.graph)
+    if args.renderer == 'fast':
+        num_nodes, src, dst, _ = load_edges(args.graph, args.graph_format)
+    else:
+        G = load_graph(args.graph, args.graph_format)
     route = load_route(args.route)
 
     # Load optimization statistics if available
@@ -247,4 +328,7 @@ if __name__ == "__main__":
     jammed_edges = None if args.no_jams else load_jams(args.jams)
 
     print(f"Generating traffic map with {len(route)} nodes...")
-    draw_map(G, coords, route, places, jammed_edges, args.output, args.show)
+    if args.renderer == 'fast':
+        draw_map_fast(num_nodes, src, dst, coords, route, places, jammed_edges, args.output, args.show)
+    else:
+        draw_map(G, coords, route, places, jammed_edges, args.output, args.show)
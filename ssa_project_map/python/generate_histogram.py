@@ -1,26 +1,43 @@
 #!/usr/bin/env python3
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
+import itertools
 import sys
 import os
 
-def load_visit_matrix(filename):
-    """Load the visit matrix from the C program output"""
-    try:
-        with open(filename, 'r') as f:
-            lines = f.readlines()
+from plotting import pyplot
 
-        matrix = []
-        for line in lines:
-            row = list(map(int, line.strip().split()))
-            matrix.append(row)
+NPY_MAGIC = b'\x93NUMPY'
+HEATMAP_REDUCTIONS = ('sum', 'max', 'log')
 
-        # Convert to numpy array if possible, otherwise return list
-        try:
-            return np.array(matrix)
-        except (AttributeError, ValueError):
-            return matrix
+def is_npy_file(filename):
+    """True if the file starts with the .npy magic string"""
+    with open(filename, 'rb') as f:
+        return f.read(len(NPY_MAGIC)) == NPY_MAGIC
+
+def resolve_matrix_file(filename):
+    """Return filename, or its .npy sibling if that one is newer or the only one.
+
+    ./ssa_sim writes either visit_matrix.txt or visit_matrix.npy, so after
+    switching formats both can exist; the most recent run wins.
+    """
+    npy_file = os.path.splitext(filename)[0] + '.npy'
+    if npy_file == filename or not os.path.exists(npy_file):
+        return filename
+    if not os.path.exists(filename) or os.path.getmtime(npy_file) > os.path.getmtime(filename):
+        return npy_file
+    return filename
+
+def load_visit_matrix(filename):
+    """Load the visit matrix from the C program output.
+
+    A .npy matrix (./ssa_sim --visits-npy) is memory-mapped rather than read,
+    the text format is parsed in one np.loadtxt call.
+    """
+    try:
+        if is_npy_file(filename):
+            return np.load(filename, mmap_mode='r')
+        return np.loadtxt(filename, dtype=np.int64, ndmin=2)
     except FileNotFoundError:
         print(f"Error: {filename} not found. Make sure to run the C optimization first.")
         return None
@@ -28,6 +45,43 @@ def load_visit_matrix(filename):
         print(f"Error reading {filename}: {e}")
         return None
 
+def iter_visit_matrix_rows(filename, chunk_rows=256):
+    """Yield (start_row, block) row blocks of a text or .npy visit matrix"""
+    if is_npy_file(filename):
+        matrix = np.load(filename, mmap_mode='r')
+        for start in range(0, len(matrix), chunk_rows):
+            yield start, np.asarray(matrix[start:start + chunk_rows], dtype=np.int64)
+        return
+    with open(filename, 'r') as f:
+        first = f.readline()
+        # The matrix is square, so the first row gives the number of rows
+        n = len(first.split())
+        lines = itertools.chain([first], f)
+        for start in range(0, n, chunk_rows):
+            rows = min(chunk_rows, n - start)
+            block = np.loadtxt(itertools.islice(lines, rows), dtype=np.int64, ndmin=2)
+            if block.shape != (rows, n):
+                raise ValueError(f"expected {n} rows of {n} values, "
+                                 f"got a {block.shape[0]}x{block.shape[1]} block at row {start}")
+            yield start, block
+
+def stream_node_visit_counts(filename, chunk_rows=256):
+    """Node visit counts from one pass over the matrix in row blocks.
+
+    Only the row sums, column sums and diagonal are kept, so memory is O(n)
+    instead of O(n^2).
+    """
+    row_sums = []
+    col_sums = None
+    diagonal = []
+    for start, block in iter_visit_matrix_rows(filename, chunk_rows):
+        row_sums.append(block.sum(axis=1))
+        col_sums = block.sum(axis=0) if col_sums is None else col_sums + block.sum(axis=0)
+        diagonal.append(block[np.arange(len(block)), np.arange(start, start + len(block))])
+    if col_sums is None:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(row_sums) + col_sums - 2 * np.concatenate(diagonal)
+
 def load_node_visits(filename):
     """Load node visit counts directly from C program output"""
     try:
@@ -76,30 +130,21 @@ def load_route_stats(filename):
         return None
 
 def calculate_node_visit_counts(visit_matrix):
-    """Calculate total visits per node from the visit matrix"""
-    n = len(visit_matrix)
-    # Initialize array with zeros
-    node_visits = [0] * n
-
-    # Sum all visits to and from each node
-    for i in range(n):
-        for j in range(n):
-            if i != j:  # Don't count self-loops
-                node_visits[i] += visit_matrix[i][j]  # Outgoing visits
-                node_visits[j] += visit_matrix[i][j]  # Incoming visits
+    """Calculate total visits per node from the visit matrix.
 
-    # Convert to numpy array if possible
-    try:
-        node_visits = np.array(node_visits)
-    except (AttributeError, ValueError):
-        pass
-
-    return node_visits
+    Outgoing (row) plus incoming (column) sums, minus the self-loops on the
+    diagonal which both sums include.
+    """
+    visit_matrix = np.asarray(visit_matrix)
+    outgoing = visit_matrix.sum(axis=1, dtype=np.int64)
+    incoming = visit_matrix.sum(axis=0, dtype=np.int64)
+    return outgoing + incoming - 2 * np.diagonal(visit_matrix).astype(np.int64)
 
 def generate_histogram(visit_counts, output_file="visit_histogram.png", title="Node Visit Frequency"):
     """Generate and save histogram of node visit frequencies"""
     n = len(visit_counts)
 
+    plt = pyplot()
     plt.figure(figsize=(12, 6))
 
     # Create histogram
@@ -126,8 +171,8 @@ def generate_histogram(visit_counts, output_file="visit_histogram.png", title="N
         if v >= threshold:
             plt.text(i, v + max_visits * 0.01, str(v), ha='center', va='bottom', fontweight='bold')
 
-    # Set x-axis ticks to show all nodes
-    plt.xticks(range(n))
+    # Show every node id on small graphs, evenly spaced ids on large ones
+    plt.xticks(heatmap_ticks(n))
 
     plt.tight_layout()
     plt.savefig(output_file, dpi=300, bbox_inches='tight')
@@ -136,25 +181,87 @@ def generate_histogram(visit_counts, output_file="visit_histogram.png", title="N
     print(f"Histogram saved to {output_file}")
     return most_visited, max_visits
 
-def generate_heatmap(visit_matrix, output_file="visit_heatmap.png"):
-    """Generate heatmap of the visit matrix"""
+def matrix_row_blocks(visit_matrix, chunk_rows=256):
+    """Yield (start_row, block) row blocks of an in-memory or memory-mapped matrix"""
+    for start in range(0, len(visit_matrix), chunk_rows):
+        yield start, np.asarray(visit_matrix[start:start + chunk_rows])
+
+def pool_visit_matrix(row_blocks, n, target=512, reduce='sum', order=None):
+    """Block-pool an n x n matrix, fed as (start, block) row blocks, to at most target x target.
+
+    Each output cell aggregates a block x block tile with the sum or the max;
+    'log' is log(1 + sum). With `order` (a permutation of the nodes) rows and
+    columns are rearranged first, so row blocks may arrive in any order.
+    Returns (pooled, block).
+    """
+    block = max(1, -(-n // target))
+    size = -(-n // block)
+    rank = np.arange(n)
+    if order is not None:
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+    pooled = np.zeros((size, size), dtype=np.int64)
+    for start, rows in row_blocks:
+        rows = np.asarray(rows, dtype=np.int64)
+        if order is not None:
+            rows = rows[:, order]
+        padded = np.zeros((len(rows), size * block), dtype=np.int64)
+        padded[:, :n] = rows
+        tiles = padded.reshape(len(rows), size, block)
+        targets = rank[start:start + len(rows)] // block
+        if reduce == 'max':
+            np.maximum.at(pooled, targets, tiles.max(axis=2))
+        else:
+            np.add.at(pooled, targets, tiles.sum(axis=2))
+    if reduce == 'log':
+        return np.log1p(pooled), block
+    return pooled, block
+
+def crop_visit_matrix(row_blocks, lo, hi):
+    """Full-resolution rows and columns lo..hi-1 from (start, block) row blocks"""
+    crop = np.zeros((hi - lo, hi - lo), dtype=np.int64)
+    for start, rows in row_blocks:
+        a, b = max(start, lo), min(start + len(rows), hi)
+        if a < b:
+            crop[a - lo:b - lo] = np.asarray(rows)[a - start:b - start, lo:hi]
+        elif start >= hi:
+            break
+    return crop
+
+def heatmap_ticks(size, max_ticks=20):
+    """At most about max_ticks evenly spaced tick positions, on round steps"""
+    if size <= max_ticks:
+        return np.arange(size)
+    step = size / max_ticks
+    magnitude = 10 ** np.floor(np.log10(step))
+    step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= step)
+    return np.arange(0, size, int(step))
+
+def plot_heatmap(cells, output_file, block=1, first_node=0, reduce='sum', ordered=False,
+                 title="SSA Search Visit Matrix Heatmap"):
+    """Plot a (pooled) visit matrix; cell i covers nodes first_node + i*block onwards"""
+    plt = pyplot()
     plt.figure(figsize=(10, 8))
 
     # Create heatmap
-    im = plt.imshow(visit_matrix, cmap='YlOrRd', interpolation='nearest')
+    im = plt.imshow(cells, cmap='YlOrRd', interpolation='nearest')
 
     # Add colorbar
-    plt.colorbar(im, label='Visit Count')
+    labels = {'sum': 'Visit Count', 'max': 'Max Visit Count', 'log': 'log(1 + Visit Count)'}
+    plt.colorbar(im, label=labels[reduce])
 
     # Customize the plot
-    plt.xlabel("Destination Node", fontsize=12)
-    plt.ylabel("Source Node", fontsize=12)
-    plt.title("SSA Search Visit Matrix Heatmap", fontsize=14)
-
-    # Add grid
-    n = len(visit_matrix)
-    plt.xticks(range(n))
-    plt.yticks(range(n))
+    order_note = " (ordered by position)" if ordered else ""
+    plt.xlabel(f"Destination Node{order_note}", fontsize=12)
+    plt.ylabel(f"Source Node{order_note}", fontsize=12)
+    if block > 1:
+        title += f" ({block}x{block} node blocks, {reduce})"
+    plt.title(title, fontsize=14)
+
+    # Tick labels show the first node of each cell
+    ticks = heatmap_ticks(len(cells))
+    plt.xticks(ticks, first_node + ticks * block)
+    plt.yticks(ticks, first_node + ticks * block)
 
     plt.tight_layout()
     plt.savefig(output_file, dpi=300, bbox_inches='tight')
@@ -162,82 +269,98 @@ def generate_heatmap(visit_matrix, output_file="visit_heatmap.png"):
 
     print(f"Heatmap saved to {output_file}")
 
-def print_statistics(visit_counts, visit_matrix=None):
-    """Print detailed statistics about the visit patterns"""
-    n = len(visit_counts)
-    # Convert to list for consistent handling
-    visit_list = visit_counts.tolist() if hasattr(visit_counts, 'tolist') else list(visit_counts)
-
-    # Calculate total visits (divide by 2 because we count each edge twice)
-    total_visits = sum(visit_list) // 2
-
-    print("\n=== SSA Search Statistics ===")
-    print(f"Total nodes: {n}")
-    print(f"Total edge visits: {total_visits}")
-
-    # Calculate average visits
-    avg_visits = sum(visit_list) / len(visit_list) if visit_list else 0
-    print(f"Average visits per node: {avg_visits:.2f}")
-
-    # Find most visited node
-    most_visited_count = max(visit_list) if visit_list else 0
-    most_visited_idx = visit_list.index(most_visited_count) if visit_list else 0
-    print(f"Most visited node: {most_visited_idx} ({most_visited_count} visits)")
-
-    # Find least visited node
-    least_visited_count = min(visit_list) if visit_list else 0
-    least_visited_idx = visit_list.index(least_visited_count) if visit_list else 0
-    print(f"Least visited node: {least_visited_idx} ({least_visited_count} visits)")
-
-    # Calculate standard deviation
-    mean = sum(visit_list) / len(visit_list) if visit_list else 0
-    variance = sum((x - mean) ** 2 for x in visit_list) / len(visit_list) if visit_list else 0
-    std_dev = variance ** 0.5
-    print(f"Visit standard deviation: {std_dev:.2f}")
-
-    # Show top 5 most visited nodes
-    # Manual sorting for top 5
-    indexed_visits = [(i, v) for i, v in enumerate(visit_list)]
-    indexed_visits.sort(key=lambda x: x[1], reverse=True)
-    top_indices = [idx for idx, _ in indexed_visits[:5]]
-
-    print("\nTop 5 most visited nodes:")
-    for i, idx in enumerate(top_indices):
-        print(f"  {i+1}. Node {idx}: {visit_counts[idx]} visits")
-
-    # Show distribution
-    print("\nVisit distribution:")
+def generate_heatmap(visit_matrix, output_file="visit_heatmap.png", target=512, reduce='sum', order=None):
+    """Generate heatmap of the visit matrix, block-pooled to at most target x target cells.
 
-    # Simple statistics calculations
-    sorted_visits = sorted(visit_list)
+    `order` rearranges the nodes before pooling (see node_order).
+    """
+    n = len(visit_matrix)
+    pooled, block = pool_visit_matrix(matrix_row_blocks(visit_matrix), n, target, reduce, order)
+    plot_heatmap(pooled, output_file, block, reduce=reduce, ordered=order is not None)
 
-    # Min value
-    min_visits = min(visit_list) if visit_list else 0
-    print(f"  Min: {min_visits}")
+def node_order(coords_file, n):
+    """Morton order of the nodes by their coordinates, so pooled blocks are spatially compact"""
+    from draw_map import coords_to_array, load_coords
+    from spatial_index import morton_order
+    return morton_order(coords_to_array(load_coords(coords_file), n))
 
-    # 25th percentile
-    idx25 = int(len(sorted_visits) * 0.25)
-    percentile25 = sorted_visits[idx25] if sorted_visits else 0
-    print(f"  25th percentile: {percentile25}")
+def parse_node_range(text, n):
+    """Parse 'LO:HI' into a node range within 0..n"""
+    try:
+        lo, hi = (int(v) for v in text.split(':'))
+    except ValueError:
+        raise ValueError(f"expected LO:HI, got '{text}'")
+    if not 0 <= lo < hi <= n:
+        raise ValueError(f"range {lo}:{hi} is outside 0:{n}")
+    return lo, hi
+
+def print_report(summary):
+    """Print the statistics report from a summary dict"""
+    print("\n=== SSA Search Statistics ===")
+    print(f"Total nodes: {summary['nodes']}")
+    print(f"Total edge visits: {summary['total_visits']}")
+    print(f"Average visits per node: {summary['mean']:.2f}")
+    print(f"Most visited node: {summary['most_visited'][0]} ({summary['most_visited'][1]} visits)")
+    print(f"Least visited node: {summary['least_visited'][0]} ({summary['least_visited'][1]} visits)")
+    print(f"Visit standard deviation: {summary['std']:.2f}")
 
-    # Median (50th percentile)
-    mid = len(sorted_visits) // 2
-    median_val = sorted_visits[mid] if sorted_visits else 0
-    print(f"  Median: {int(median_val)}")
+    print(f"\nTop {len(summary['top'])} most visited nodes:")
+    for i, (idx, visits) in enumerate(summary['top']):
+        print(f"  {i+1}. Node {idx}: {visits} visits")
 
-    # 75th percentile
-    idx75 = int(len(sorted_visits) * 0.75)
-    percentile75 = sorted_visits[idx75] if sorted_visits else 0
-    print(f"  75th percentile: {percentile75}")
+    print("\nVisit distribution:")
+    print(f"  Min: {summary['min']}")
+    print(f"  25th percentile: {summary['p25']}")
+    print(f"  Median: {summary['median']}")
+    print(f"  75th percentile: {summary['p75']}")
+    print(f"  Max: {summary['max']}")
 
-    # Max value
-    max_visits = max(visit_list) if visit_list else 0
-    print(f"  Max: {max_visits}")
+def print_statistics(visit_counts, visit_matrix=None, top_k=5):
+    """Print detailed statistics about the visit patterns"""
+    print_report(streaming_statistics(visit_counts, top_k))
+
+def streaming_statistics(visit_counts, top_k=5):
+    """Summary dict of the node visit counts for print_report, without sorting them.
+
+    Only the n node counts are needed, not the matrix, so the report is exact
+    in --stream mode too: percentiles come from one np.partition at the
+    25/50/75% ranks, and the top nodes from an np.argpartition, with ties
+    broken by lowest node id.
+    """
+    counts = np.asarray(visit_counts, dtype=np.int64)
+    n = len(counts)
+    if n == 0:
+        return dict(nodes=0, total_visits=0, mean=0.0, most_visited=(0, 0), least_visited=(0, 0),
+                    std=0.0, top=[], min=0, p25=0, median=0, p75=0, max=0)
+    ranks = np.partition(counts, [int(n * 0.25), n // 2, int(n * 0.75)])
+    top_k = min(top_k, n)
+    top = []
+    if top_k:
+        # Every node tied with the k-th largest count is a candidate
+        kth = counts[np.argpartition(counts, n - top_k)[n - top_k]]
+        candidates = np.flatnonzero(counts >= kth)
+        top = candidates[np.lexsort((candidates, -counts[candidates]))][:top_k]
+    return dict(
+        nodes=n,
+        # Every edge visit is counted at both of its nodes
+        total_visits=int(counts.sum()) // 2,
+        mean=counts.mean(),
+        most_visited=(int(counts.argmax()), int(counts.max())),
+        least_visited=(int(counts.argmin()), int(counts.min())),
+        std=counts.std(),
+        top=[(int(i), int(counts[i])) for i in top],
+        min=int(counts.min()),
+        p25=int(ranks[int(n * 0.25)]),
+        median=int(ranks[n // 2]),
+        p75=int(ranks[int(n * 0.75)]),
+        max=int(counts.max()),
+    )
 
 def main():
     parser = argparse.ArgumentParser(description="Generate histogram from SSA visit matrix")
     parser.add_argument('--matrix', type=str, default='visit_matrix.txt',
-                       help='Input visit matrix file (default: visit_matrix.txt)')
+                       help='Input visit matrix file, text or .npy (default: visit_matrix.txt, '
+                            'or visit_matrix.npy if that one is newer)')
     parser.add_argument('--visits', type=str, default='node_visits.txt',
                        help='Input node visits file (default: node_visits.txt)')
     parser.add_argument('--stats', type=str, default='route_stats.txt',
@@ -250,12 +373,37 @@ def main():
                        help='Print detailed statistics')
     parser.add_argument('--no-heatmap', action='store_true',
                        help='Skip heatmap generation')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read the visit matrix in row chunks and compute statistics in one pass '
+                            '(for matrices that do not fit in memory)')
+    parser.add_argument('--chunk-rows', type=int, default=256,
+                       help='Matrix rows per chunk in --stream mode (default: 256)')
+    parser.add_argument('--top-k', type=int, default=5,
+                       help='Number of most visited nodes to report (default: 5)')
+    parser.add_argument('--heatmap-size', type=int, default=512,
+                       help='Pool the heatmap to at most this many cells per side (default: 512)')
+    parser.add_argument('--heatmap-reduce', choices=HEATMAP_REDUCTIONS, default='sum',
+                       help='How pooled cells combine visits (default: sum)')
+    parser.add_argument('--coords', type=str, default='coords.csv',
+                       help='Node coordinates used to order nodes before pooling (default: coords.csv)')
+    parser.add_argument('--no-reorder', action='store_true',
+                       help='Pool nodes in id order instead of by position')
+    parser.add_argument('--zoom', type=str, default=None, metavar='LO:HI',
+                       help='Also plot nodes LO..HI-1 at full resolution')
+    parser.add_argument('--zoom-heatmap', type=str, default='visit_heatmap_zoom.png',
+                       help='Output file for --zoom (default: visit_heatmap_zoom.png)')
 
     args = parser.parse_args()
 
+    if args.chunk_rows <= 0 or args.top_k < 0 or args.heatmap_size <= 0:
+        print("Error: --chunk-rows and --heatmap-size must be positive and --top-k non-negative")
+        sys.exit(1)
+
     # Check if files exist
+    args.matrix = resolve_matrix_file(args.matrix)
     matrix_exists = os.path.exists(args.matrix)
-    visits_exists = os.path.exists(args.visits)
+    # Streaming mode derives the counts from the matrix alone
+    visits_exists = args.stream or os.path.exists(args.visits)
 
     if not matrix_exists or not visits_exists:
         print("Error: Required input files not found:")
@@ -266,9 +414,17 @@ def main():
         print("Make sure to run the C optimization program first (./ssa_sim graph.csv best_route.txt)")
         sys.exit(1)
 
-    # Load visit counts directly if available
-    print(f"Loading node visit counts from {args.visits}...")
-    visit_counts = load_node_visits(args.visits)
+    if args.stream:
+        print(f"Streaming visit matrix from {args.matrix} in chunks of {args.chunk_rows} rows...")
+        try:
+            visit_counts = stream_node_visit_counts(args.matrix, args.chunk_rows)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {args.matrix}: {e}")
+            sys.exit(1)
+    else:
+        # Load visit counts directly if available
+        print(f"Loading node visit counts from {args.visits}...")
+        visit_counts = load_node_visits(args.visits)
 
     if visit_counts is None:
         # Fall back to calculating from matrix if direct file not available
@@ -284,9 +440,17 @@ def main():
         print(f"Loading route statistics from {args.stats}...")
         route_stats = load_route_stats(args.stats)
 
-    # Load visit matrix for heatmap (if needed)
+    zoom = None
+    if args.zoom:
+        try:
+            zoom = parse_node_range(args.zoom, len(visit_counts))
+        except ValueError as e:
+            print(f"Error: --zoom: {e}")
+            sys.exit(1)
+
+    # Load visit matrix for heatmap (if needed); streaming re-reads it in chunks instead
     visit_matrix = None
-    if not args.no_heatmap:
+    if not args.no_heatmap and not args.stream:
         print(f"Loading visit matrix from {args.matrix}...")
         visit_matrix = load_visit_matrix(args.matrix)
         if visit_matrix is None and not args.no_heatmap:
@@ -297,15 +461,28 @@ def main():
     most_visited, max_visits = generate_histogram(visit_counts, args.histogram)
 
     # Generate heatmap unless disabled
-    if not args.no_heatmap and visit_matrix is not None:
-        generate_heatmap(visit_matrix, args.heatmap)
+    if not args.no_heatmap and (visit_matrix is not None or args.stream):
+        n = len(visit_counts)
+        order = None
+        # Reordering only matters when nodes are pooled into blocks
+        if n > args.heatmap_size and not args.no_reorder and os.path.exists(args.coords):
+            print(f"Ordering nodes by position from {args.coords}...")
+            order = node_order(args.coords, n)
+        if args.stream:
+            pooled, block = pool_visit_matrix(iter_visit_matrix_rows(args.matrix, args.chunk_rows), n,
+                                              args.heatmap_size, args.heatmap_reduce, order)
+            plot_heatmap(pooled, args.heatmap, block, reduce=args.heatmap_reduce, ordered=order is not None)
+        else:
+            generate_heatmap(visit_matrix, args.heatmap, args.heatmap_size, args.heatmap_reduce, order)
+        if zoom:
+            rows = (iter_visit_matrix_rows(args.matrix, args.chunk_rows) if args.stream
+                    else matrix_row_blocks(visit_matrix))
+            plot_heatmap(crop_visit_matrix(rows, *zoom), args.zoom_heatmap, first_node=zoom[0],
+                         title=f"Visit Matrix Nodes {zoom[0]}-{zoom[1] - 1}")
 
     # Print statistics if requested
     if args.print_stats:
-        if visit_matrix is not None:
-            print_statistics(visit_counts, visit_matrix)
-        else:
-            print_statistics(visit_counts, None)
+        print_statistics(visit_counts, top_k=args.top_k)
 
     print(f"\nSummary:")
     print(f"  Most visited node: {most_visited} ({max_visits} visits)")
@@ -321,6 +498,8 @@ def main():
     output_files = f"  Output files: {args.histogram}"
     if not args.no_heatmap:
         output_files += f", {args.heatmap}"
+        if zoom:
+            output_files += f", {args.zoom_heatmap}"
     print(output_files)
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+"""Graph file formats and loaders shared by the Python tools.
+
+Besides the dense `graph.csv` text matrix, graphs can be stored in a compact
+binary CSR file (`.ssag`) that is memory-mapped on load. Layout (version 1,
+little-endian):
+
+    offset 0   magic      4 bytes  b'SSAG'
+    offset 4   version    uint32
+    offset 8   num_nodes  uint64
+    offset 16  num_edges  uint64
+    offset 24  flags      uint32   (bit 0: coordinates present)
+    offset 28  reserved   uint32
+    offset 32  indptr     int64[num_nodes + 1]   row offsets
+               indices    int32[num_edges]       column indices, sorted per row
+               weights    float32[num_edges]
+               coords     float64[num_nodes, 2]  only if flag bit 0 is set
+"""
+import itertools
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+GRAPH_MAGIC = b'SSAG'
+GRAPH_VERSION = 1
+GRAPH_FLAG_COORDS = 1
+GRAPH_FORMATS = ('auto', 'csv', 'bin')
+BIN_EXTENSIONS = ('.ssag', '.bin')
+
+_HEADER = struct.Struct('<4sIQQII')
+
+GraphCSR = namedtuple('GraphCSR', ['num_nodes', 'indptr', 'indices', 'weights', 'coords'])
+
+
+def detect_graph_format(filename, graph_format='auto'):
+    """Resolve 'auto' to 'csv' or 'bin' from the file extension"""
+    if graph_format != 'auto':
+        return graph_format
+    if os.path.splitext(filename)[1].lower() in BIN_EXTENSIONS:
+        return 'bin'
+    return 'csv'
+
+
+def edges_to_csr(n, edges):
+    """Build CSR arrays from a (src, dst, weights) edge list"""
+    src, dst, weights = (np.asarray(a) for a in edges)
+    order = np.lexsort((dst, src))
+    counts = np.bincount(src, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), weights[order].astype(np.float32)
+
+
+def dense_to_edges(adj_matrix):
+    """Extract the (src, dst, weights) edge list of a dense adjacency matrix"""
+    adj_matrix = np.asarray(adj_matrix)
+    src, dst = np.nonzero(adj_matrix > 0)
+    return src.astype(np.int32), dst.astype(np.int32), adj_matrix[src, dst]
+
+
+def csr_to_edges(graph):
+    """Expand a GraphCSR into (src, dst, weights) arrays"""
+    counts = np.diff(graph.indptr)
+    src = np.repeat(np.arange(graph.num_nodes, dtype=np.int32), counts)
+    return src, np.asarray(graph.indices), np.asarray(graph.weights)
+
+
+def csr_to_dense(graph):
+    """Expand a GraphCSR into a dense float64 adjacency matrix"""
+    src, dst, weights = csr_to_edges(graph)
+    adj_matrix = np.zeros((graph.num_nodes, graph.num_nodes))
+    adj_matrix[src, dst] = weights
+    return adj_matrix
+
+
+def load_graph_csv(filename, chunk_rows=1024):
+    """Parse a dense graph CSV into (n, src, dst, weights) edge arrays.
+
+    The file is a node-count line followed by n comma-separated rows. Rows are
+    parsed chunk_rows at a time with np.loadtxt, so only one block of the
+    dense matrix is ever held in memory.
+    """
+    with open(filename) as f:
+        n = int(f.readline().split(',')[0])
+        parts = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))]
+        for lo in range(0, n, chunk_rows):
+            rows = min(chunk_rows, n - lo)
+            block = np.loadtxt(itertools.islice(f, rows), delimiter=',', ndmin=2)
+            if block.shape != (rows, n):
+                raise ValueError(f"{filename}: expected {n} rows of {n} values, "
+                                 f"got a {block.shape[0]}x{block.shape[1]} block at row {lo}")
+            src, dst = np.nonzero(block > 0)
+            parts.append((src + lo, dst, block[src, dst]))
+    src, dst, weights = (np.concatenate(a) for a in zip(*parts))
+    return n, src.astype(np.int32), dst.astype(np.int32), weights
+
+
+def load_graph_edges(filename, graph_format='auto'):
+    """Load a dense CSV or binary graph as (n, src, dst, weights) edge arrays"""
+    if detect_graph_format(filename, graph_format) == 'bin':
+        graph = load_graph_bin(filename)
+        return (graph.num_nodes,) + csr_to_edges(graph)
+    return load_graph_csv(filename)
+
+
+def load_digraph(filename, graph_format='auto'):
+    """Load a graph file into a weighted networkx DiGraph in one bulk call"""
+    # Imported here so the array loaders work without networkx
+    import networkx as nx
+    _, src, dst, weights = load_graph_edges(filename, graph_format)
+    G = nx.DiGraph()
+    G.add_weighted_edges_from(zip(src.tolist(), dst.tolist(), weights.tolist()))
+    return G
+
+
+def save_graph_bin(filename, n, edges, coords=None):
+    """Save an edge list (and optional coordinates) in the binary CSR format"""
+    indptr, indices, weights = edges_to_csr(n, edges)
+    flags = GRAPH_FLAG_COORDS if coords is not None else 0
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(GRAPH_MAGIC, GRAPH_VERSION, n, len(indices), flags, 0))
+        f.write(indptr.astype('<i8').tobytes())
+        f.write(indices.astype('<i4').tobytes())
+        f.write(weights.astype('<f4').tobytes())
+        if coords is not None:
+            f.write(np.asarray(coords, dtype='<f8').reshape(n, 2).tobytes())
+
+
+def load_graph_bin(filename):
+    """Memory-map a binary CSR graph; the returned arrays are read-only views"""
+    with open(filename, 'rb') as f:
+        header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{filename}: truncated graph header")
+    magic, version, n, nnz, flags, _ = _HEADER.unpack(header)
+    if magic != GRAPH_MAGIC:
+        raise ValueError(f"{filename}: not a binary graph file")
+    if version != GRAPH_VERSION:
+        raise ValueError(f"{filename}: unsupported graph format version {version}")
+
+    offset = _HEADER.size
+    indptr = np.memmap(filename, dtype='<i8', mode='r', offset=offset, shape=(n + 1,))
+    offset += 8 * (n + 1)
+    # np.memmap refuses zero-length maps, so empty sections become empty arrays
+    if nnz:
+        indices = np.memmap(filename, dtype='<i4', mode='r', offset=offset, shape=(nnz,))
+        weights = np.memmap(filename, dtype='<f4', mode='r', offset=offset + 4 * nnz, shape=(nnz,))
+    else:
+        indices = np.zeros(0, dtype='<i4')
+        weights = np.zeros(0, dtype='<f4')
+    offset += 8 * nnz
+    coords = None
+    if flags & GRAPH_FLAG_COORDS and n:
+        coords = np.memmap(filename, dtype='<f8', mode='r', offset=offset, shape=(n, 2))
+    return GraphCSR(n, indptr, indices, weights, coords)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Import-time benchmark for the command-line scripts.
+
+Each script is imported in a fresh interpreter under `python -X importtime`
+and the cumulative time of its own import is read from the report (best of
+`--repeat` runs, after one untimed run that compiles the bytecode). Two
+checks guard against startup regressions:
+
+- Scripts that only draw on some paths must not import matplotlib or
+  networkx at module level, and the renderers must not import pyplot or
+  networkx. This check does not depend on machine speed.
+- With `--baseline`, scripts slower to import than the baseline by more than
+  `--tolerance` are listed.
+
+Either failure exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts whose plotting and graph libraries must be loaded lazily
+LAZY_MODULES = ('map_generator', 'draw_map', 'generate_histogram', 'traffic_simulator', 'reoptimize',
+                'route_server', 'load_test', 'benchmark')
+# Scripts that always render; they may use matplotlib's Figure/Agg classes directly
+RENDER_MODULES = ('batch_render', 'map_tiles', 'animate_ssa')
+# module -> packages it must not import at module level
+FORBIDDEN = {
+    **{name: ('matplotlib', 'networkx') for name in LAZY_MODULES},
+    **{name: ('matplotlib.pyplot', 'networkx') for name in RENDER_MODULES},
+}
+# Differences below this are too noisy to count as regressions
+NOISE_FLOOR_MS = 20.0
+
+
+def parse_importtime(report):
+    """{module: cumulative microseconds} from a -X importtime report"""
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # the header line
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def import_report(module):
+    """Import `module` in a new interpreter and return its parsed importtime report"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=SCRIPT_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(proc.stderr)
+
+
+def measure(module, repeat):
+    """Return (best import milliseconds, forbidden packages imported) for one script"""
+    import_report(module)
+    best = float('inf')
+    for _ in range(repeat):
+        times = import_report(module)
+        best = min(best, times[module] / 1000)
+    heavy = [name for name in FORBIDDEN.get(module, ()) if name in times]
+    return best, heavy
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against the baseline"""
+    previous = {r['module']: r for r in baseline.get('results', [])}
+    regressions = []
+    for record in results:
+        old = previous.get(record['module'])
+        if old is None:
+            continue
+        if (record['import_ms'] - old['import_ms'] > NOISE_FLOOR_MS
+                and record['import_ms'] > old['import_ms'] * (1 + tolerance)):
+            regressions.append(f"{record['module']}: import {old['import_ms']:.1f} ms -> "
+                               f"{record['import_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    modules = list(LAZY_MODULES + RENDER_MODULES)
+    parser = argparse.ArgumentParser(description="Measure and check the import time of the Python scripts")
+    parser.add_argument('--modules', nargs='+', choices=modules, default=modules,
+                        help='Scripts to import (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed imports per script (default: 5)')
+    parser.add_argument('--output', type=str, default='import_times.json',
+                        help='Output JSON file (default: import_times.json)')
+    parser.add_argument('--baseline', type=str, default=None, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', type=str, default=None,
+                        help='Also write the results to this baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown before flagging a regression (default: 0.25)')
+    args = parser.parse_args()
+
+    if args.repeat <= 0:
+        print("Error: --repeat must be positive")
+        return 1
+
+    results = []
+    failures = []
+    for module in args.modules:
+        try:
+            import_ms, heavy = measure(module, args.repeat)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            return 1
+        results.append({'module': module, 'import_ms': round(import_ms, 2), 'heavy': heavy})
+        print(f"{module:<20} {import_ms:8.1f} ms" + (f"  imports {', '.join(heavy)}" if heavy else ""))
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at module level")
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Import times written to {path}")
+
+    baseline = args.baseline
+    if baseline and not os.path.exists(baseline):
+        print(f"Warning: Baseline '{baseline}' not found, skipping comparison")
+        baseline = None
+    if baseline:
+        with open(baseline) as f:
+            failures += compare(results, json.load(f), args.tolerance)
+    if failures:
+        print(f"\n{len(failures)} import regression(s):")
+        for line in failures:
+            print(f"  - {line}")
+        return 1
+    print("No import regressions" + (f" against {baseline}" if baseline else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
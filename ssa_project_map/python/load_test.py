@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Load test for route_server.py.
+
+Opens --concurrency keep-alive connections and sends --requests route
+queries drawn from --distinct different request bodies, so repeated bodies
+exercise the server's result cache. Reports latency percentiles, throughput
+and the fraction of answers served from the cache.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+# Same default as route_server.py, without importing the server and its dependencies
+DEFAULT_PORT = 8765
+
+
+class RouteClient:
+    """One keep-alive HTTP/1.1 connection to the route server"""
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, unix_path=None):
+        self.host, self.port, self.unix_path = host, port, unix_path
+        self.reader = self.writer = None
+
+    async def connect(self):
+        if self.unix_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        """Send one request and return (status, decoded JSON body)"""
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+                          + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+def make_requests(rng, num_nodes, distinct, stops, max_iter, pop_size, local_search):
+    """`distinct` different /route bodies over random stop sets"""
+    stops = min(stops, num_nodes)
+    bodies = []
+    for i in range(distinct):
+        nodes = rng.choice(num_nodes, stops, replace=False).tolist()
+        body = {'stops': nodes, 'start': nodes[0], 'max_iter': max_iter, 'pop_size': pop_size, 'seed': i}
+        if local_search:
+            body['local_search'] = True
+        bodies.append(body)
+    return bodies
+
+
+async def run_load(args):
+    probe = RouteClient(args.host, args.port, args.unix)
+    await probe.connect()
+    status, health = await probe.request('GET', '/health')
+    await probe.close()
+    if status != 200:
+        raise RuntimeError(f"/health returned {status}: {health}")
+
+    rng = np.random.default_rng(args.seed)
+    bodies = make_requests(rng, health['nodes'], args.distinct, args.stops, args.max_iter, args.pop_size,
+                           args.local_search)
+    schedule = rng.integers(0, len(bodies), args.requests)
+    latencies = np.zeros(args.requests)
+    cached = np.zeros(args.requests, dtype=bool)
+    errors = []
+    next_index = 0
+
+    async def client_loop():
+        nonlocal next_index
+        client = RouteClient(args.host, args.port, args.unix)
+        await client.connect()
+        try:
+            while next_index < args.requests:
+                i = next_index
+                next_index += 1
+                start = time.perf_counter()
+                status, reply = await client.request('POST', '/route', bodies[schedule[i]])
+                latencies[i] = time.perf_counter() - start
+                if status != 200:
+                    errors.append(f"{status}: {reply.get('error')}")
+                else:
+                    cached[i] = reply['cached']
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - start
+    return health, latencies, cached, errors, wall
+
+
+def main():
+    p = argparse.ArgumentParser(description="Load test the route server: latency percentiles and throughput.")
+    p.add_argument('--host', type=str, default='127.0.0.1', help="Server address (default: 127.0.0.1)")
+    p.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Server TCP port (default: {DEFAULT_PORT})")
+    p.add_argument('--unix', type=str, default=None, help="Connect to this Unix socket instead of TCP")
+    p.add_argument('--requests', type=int, default=1000, help="Total route requests (default: 1000)")
+    p.add_argument('--concurrency', type=int, default=16, help="Concurrent connections (default: 16)")
+    p.add_argument('--distinct', type=int, default=50,
+                   help="Different request bodies; fewer means more cache hits (default: 50)")
+    p.add_argument('--stops', type=int, default=20, help="Stops per request (default: 20)")
+    p.add_argument('--max-iter', type=int, default=50, help="SSA iterations per request (default: 50)")
+    p.add_argument('--pop-size', type=int, default=20, help="SSA population per request (default: 20)")
+    p.add_argument('--local-search', action='store_true', help="Ask for local search in every request")
+    p.add_argument('--output', type=str, default=None, help="Also write the summary as JSON to this file")
+    p.add_argument('--seed', type=int, default=0, help="Random seed for the request mix (default: 0)")
+    args = p.parse_args()
+
+    for name in ('requests', 'concurrency', 'distinct', 'stops', 'max_iter', 'pop_size'):
+        if getattr(args, name) <= 0:
+            print(f"Error: --{name.replace('_', '-')} must be positive")
+            return 1
+
+    try:
+        health, latencies, cached, errors, wall = asyncio.run(run_load(args))
+    except (OSError, RuntimeError) as e:
+        print(f"Error: Cannot reach the route server: {e}")
+        return 1
+
+    ms = latencies * 1000
+    summary = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'errors': len(errors),
+        'cache_hit_rate': round(float(cached.mean()), 4),
+        'wall_time': round(wall, 4),
+        'requests_per_second': round(args.requests / wall, 2),
+        'latency_ms': {
+            'mean': round(float(ms.mean()), 3),
+            'p50': round(float(np.percentile(ms, 50)), 3),
+            'p90': round(float(np.percentile(ms, 90)), 3),
+            'p99': round(float(np.percentile(ms, 99)), 3),
+            'max': round(float(ms.max()), 3),
+        },
+        'graph_version': health['graph_version'],
+    }
+    print(f"{args.requests} requests over {args.concurrency} connections in {wall:.2f}s: "
+          f"{summary['requests_per_second']:.1f} req/s, {len(errors)} errors, "
+          f"{100 * summary['cache_hit_rate']:.1f}% from cache")
+    lat = summary['latency_ms']
+    print(f"Latency (ms): mean {lat['mean']:.2f}  p50 {lat['p50']:.2f}  p90 {lat['p90']:.2f}  "
+          f"p99 {lat['p99']:.2f}  max {lat['max']:.2f}")
+    for error in errors[:5]:
+        print(f"  {error}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Summary written to {args.output}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
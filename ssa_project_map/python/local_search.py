@@ -0,0 +1,183 @@
+"""2-opt and Or-opt local search for the memetic SSA stage.
+
+Moves are only tried between a node and its k nearest neighbours (by node
+coordinates), and don't-look bits keep a queue of nodes whose surroundings
+changed, so an improvement pass after a small perturbation only re-examines a
+handful of nodes. Routes are open paths (no edge from the last node back to
+the first) and costs are assumed symmetric, as produced by
+generate_random_graph and the shortest-path cost matrix.
+"""
+from collections import deque
+
+import numpy as np
+
+# Gains below this are treated as zero to avoid cycling on rounding noise
+_EPS = 1e-9
+# Longest segment moved by Or-opt
+OR_OPT_MAX_SEGMENT = 3
+
+
+def nearest_neighbors(coords, k, chunk_size=1024):
+    """Return an (n, k) int32 array with the k nearest other nodes of each node"""
+    coords = np.asarray(coords, dtype=np.float64)
+    n = len(coords)
+    k = max(0, min(k, n - 1))
+    result = np.zeros((n, k), dtype=np.int32)
+    if k == 0:
+        return result
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        d = ((coords[lo:hi, None, :] - coords[None, :, :]) ** 2).sum(axis=2)
+        # Nodes without coordinates (NaN) rank after every placed node, but never the node itself
+        d[np.isnan(d)] = np.finfo(np.float64).max
+        d[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(d, nearest, axis=1), axis=1)
+        result[lo:hi] = np.take_along_axis(nearest, order, axis=1)
+    return result
+
+
+def improve_route(route, cost_matrix, neighbors, active=None):
+    """Apply improving 2-opt and Or-opt moves until no active node can improve.
+
+    `active` lists the nodes to examine first (default: all). Returns the
+    improved route as a list and the total cost reduction.
+    """
+    route = [int(v) for v in route]
+    n = len(route)
+    if n < 3:
+        return route, 0.0
+    cost = cost_matrix.item
+    neighbors = neighbors.tolist() if hasattr(neighbors, 'tolist') else neighbors
+    pos = [0] * n
+    for i, v in enumerate(route):
+        pos[v] = i
+
+    def c(u, v):
+        # Missing neighbours at the ends of the path cost nothing
+        if u < 0 or v < 0:
+            return 0.0
+        return cost(u, v)
+
+    def succ(i):
+        return route[i + 1] if i + 1 < n else -1
+
+    def pred(i):
+        return route[i - 1] if i > 0 else -1
+
+    queue = deque(range(n) if active is None else (int(v) for v in active))
+    queued = [False] * n
+    for v in queue:
+        queued[v] = True
+
+    def wake(*nodes):
+        for v in nodes:
+            if v >= 0 and not queued[v]:
+                queued[v] = True
+                queue.append(v)
+
+    def reverse(i, j):
+        route[i:j + 1] = route[i:j + 1][::-1]
+        for p in range(i, j + 1):
+            pos[route[p]] = p
+
+    total_gain = 0.0
+    while queue:
+        a = queue.popleft()
+        queued[a] = False
+        improved = False
+        for b in neighbors[a]:
+            if b == a:
+                continue
+            i, j = pos[a], pos[b]
+            lo, hi = min(i, j), max(i, j)
+            # 2-opt, successor side: link a-b and their successors
+            gain = c(a, succ(i)) + c(b, succ(j)) - c(a, b) - c(succ(i), succ(j))
+            if gain > _EPS:
+                wake(a, b, succ(i), succ(j))
+                reverse(lo + 1, hi)
+                total_gain += gain
+                improved = True
+                break
+            # 2-opt, predecessor side: link a-b and their predecessors
+            gain = c(pred(i), a) + c(pred(j), b) - c(a, b) - c(pred(i), pred(j))
+            if gain > _EPS:
+                wake(a, b, pred(i), pred(j))
+                reverse(lo, hi - 1)
+                total_gain += gain
+                improved = True
+                break
+            # Or-opt: move a segment starting at a next to b
+            gain = _or_opt(route, pos, c, a, b, wake)
+            if gain > _EPS:
+                total_gain += gain
+                improved = True
+                break
+        if improved:
+            wake(a)
+    return route, total_gain
+
+
+def _or_opt(route, pos, c, a, b, wake):
+    """Try moving a segment of up to OR_OPT_MAX_SEGMENT nodes starting at a
+    to sit right after or before b. Applies the best improving move in place
+    and returns its gain (0.0 if none)."""
+    n = len(route)
+    i, j = pos[a], pos[b]
+    best = (_EPS, None)
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        end = i + length - 1
+        if end >= n or i <= j <= end:
+            break
+        first, last = route[i], route[end]
+        p = route[i - 1] if i > 0 else -1
+        q = route[end + 1] if end + 1 < n else -1
+        removal = c(p, first) + c(last, q) - c(p, q)
+        # Insert between b and its successor, or between its predecessor and b
+        for left, right in ((j, j + 1), (j - 1, j)):
+            if left < -1 or right > n or left == i - 1 or right == end + 1:
+                continue
+            u = route[left] if left >= 0 else -1
+            v = route[right] if right < n else -1
+            if u < 0 and v < 0:
+                continue
+            forward = c(u, first) + c(last, v)
+            backward = c(u, last) + c(first, v)
+            insertion = min(forward, backward) - c(u, v)
+            gain = removal - insertion
+            if gain > best[0]:
+                best = (gain, (end, left, backward < forward, p, q, u, v))
+    gain, move = best
+    if move is None:
+        return 0.0
+    end, left, flip, p, q, u, v = move
+    segment = route[i:end + 1]
+    if flip:
+        segment.reverse()
+    del route[i:end + 1]
+    # Positions after the removed block shift left by its length
+    insert_at = left + 1 if left < i else left + 1 - len(segment)
+    route[insert_at:insert_at] = segment
+    lo = min(i, insert_at)
+    hi = max(end, insert_at + len(segment) - 1)
+    for k in range(lo, hi + 1):
+        pos[route[k]] = k
+    wake(p, q, u, v, segment[0], segment[-1])
+    return gain
+
+
+def make_local_search(cost_matrix, neighbors, check_symmetric=True):
+    """Return an improve(route, active) callable for ssa_engine.ssa_evolve.
+
+    2-opt reverses segments, which only preserves costs for symmetric
+    matrices; asymmetric matrices are rejected unless the caller already
+    checked and passes check_symmetric=False.
+    """
+    cost_matrix = np.asarray(cost_matrix, dtype=np.float64)
+    if check_symmetric and not np.allclose(cost_matrix, cost_matrix.T):
+        raise ValueError("Local search requires a symmetric cost matrix")
+    neighbor_lists = neighbors.tolist() if hasattr(neighbors, 'tolist') else neighbors
+
+    def improve(route, active=None):
+        return improve_route(route, cost_matrix, neighbor_lists, active)
+    return improve
@@ -1,36 +1,106 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import networkx as nx
 import random
 import argparse
 import csv
-import math
-from functools import reduce
+import time
+from contextlib import ExitStack
+
+from graph_io import GRAPH_FORMATS, detect_graph_format, save_graph_bin
+from draw_map import load_jams, load_places
+from local_search import make_local_search, nearest_neighbors
+from plotting import pyplot
+from result_cache import DEFAULT_MAX_CACHE_MB, load_result, result_key, store_result
+from route_penalties import DEFAULT_BUILDING_PENALTY, DEFAULT_JAM_PENALTY, edge_penalties, penalized_adjacency
+import ssa_native
+from ssa_engine import ssa_search
+from ssa_parallel import ssa_search_parallel
+from telemetry import TelemetryWriter
+from visit_tracking import EdgeVisits, save_visit_files
+from shortest_paths import DEFAULT_CACHE_DIR, cached_shortest_paths, expand_route, route_cost_matrix
+
+ENGINES = ('python', 'c')
 
 # ---------------- Graph Generation ----------------
-def generate_random_graph(n, density):
-    # Generate random coordinates
-    coords = []
-    for _ in range(n):
-        coords.append([random.random(), random.random()])
-    coords = np.array(coords)
-
-    # Create adjacency matrix
+def _grid_neighbor_pairs(coords, radius, chunk_size=65536):
+    """Yield (i, j, dist) arrays for all ordered pairs closer than radius.
+
+    Nodes are bucketed into a uniform grid of cell size `radius`, so each node
+    is only compared against the nodes in its own and the 8 surrounding cells.
+    Distances are computed in batches of `chunk_size` query nodes.
+    """
+    n = len(coords)
+    cells = np.floor(coords / radius).astype(np.int64)
+    cells -= cells.min(axis=0)
+    ncols = int(cells[:, 1].max()) + 3
+    # Shift by one so neighbour offsets of -1 stay non-negative
+    cell_id = (cells[:, 0] + 1) * ncols + (cells[:, 1] + 1)
+
+    order = np.argsort(cell_id, kind='stable')
+    sorted_ids = cell_id[order]
+
+    for lo in range(0, n, chunk_size):
+        query = np.arange(lo, min(lo + chunk_size, n))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                target = cell_id[query] + dx * ncols + dy
+                start = np.searchsorted(sorted_ids, target, side='left')
+                stop = np.searchsorted(sorted_ids, target, side='right')
+                counts = stop - start
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                # Expand every query node against each member of its target cell
+                i = np.repeat(query, counts)
+                first = np.repeat(start - np.cumsum(counts) + counts, counts)
+                j = order[first + np.arange(total)]
+                diff = coords[i] - coords[j]
+                dist = np.sqrt((diff ** 2).sum(axis=1))
+                keep = (i != j) & (dist < radius)
+                yield i[keep], j[keep], dist[keep]
+
+def generate_random_edges(n, density):
+    """Generate random coordinates and a sparse edge list.
+
+    Returns ((src, dst, weights), coords) with edges sorted by (src, dst).
+    Weights match the dense generator: distance * 100 rounded to 2 decimals.
+    """
+    coords = np.array([[random.random(), random.random()] for _ in range(n)]).reshape(n, 2)
+
+    src, dst, dist = [], [], []
+    if density > 0 and n > 1:
+        for i, j, d in _grid_neighbor_pairs(coords, density):
+            src.append(i)
+            dst.append(j)
+            dist.append(d)
+    if src:
+        src = np.concatenate(src).astype(np.int32)
+        dst = np.concatenate(dst).astype(np.int32)
+        weights = np.round(np.concatenate(dist) * 100, 2)
+    else:
+        src = np.zeros(0, dtype=np.int32)
+        dst = np.zeros(0, dtype=np.int32)
+        weights = np.zeros(0)
+
+    order = np.lexsort((dst, src))
+    return (src[order], dst[order], weights[order]), coords
+
+def edges_to_dense(n, edges):
+    """Expand a (src, dst, weights) edge list into a dense adjacency matrix"""
+    src, dst, weights = edges
     adj_matrix = np.zeros((n, n))
+    adj_matrix[src, dst] = weights
+    return adj_matrix
 
-    # Fill adjacency matrix based on distance
-    for i in range(n):
-        for j in range(n):
-            if i != j:
-                # Calculate Euclidean distance
-                dx = coords[i][0] - coords[j][0]
-                dy = coords[i][1] - coords[j][1]
-                dist = math.sqrt(dx**2 + dy**2)
-
-                if dist < density:
-                    adj_matrix[i][j] = round(dist * 100, 2)
+def generate_random_graph(n, density, sparse=False):
+    """Generate a random geometric graph.
 
-    return adj_matrix, coords
+    Nodes closer than `density` are connected. Returns (adj_matrix, coords),
+    or ((src, dst, weights), coords) when `sparse` is set.
+    """
+    edges, coords = generate_random_edges(n, density)
+    if sparse:
+        return edges, coords
+    return edges_to_dense(n, edges), coords
 
 def save_graph_to_csv(adj_matrix, filename):
     """Save adjacency matrix to CSV format for C program"""
@@ -43,6 +113,14 @@ def save_graph_to_csv(adj_matrix, filename):
                 row.append(str(adj_matrix[i][j]))
             f.write(','.join(row) + '\n')
 
+def save_edges_to_csv(n, edges, filename):
+    """Save a sparse edge list as CSV (header row, then src,dst,weight per edge)"""
+    src, dst, weights = edges
+    with open(filename, 'w') as f:
+        f.write(f"{n}\n")
+        for i, j, w in zip(src.tolist(), dst.tolist(), weights.tolist()):
+            f.write(f"{i},{j},{w}\n")
+
 def save_coords_to_csv(coords, filename):
     """Save coordinates to CSV format"""
     with open(filename, 'w') as f:
@@ -55,55 +133,47 @@ def save_coords_to_csv(coords, filename):
 def evaluate_route(adj_matrix, route):
     return sum(adj_matrix[route[i-1], route[i]] for i in range(1, len(route)))
 
-def ssa_optimize(adj_matrix, max_iter=100, population_size=30):
-    n = len(adj_matrix)
-    # Visit tracking
-    visit_counts = np.array([0] * n)
-
-    # Initial population: random permutations
-    population = []
-    for _ in range(population_size):
-        perm = list(range(n))
-        random.shuffle(perm)
-        population.append(perm)
-
-    fitness = [evaluate_route(adj_matrix, route) for route in population]
-
-    # Find best route
-    best_idx = fitness.index(min(fitness))
-    best_route = population[best_idx]
-    best_fitness = min(fitness)
-
-    for iteration in range(max_iter):
-        # Producer (top 20%) randomly swaps two nodes
-        producers = population[:max(population_size // 5, 1)]
-        for route in producers:
-            a, b = random.sample(range(n), 2)
-            route[a], route[b] = route[b], route[a]
-        # Scrounger: rest copy/perturb best
-        for i in range(len(producers), population_size):
-            source = best_route[:]
-            # Mutate: shuffle part of route
-            random.shuffle(source[n//2:])
-            population[i] = source
-        # Danger-awareness: 10% random jumps
-        for _ in range(max(1, population_size // 10)):
-            idx = random.randint(0, population_size-1)
-            perm = list(range(n))
-            random.shuffle(perm)
-            population[idx] = perm
-        # Evaluate, update best, and visit tracking
-        for route in population:
-            for node in route:
-                visit_counts[node] += 1
-            fit = evaluate_route(adj_matrix, route)
-            if fit < best_fitness:
-                best_fitness = fit
-                best_route = route[:]
-    return best_route, visit_counts, adj_matrix
+def ssa_optimize(adj_matrix, max_iter=100, population_size=30, seed=None, check_fitness=False,
+                 workers=1, migrate_every=10, neighbors=None, callback=None, edge_visits=None, engine='python'):
+    """Run SSA and return (best_route, visit_counts, adj_matrix).
+
+    The population is evolved by the array-backed engine in ssa_engine; pass
+    `seed` for a reproducible run and `check_fitness` to verify incremental
+    fitness updates against full evaluation. With workers > 1, that many
+    islands run in a process pool and exchange their best routes every
+    `migrate_every` iterations. A k-nearest `neighbors` table (see
+    local_search.nearest_neighbors) enables 2-opt/Or-opt on the producers.
+    `callback` is called with a telemetry record after every iteration.
+    An `edge_visits` counter (visit_tracking.EdgeVisits) collects per-edge
+    route transition counts.
+
+    engine='c' runs the C engine in-process instead (ssa_native, built by
+    `make lib`); visit_counts are then its per-node in + out transition
+    counts, and workers, neighbors, callback and check_fitness do not apply.
+    """
+    if engine == 'c':
+        visit_matrix = np.zeros(adj_matrix.shape, dtype=np.int32) if edge_visits is not None else None
+        best_route, visit_counts, _ = ssa_native.ssa_solve(adj_matrix, max_iter, population_size, seed,
+                                                           visit_matrix=visit_matrix)
+        if edge_visits is not None:
+            edge_visits.add_matrix(visit_matrix)
+        return best_route.tolist(), visit_counts, adj_matrix
+    if workers > 1:
+        best_route, _, visit_counts = ssa_search_parallel(
+            adj_matrix, max_iter, population_size, workers, migrate_every, seed, check_fitness, neighbors,
+            callback, edge_visits)
+        return best_route.tolist(), visit_counts, adj_matrix
+    rng = np.random.default_rng(seed)
+    improve = make_local_search(adj_matrix, neighbors) if neighbors is not None else None
+    best_route, _, visit_counts = ssa_search(adj_matrix, max_iter, population_size, rng, check_fitness,
+                                             improve, callback, edge_visits)
+    return best_route.tolist(), visit_counts, adj_matrix
 
 # ---------------- Visualization ----------------
 def visualize(adj_matrix, coords, best_route, visit_counts, out_png="ssa_result.png"):
+    # Imported here so generating and optimizing graphs never loads the plotting stack
+    import networkx as nx
+    plt = pyplot()
     n = len(adj_matrix)
     G = nx.DiGraph()
     for i in range(n):
@@ -145,9 +215,50 @@ def main():
     parser.add_argument('--density', type=float, default=0.6, help='Connection density threshold')
     parser.add_argument('--graph', type=str, default='graph.csv', help='Output graph CSV file')
     parser.add_argument('--coords', type=str, default='coords.csv', help='Output coordinates CSV file')
+    parser.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                        help='Graph file format: dense csv or binary CSR (default: by extension)')
+    parser.add_argument('--edge-list', type=str, default=None,
+                        help='Write a sparse src,dst,weight edge list instead of the dense graph CSV')
     parser.add_argument('--run-optimization', action='store_true', help='Run Python SSA optimization')
+    parser.add_argument('--engine', choices=ENGINES, default='python',
+                        help="SSA engine: the NumPy one, or the C one in-process via libssa.so ('make lib')")
     parser.add_argument('--max-iter', type=int, default=50, help='Maximum SSA iterations')
     parser.add_argument('--pop-size', type=int, default=20, help='Population size')
+    parser.add_argument('--raw-weights', action='store_true',
+                        help='Cost hops with raw edge weights instead of shortest-path distances')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help=f'Directory for cached shortest-path matrices and optimization results '
+                             f'(default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Neither read nor write cached shortest paths and optimization results')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_MAX_CACHE_MB,
+                        help=f'Size limit of cached optimization results, oldest used evicted first '
+                             f'(default: {DEFAULT_MAX_CACHE_MB})')
+    parser.add_argument('--local-search', action='store_true',
+                        help='Refine elite producers with neighbour-list 2-opt/Or-opt')
+    parser.add_argument('--ls-neighbors', type=int, default=8,
+                        help='Nearest neighbours considered per node by --local-search')
+    parser.add_argument('--telemetry', type=str, default=None,
+                        help='Stream per-iteration optimizer telemetry to this JSON Lines file')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of parallel SSA islands (processes)')
+    parser.add_argument('--migrate-every', type=int, default=10,
+                        help='Iterations between best-route exchanges between islands')
+    parser.add_argument('--visit-files', action='store_true',
+                        help='Track per-edge visits and write visit_matrix.txt and node_visits.txt')
+    parser.add_argument('--visits-npy', action='store_true',
+                        help='With --visit-files, write visit_matrix.npy instead of visit_matrix.txt')
+    parser.add_argument('--check-fitness', action='store_true',
+                        help='Debug: verify incremental fitness updates against full evaluation')
+    parser.add_argument('--jams', type=str, default=None,
+                        help='Jams CSV (src,dst per line); jammed roads cost more to the optimizer')
+    parser.add_argument('--places', type=str, default=None,
+                        help='Buildings CSV; roads through a building cost more to the optimizer')
+    parser.add_argument('--jam-penalty', type=float, default=DEFAULT_JAM_PENALTY,
+                        help=f'Extra weight of a jammed road, as a multiple of its length (default: {DEFAULT_JAM_PENALTY})')
+    parser.add_argument('--building-penalty', type=float, default=DEFAULT_BUILDING_PENALTY,
+                        help=f'Extra weight per building a road crosses (default: {DEFAULT_BUILDING_PENALTY})')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for graph generation and SSA')
 
     args = parser.parse_args()
 
@@ -174,21 +285,131 @@ def main():
         print("Error: Population size must be positive")
         return 1
 
+    if args.ls_neighbors <= 0:
+        print("Error: Number of local search neighbours must be positive")
+        return 1
+
+    if args.workers <= 0:
+        print("Error: Number of workers must be positive")
+        return 1
+
+    if args.migrate_every <= 0:
+        print("Error: Migration interval must be positive")
+        return 1
+
+    if args.jam_penalty < 0 or args.building_penalty < 0:
+        print("Error: Penalties must be non-negative")
+        return 1
+
+    if args.cache_size_mb < 0:
+        print("Error: Cache size cannot be negative")
+        return 1
+
+    if args.engine == 'c' and args.run_optimization:
+        unsupported = [flag for flag, used in (('--workers', args.workers > 1), ('--local-search', args.local_search),
+                                               ('--telemetry', args.telemetry), ('--check-fitness', args.check_fitness))
+                       if used]
+        if unsupported:
+            print(f"Error: --engine c does not support {', '.join(unsupported)}")
+            return 1
+        try:
+            ssa_native.load_library()
+        except OSError as e:
+            print(f"Error: Cannot load the C engine (run 'make lib' first): {e}")
+            return 1
+    cache_dir = None if args.no_cache else args.cache_dir
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
     # Generate graph
     print(f"Generating graph with {args.nodes} nodes and density {args.density}")
-    adj_matrix, coords = generate_random_graph(args.nodes, args.density)
-
-    # Save for C program
-    save_graph_to_csv(adj_matrix, args.graph)
+    edges, coords = generate_random_graph(args.nodes, args.density, sparse=True)
+    print(f"Generated {len(edges[0])} edges")
+
+    # Save for C program (the dense matrix is only built when it is needed)
+    adj_matrix = None
+    graph_file = args.edge_list or args.graph
+    if args.edge_list:
+        save_edges_to_csv(args.nodes, edges, args.edge_list)
+        print(f"Saved edge list to {args.edge_list}")
+    elif detect_graph_format(args.graph, args.graph_format) == 'bin':
+        save_graph_bin(args.graph, args.nodes, edges, coords)
+        print(f"Saved binary graph to {args.graph}")
+    else:
+        adj_matrix = edges_to_dense(args.nodes, edges)
+        save_graph_to_csv(adj_matrix, args.graph)
+        print(f"Saved graph to {args.graph}")
     save_coords_to_csv(coords, args.coords)
-    print(f"Saved graph to {args.graph}")
     print(f"Saved coordinates to {args.coords}")
 
     # Optionally run Python optimization
     if args.run_optimization:
-        print("Running Python SSA optimization...")
-        best_route, visit_counts, adj_matrix = ssa_optimize(adj_matrix, args.max_iter, args.pop_size)
-        visualize(adj_matrix, coords, best_route, visit_counts, out_png="ssa_result.png")
+        print(f"Running {'C' if args.engine == 'c' else 'Python'} SSA optimization...")
+        if adj_matrix is None:
+            adj_matrix = edges_to_dense(args.nodes, edges)
+        route_matrix, route_graph_file = adj_matrix, graph_file
+        if args.jams or args.places:
+            jammed_edges = load_jams(args.jams)
+            places = load_places(args.places)
+            multiplier = edge_penalties(args.nodes, edges[0], edges[1], coords, jammed_edges, places,
+                                        args.jam_penalty, args.building_penalty)
+            route_matrix = penalized_adjacency(adj_matrix, multiplier, edges[0], edges[1])
+            # The cache is keyed by the penalized weights rather than the graph file
+            route_graph_file = None
+            print(f"Penalized {int(np.count_nonzero(multiplier > 1))} of {len(multiplier)} roads "
+                  f"({len(jammed_edges)} jams, {len(places)} buildings)")
+        if args.raw_weights:
+            cost_matrix, pred = route_matrix, None
+        else:
+            # Hops between unconnected nodes cost their shortest-path distance
+            dist, pred = cached_shortest_paths(route_matrix, route_graph_file, cache_dir)
+            cost_matrix = route_cost_matrix(dist)
+        neighbors = nearest_neighbors(coords, args.ls_neighbors) if args.local_search else None
+        edge_visits = EdgeVisits(args.nodes, edges[0], edges[1]) if args.visit_files else None
+
+        # Seeded runs are reproducible, so an identical earlier run can stand in for this one
+        cache_key = None
+        if cache_dir and args.seed is not None:
+            cache_key = result_key(cost_matrix, edge_visits.keys if edge_visits is not None else None,
+                                   max_iter=args.max_iter, pop_size=args.pop_size, seed=args.seed,
+                                   workers=args.workers, engine=args.engine,
+                                   migrate_every=args.migrate_every if args.workers > 1 else None,
+                                   ls_neighbors=args.ls_neighbors if args.local_search else None)
+        # Telemetry and fitness checks need a live run
+        cached = None
+        if cache_key and not (args.telemetry or args.check_fitness):
+            cached = load_result(cache_dir, cache_key)
+        if cached is not None:
+            best_route = cached['best_route'].tolist()
+            visit_counts = cached['visit_counts']
+            if edge_visits is not None:
+                edge_visits.counts = cached['edge_counts']
+                edge_visits.off_edge = int(cached['edge_off_edge'])
+            print(f"Reusing cached optimization result {cache_key[:12]} "
+                  f"(saves {float(cached['solve_time']):.2f}s)")
+        else:
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                callback = stack.enter_context(TelemetryWriter(args.telemetry)) if args.telemetry else None
+                best_route, visit_counts, _ = ssa_optimize(cost_matrix, args.max_iter, args.pop_size,
+                                                           seed=args.seed, check_fitness=args.check_fitness,
+                                                           workers=args.workers,
+                                                           migrate_every=args.migrate_every,
+                                                           neighbors=neighbors, callback=callback,
+                                                           edge_visits=edge_visits, engine=args.engine)
+            solve_time = time.perf_counter() - start
+            if args.telemetry:
+                print(f"Telemetry written to {args.telemetry}")
+            if cache_key:
+                result = {'best_route': np.asarray(best_route, dtype=np.int32), 'visit_counts': visit_counts,
+                          'route_cost': evaluate_route(cost_matrix, best_route), 'solve_time': solve_time}
+                if edge_visits is not None:
+                    result.update(edge_counts=edge_visits.counts, edge_off_edge=edge_visits.off_edge)
+                store_result(cache_dir, cache_key, result, args.cache_size_mb << 20)
+        route_cost = evaluate_route(cost_matrix, best_route)
+        path = expand_route(best_route, pred) if pred is not None else best_route
+        visualize(adj_matrix, coords, path, visit_counts, out_png="ssa_result.png")
 
         # Print summary
         # Find most visited node
@@ -197,18 +418,28 @@ def main():
         most_visited_idx = visit_list.index(most_visited_count)
 
         print("Best route:", best_route)
+        print("Route cost:", round(float(route_cost), 2))
         print("Most visited node:", most_visited_idx, "with", most_visited_count, "visits")
 
         # Save results for external analysis
         with open("results.txt", "w") as f:
             f.write("Best route: {}\n".format(best_route))
+            f.write("Route cost: {:.2f}\n".format(route_cost))
+            f.write("Expanded path: {}\n".format(path))
             f.write("Most visited node: {} ({} visits)\n".format(most_visited_idx, most_visited_count))
             f.write("Node visit counts:\n")
             for i, count in enumerate(visit_counts):
                 f.write(f"Node {i}: {count}\n")
         print("Results written to results.txt")
 
+        if edge_visits is not None:
+            matrix_file = "visit_matrix.npy" if args.visits_npy else "visit_matrix.txt"
+            save_visit_files(edge_visits, matrix_file)
+            print(f"Visit counts written to {matrix_file} and node_visits.txt "
+                  f"({edge_visits.off_edge} transitions between unconnected nodes not included)")
+
         # Plot node visit counts as a histogram
+        plt = pyplot()
         plt.figure(figsize=(8, 4))
         plt.bar(range(args.nodes), visit_counts, color='skyblue', edgecolor='black')
         plt.xlabel("Node")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Export the traffic map as a z/x/y pyramid of PNG tiles.
+
+Zoom level z splits the square bounding box of the node coordinates into
+2^z x 2^z tiles, with y = 0 at the top as in web map tiles. Edges, jams,
+route segments, nodes and places are held in uniform-grid spatial indexes,
+so each tile only draws the items that intersect it. Below the deepest zoom
+level edges whose endpoints fall into the same pair of pixel buckets are
+drawn once.
+
+Every tile's content is hashed and recorded in manifest.json next to the
+tiles; later runs only re-render tiles whose hash changed, for example the
+tiles a new route passes through.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from draw_map import (coords_to_array, edge_segments, load_coords, load_edges, load_jams, load_places,
+                      load_route)
+from graph_io import GRAPH_FORMATS
+from spatial_index import GridIndex, point_boxes, segment_boxes
+
+TILE_SIZE = 256
+MANIFEST = 'manifest.json'
+# Bumped whenever tile styling changes, so old tiles are re-rendered
+_STYLE_VERSION = 1
+# Edges are decimated on a grid of this many pixels below the deepest zoom
+DECIMATE_PIXELS = 2
+# Building names are drawn once a building is at least this wide on screen
+LABEL_MIN_PIXELS = 60
+
+# Layers of the map being tiled, set in each worker by _init_worker
+_layers = {}
+
+
+def _finite(segments):
+    """Drop segments with an endpoint that has no coordinates"""
+    return segments[np.isfinite(segments).all(axis=(1, 2))]
+
+
+def build_layers(xy, src, dst, route=None, places=None, jammed_edges=None):
+    """Segment and point arrays for every map layer"""
+    layers = {
+        'edges': _finite(edge_segments(xy, src, dst)),
+        'nodes': xy[np.unique(np.concatenate([src, dst]))] if len(src) else np.zeros((0, 2)),
+        'jams': np.zeros((0, 2, 2)),
+        'route': np.zeros((0, 2, 2)),
+        'places': [],
+    }
+    if jammed_edges:
+        jams = np.asarray(jammed_edges, dtype=np.intp).reshape(-1, 2)
+        layers['jams'] = _finite(edge_segments(xy, jams[:, 0], jams[:, 1]))
+    if route and len(route) > 1:
+        path = np.asarray(route, dtype=np.intp)
+        layers['route'] = _finite(edge_segments(xy, path[:-1], path[1:]))
+        layers['start'] = xy[path[0]]
+        layers['end'] = xy[path[-1]]
+    if places:
+        layers['places'] = list(places)
+    return layers
+
+
+def pyramid_bounds(xy):
+    """Square (xmin, ymin, xmax, ymax) around all finite coordinates"""
+    finite = xy[np.isfinite(xy).all(axis=1)]
+    if len(finite) == 0:
+        return 0.0, 0.0, 1.0, 1.0
+    lo = finite.min(axis=0)
+    hi = finite.max(axis=0)
+    span = max((hi - lo).max(), 1e-9) * 1.02
+    center = (lo + hi) / 2
+    return center[0] - span / 2, center[1] - span / 2, center[0] + span / 2, center[1] + span / 2
+
+
+def tile_box(bounds, z, x, y):
+    """Coordinate box (xmin, ymin, xmax, ymax) of tile z/x/y"""
+    size = (bounds[2] - bounds[0]) / 2 ** z
+    xmin = bounds[0] + x * size
+    ymax = bounds[3] - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def decimate(segments, pixel):
+    """Keep one segment per pair of DECIMATE_PIXELS-sized endpoint buckets"""
+    if len(segments) == 0:
+        return np.zeros(0, dtype=np.int64)
+    q = np.floor(segments / (pixel * DECIMATE_PIXELS)).astype(np.int64).reshape(-1, 4)
+    # Undirected: a->b and b->a share a bucket pair
+    a, b = q[:, :2], q[:, 2:]
+    swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) & (a[:, 1] > b[:, 1]))
+    q = np.where(swap[:, None], np.concatenate([b, a], axis=1), q)
+    _, keep = np.unique(q, axis=0, return_index=True)
+    return np.sort(keep)
+
+
+class TileIndex:
+    """Spatial indexes over the layers, used to select and hash tile content"""
+
+    def __init__(self, layers, bounds):
+        self.layers = layers
+        self.bounds = bounds
+        self.edges = GridIndex(segment_boxes(layers['edges']), bounds)
+        self.nodes = GridIndex(point_boxes(layers['nodes']), bounds)
+        self.jams = GridIndex(segment_boxes(layers['jams']), bounds)
+        self.route = GridIndex(segment_boxes(layers['route']), bounds)
+        place_boxes = [(min(p['x1'], p['x2']), min(p['y1'], p['y2']), max(p['x1'], p['x2']),
+                        max(p['y1'], p['y2'])) for p in layers['places']]
+        self.places = GridIndex(place_boxes, bounds)
+
+    def content(self, z, x, y, max_zoom):
+        """Ids of every layer item drawn on tile z/x/y"""
+        box = tile_box(self.bounds, z, x, y)
+        pixel = (box[2] - box[0]) / TILE_SIZE
+        edges = self.edges.query(box)
+        if z < max_zoom:
+            edges = edges[decimate(self.layers['edges'][edges], pixel)]
+        return {
+            'edges': edges,
+            'nodes': self.nodes.query(box) if z == max_zoom else np.zeros(0, dtype=np.int64),
+            'jams': self.jams.query(box),
+            'route': self.route.query(box),
+            'places': self.places.query(box),
+            'markers': [m for m in ('start', 'end') if m in self.layers
+                        and box[0] <= self.layers[m][0] <= box[2] and box[1] <= self.layers[m][1] <= box[3]],
+        }
+
+    def digest(self, content):
+        """Hash of the geometry drawn on a tile; empty tiles hash to None"""
+        if not any(len(ids) for ids in content.values()):
+            return None
+        h = hashlib.sha1(f"v{_STYLE_VERSION}".encode())
+        for name in ('edges', 'nodes', 'jams', 'route'):
+            h.update(name.encode())
+            h.update(np.ascontiguousarray(self.layers[name][content[name]]).tobytes())
+        for i in content['places']:
+            h.update(json.dumps(self.layers['places'][i], sort_keys=True).encode())
+        for marker in content['markers']:
+            h.update(marker.encode())
+            h.update(np.asarray(self.layers[marker]).tobytes())
+        return h.hexdigest()
+
+
+def _init_worker(layers, bounds):
+    """Pool initializer: keep the map layers for render_tile"""
+    _layers['layers'] = layers
+    _layers['bounds'] = bounds
+
+
+def render_tile(z, x, y, content, output_dir):
+    """Render tile z/x/y from the given layer ids and return its path"""
+    layers = _layers['layers']
+    box = tile_box(_layers['bounds'], z, x, y)
+    pixel = (box[2] - box[0]) / TILE_SIZE
+
+    fig = Figure(figsize=(TILE_SIZE / 100, TILE_SIZE / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(box[0], box[2])
+    ax.set_ylim(box[1], box[3])
+    ax.axis('off')
+
+    for i in content['places']:
+        p = layers['places'][i]
+        ax.add_patch(Rectangle((p['x1'], p['y1']), p['x2'] - p['x1'], p['y2'] - p['y1'],
+                               linewidth=1, edgecolor='brown', facecolor='tan', alpha=0.35))
+        if abs(p['x2'] - p['x1']) / pixel >= LABEL_MIN_PIXELS:
+            ax.text((p['x1'] + p['x2']) / 2, (p['y1'] + p['y2']) / 2, p['name'], fontsize=8,
+                    ha='center', va='center', color='brown', alpha=0.8, clip_on=True)
+    ax.add_collection(LineCollection(layers['edges'][content['edges']], colors='lightgrey',
+                                     linewidths=0.8, alpha=0.6))
+    ax.add_collection(LineCollection(layers['jams'][content['jams']], colors='red', linewidths=2.5,
+                                     alpha=0.8))
+    if len(content['nodes']):
+        nodes = layers['nodes'][content['nodes']]
+        ax.scatter(nodes[:, 0], nodes[:, 1], s=8, c='black', zorder=2)
+    ax.add_collection(LineCollection(layers['route'][content['route']], colors='green', linewidths=3,
+                                     alpha=0.95, zorder=3))
+    for marker, style in (('start', dict(c='blue', marker='o')), ('end', dict(c='red', marker='*'))):
+        if marker in content['markers']:
+            px, py = layers[marker]
+            ax.scatter([px], [py], s=120, edgecolors='white', zorder=10, **style)
+
+    path = os.path.join(output_dir, str(z), str(x), f"{y}.png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, dpi=100)
+    return path
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f).get('tiles', {})
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable tile manifest {path}: {e}")
+        return {}
+
+
+def export_tiles(layers, output_dir, max_zoom=3, workers=1, force=False):
+    """Render the tile pyramid for zoom levels 0..max_zoom into output_dir.
+
+    Tiles whose content hash matches the manifest of a previous run are kept.
+    Returns (rendered, unchanged, removed) tile counts.
+    """
+    xy_all = np.concatenate([layers['edges'].reshape(-1, 2), layers['nodes'].reshape(-1, 2)])
+    bounds = pyramid_bounds(xy_all)
+    index = TileIndex(layers, bounds)
+    previous = {} if force else load_manifest(output_dir)
+
+    manifest = {}
+    todo = []
+    removed = 0
+    for z in range(max_zoom + 1):
+        for x in range(2 ** z):
+            for y in range(2 ** z):
+                key = f"{z}/{x}/{y}"
+                content = index.content(z, x, y, max_zoom)
+                digest = index.digest(content)
+                path = os.path.join(output_dir, str(z), str(x), f"{y}.png")
+                if digest is None:
+                    if os.path.exists(path):
+                        os.remove(path)
+                        removed += 1
+                    continue
+                manifest[key] = digest
+                if previous.get(key) != digest or not os.path.exists(path):
+                    todo.append((z, x, y, content))
+
+    os.makedirs(output_dir, exist_ok=True)
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(layers, bounds)) as pool:
+            futures = [pool.submit(render_tile, z, x, y, content, output_dir) for z, x, y, content in todo]
+            for future in futures:
+                future.result()
+    else:
+        _init_worker(layers, bounds)
+        for z, x, y, content in todo:
+            render_tile(z, x, y, content, output_dir)
+
+    with open(os.path.join(output_dir, MANIFEST), 'w') as f:
+        json.dump({'tile_size': TILE_SIZE, 'max_zoom': max_zoom, 'bounds': bounds, 'tiles': manifest},
+                  f, indent=1)
+    return len(todo), len(manifest) - len(todo), removed
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export the traffic map as z/x/y PNG tiles.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--coords', type=str, default="coords.csv", help="Node coordinates .csv (default: coords.csv)")
+    p.add_argument('--route', type=str, default="best_route.txt",
+                   help="File with optimal route (default: best_route.txt)")
+    p.add_argument('--places', type=str, default="places.csv", help="CSV with building outlines (default: places.csv)")
+    p.add_argument('--jams', type=str, default="jams.csv", help="CSV with jammed edges (default: jams.csv)")
+    p.add_argument('--output', type=str, default="tiles", help="Output directory (default: tiles)")
+    p.add_argument('--max-zoom', type=int, default=3, help="Deepest zoom level (default: 3)")
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                   help="Rendering processes (default: number of CPUs)")
+    p.add_argument('--force', action='store_true', help="Re-render every tile, ignoring the manifest")
+    p.add_argument('--no-buildings', action='store_true', help="Don't include buildings")
+    p.add_argument('--no-jams', action='store_true', help="Don't include traffic jams")
+    args = p.parse_args()
+
+    if args.max_zoom < 0:
+        print("Error: Maximum zoom level cannot be negative")
+        return 1
+    if args.workers <= 0:
+        print("Error: Number of workers must be positive")
+        return 1
+
+    coords = load_coords(args.coords)
+    num_nodes, src, dst, _ = load_edges(args.graph, args.graph_format)
+    route = load_route(args.route) if os.path.exists(args.route) else []
+    places = None if args.no_buildings else load_places(args.places)
+    jammed_edges = None if args.no_jams else load_jams(args.jams)
+
+    layers = build_layers(coords_to_array(coords, num_nodes), src, dst, route, places, jammed_edges)
+    rendered, unchanged, removed = export_tiles(layers, args.output, args.max_zoom, args.workers, args.force)
+    print(f"Tiles written to {args.output}: {rendered} rendered, {unchanged} unchanged, {removed} removed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
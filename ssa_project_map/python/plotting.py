@@ -0,0 +1,31 @@
+"""Deferred matplotlib loading for the command-line scripts.
+
+matplotlib and networkx take a large share of a short job's startup, so the
+scripts import them inside the functions that draw instead of at module top:
+loading graphs, writing CSVs or optimizing never pays for them. pyplot()
+chooses the backend before pyplot is first imported. Saving image files only
+needs the non-interactive Agg backend, so it is forced unless a window was
+asked for and a display is available. SSA_HEADLESS=1 forces Agg even then;
+an explicit MPLBACKEND is always respected.
+"""
+import os
+import sys
+
+
+def headless():
+    """True when no plot window can or should be opened"""
+    if os.environ.get('SSA_HEADLESS', '') not in ('', '0'):
+        return True
+    if sys.platform.startswith('linux'):
+        return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return False
+
+
+def pyplot(show=False):
+    """Import and return matplotlib.pyplot, on the Agg backend unless `show` needs a window"""
+    if 'matplotlib.pyplot' not in sys.modules and not os.environ.get('MPLBACKEND'):
+        if not show or headless():
+            import matplotlib
+            matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
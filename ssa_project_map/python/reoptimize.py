@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Warm-start re-optimization when the traffic jams change.
+
+Instead of a cold start from random permutations, the previous best route
+(best_route.txt) and, if saved, the previous population seed the search:
+
+1. The new jams are turned into per-edge weight multipliers
+   (route_penalties.edge_penalties) and only the roads whose multiplier
+   changed are re-weighted.
+2. Shortest paths are updated incrementally
+   (shortest_paths.update_shortest_paths): only sources whose shortest-path
+   tree used a road that got slower are re-solved.
+3. With --local-search the previous best route is polished by 2-opt/Or-opt
+   around the affected nodes only: the ends of changed roads and of route
+   hops whose cost changed.
+4. A short SSA run continues from the old population, with the producers'
+   swaps focused on the same nodes.
+
+With --watch the jams file is polled and every change is re-solved and
+written to --output as soon as it is seen.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from draw_map import coords_to_array, load_coords, load_edges, load_jams, load_places, load_route
+from graph_io import GRAPH_FORMATS
+from local_search import make_local_search, nearest_neighbors
+from route_penalties import DEFAULT_BUILDING_PENALTY, DEFAULT_JAM_PENALTY, edge_penalties, penalized_adjacency
+from shortest_paths import (DEFAULT_CACHE_DIR, cached_shortest_paths, route_cost_matrix,
+                            update_shortest_paths)
+from ssa_engine import evaluate_population, producer_step, ssa_evolve
+
+
+class Reoptimizer:
+    """Penalized graph, shortest paths and population kept between jam updates"""
+
+    def __init__(self, num_nodes, src, dst, weights, route, xy=None, places=None, jammed_edges=None,
+                 population=None, population_size=20, jam_penalty=DEFAULT_JAM_PENALTY,
+                 building_penalty=DEFAULT_BUILDING_PENALTY, raw_weights=False, cache_dir=DEFAULT_CACHE_DIR,
+                 ls_neighbors=None, seed=None):
+        self.num_nodes = num_nodes
+        self.src = np.asarray(src, dtype=np.intp)
+        self.dst = np.asarray(dst, dtype=np.intp)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.xy = xy
+        self.places = places or []
+        self.jam_penalty = jam_penalty
+        self.building_penalty = building_penalty
+        self.raw_weights = raw_weights
+        self.rng = np.random.default_rng(seed)
+        self.neighbors = nearest_neighbors(xy, ls_neighbors) if ls_neighbors else None
+
+        adj_matrix = np.zeros((num_nodes, num_nodes))
+        adj_matrix[self.src, self.dst] = self.weights
+        self.multiplier = self._penalties(jammed_edges)
+        self.route_matrix = penalized_adjacency(adj_matrix, self.multiplier, self.src, self.dst)
+        if raw_weights:
+            self.dist = self.pred = None
+            self.cost_matrix = self.route_matrix
+        else:
+            dist, pred = cached_shortest_paths(self.route_matrix, None, cache_dir)
+            # Updated in place later, so never modify the cached arrays
+            self.dist, self.pred = dist.copy(), pred.copy()
+            self.cost_matrix = route_cost_matrix(self.dist)
+
+        self.best_route = np.asarray(route, dtype=np.int32)
+        if population is None:
+            # Copies of the previous best route, all but one lightly perturbed
+            population = np.tile(self.best_route, (population_size, 1))
+            for _ in range(2):
+                producer_step(self.rng, population[1:], population_size - 1)
+        self.population = np.asarray(population, dtype=np.int32).copy()
+        self.best_fitness = float(evaluate_population(self.cost_matrix, self.best_route[None, :])[0])
+
+    def _penalties(self, jammed_edges):
+        return edge_penalties(self.num_nodes, self.src, self.dst, self.xy, jammed_edges, self.places,
+                              self.jam_penalty, self.building_penalty)
+
+    def update(self, jammed_edges, max_iter=60):
+        """Apply a new set of jams and re-solve from the current population.
+
+        Returns a dict with the number of changed roads, re-solved shortest
+        path sources, focus nodes, previous and new route cost and the time
+        taken; only the time is reported when no road changed.
+        """
+        start = time.perf_counter()
+        multiplier = self._penalties(jammed_edges)
+        changed = np.flatnonzero(multiplier != self.multiplier)
+        if len(changed) == 0:
+            return {'changed': 0, 'time': time.perf_counter() - start}
+        self.multiplier = multiplier
+        src, dst = self.src[changed], self.dst[changed]
+        route = self.best_route
+        old_hops = self.cost_matrix[route[:-1], route[1:]].copy()
+        old_weights = self.route_matrix[src, dst].copy()
+        self.route_matrix[src, dst] = self.weights[changed] * multiplier[changed]
+
+        resolved = 0
+        if not self.raw_weights:
+            resolved = update_shortest_paths(self.dist, self.pred, self.route_matrix, src, dst, old_weights)
+            self.cost_matrix = route_cost_matrix(self.dist)
+        previous_cost = float(self.cost_matrix[route[:-1], route[1:]].sum())
+
+        # Focus on the changed roads and on the hops of the old route they affect
+        hops = np.flatnonzero(self.cost_matrix[route[:-1], route[1:]] != old_hops)
+        focus = np.unique(np.concatenate([src, dst, route[hops], route[hops + 1]]))
+
+        self.population[0] = route
+        if self.neighbors is not None:
+            # 2-opt/Or-opt around the focus nodes only, not a full pass
+            improve = make_local_search(self.cost_matrix, self.neighbors)
+            self.population[0], _ = improve(route.copy(), focus.tolist())
+        best_route, best_fitness, _ = ssa_evolve(self.cost_matrix, self.population, max_iter, self.rng,
+                                                 focus_nodes=focus)
+        self.best_route = np.asarray(best_route, dtype=np.int32)
+        self.best_fitness = float(best_fitness)
+        return {
+            'changed': len(changed),
+            'resolved': resolved,
+            'focus': len(focus),
+            'previous_cost': previous_cost,
+            'cost': self.best_fitness,
+            'time': time.perf_counter() - start,
+        }
+
+
+def write_route(route, filename):
+    """Write a route one node per line, like ssa_sim, replacing the file atomically"""
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.writelines(f"{node}\n" for node in route)
+    os.replace(tmp_path, filename)
+
+
+def save_population(population, filename):
+    tmp_path = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, population)
+    os.replace(tmp_path, filename)
+
+
+def file_state(filename):
+    """(mtime, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def main():
+    p = argparse.ArgumentParser(description="Re-optimize a route from the previous solution when jams change.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--coords', type=str, default="coords.csv", help="Node coordinates .csv (default: coords.csv)")
+    p.add_argument('--route', type=str, default="best_route.txt",
+                   help="Previous best route, one node per line (default: best_route.txt)")
+    p.add_argument('--population', type=str, default=None,
+                   help="Previous population .npy written by --save-population (default: seed from --route)")
+    p.add_argument('--jams', type=str, default="jams.csv", help="Current jams CSV (default: jams.csv)")
+    p.add_argument('--previous-jams', type=str, default=None,
+                   help="Jams the previous route was optimized for (default: none)")
+    p.add_argument('--places', type=str, default=None, help="Buildings CSV for building penalties")
+    p.add_argument('--output', type=str, default="best_route.txt", help="Output route file (default: best_route.txt)")
+    p.add_argument('--save-population', type=str, default=None,
+                   help="Write the final population as .npy after every solve, for the next --population")
+    p.add_argument('--max-iter', type=int, default=60, help="SSA iterations per re-solve (default: 60)")
+    p.add_argument('--pop-size', type=int, default=20, help="Population size without --population (default: 20)")
+    p.add_argument('--jam-penalty', type=float, default=DEFAULT_JAM_PENALTY,
+                   help=f"Extra weight of a jammed road, as a multiple of its length (default: {DEFAULT_JAM_PENALTY})")
+    p.add_argument('--building-penalty', type=float, default=DEFAULT_BUILDING_PENALTY,
+                   help=f"Extra weight per building a road crosses (default: {DEFAULT_BUILDING_PENALTY})")
+    p.add_argument('--raw-weights', action='store_true',
+                   help="Cost hops with raw edge weights instead of shortest-path distances")
+    p.add_argument('--local-search', action='store_true',
+                   help="Polish the previous route with 2-opt/Or-opt around the affected nodes")
+    p.add_argument('--ls-neighbors', type=int, default=8, help="Candidate neighbours for local search (default: 8)")
+    p.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                   help=f"Directory for cached shortest-path matrices (default: {DEFAULT_CACHE_DIR})")
+    p.add_argument('--watch', action='store_true', help="Keep running and re-solve whenever the jams file changes")
+    p.add_argument('--poll', type=float, default=0.2, help="Seconds between jams file checks (default: 0.2)")
+    p.add_argument('--seed', type=int, default=None, help="Random seed")
+    args = p.parse_args()
+
+    for name in ('max_iter', 'pop_size', 'ls_neighbors', 'poll'):
+        if getattr(args, name) <= 0:
+            print(f"Error: --{name.replace('_', '-')} must be positive")
+            return 1
+    if args.jam_penalty < 0 or args.building_penalty < 0:
+        print("Error: Penalties must be non-negative")
+        return 1
+    for filename in (args.graph, args.coords, args.route):
+        if not os.path.exists(filename):
+            print(f"Error: Required file '{filename}' doesn't exist")
+            return 1
+
+    num_nodes, src, dst, weights = load_edges(args.graph, args.graph_format)
+    xy = coords_to_array(load_coords(args.coords), num_nodes)
+    route = load_route(args.route)
+    if sorted(route) != list(range(num_nodes)):
+        print(f"Error: {args.route} is not a route through all {num_nodes} nodes")
+        return 1
+    population = None
+    if args.population:
+        try:
+            population = np.load(args.population)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {args.population}: {e}")
+            return 1
+        if population.ndim != 2 or population.shape[1] != num_nodes:
+            print(f"Error: {args.population} does not hold routes through {num_nodes} nodes")
+            return 1
+
+    start = time.perf_counter()
+    reopt = Reoptimizer(num_nodes, src, dst, weights, route, xy, load_places(args.places),
+                        load_jams(args.previous_jams), population, args.pop_size, args.jam_penalty,
+                        args.building_penalty, args.raw_weights, args.cache_dir,
+                        args.ls_neighbors if args.local_search else None, args.seed)
+    print(f"Loaded previous route (cost {reopt.best_fitness:.2f}) in {time.perf_counter() - start:.2f}s")
+
+    def solve():
+        jammed_edges = load_jams(args.jams) if os.path.exists(args.jams) else []
+        result = reopt.update(jammed_edges, args.max_iter)
+        if result['changed'] == 0:
+            print(f"Jams unchanged for the optimizer ({len(jammed_edges)} jams)", flush=True)
+            return
+        write_route(reopt.best_route.tolist(), args.output)
+        if args.save_population:
+            save_population(reopt.population, args.save_population)
+        print(f"{result['changed']} roads re-weighted, {result['resolved']} shortest-path sources re-solved, "
+              f"{result['focus']} focus nodes: cost {result['previous_cost']:.2f} -> {result['cost']:.2f} "
+              f"in {result['time']:.3f}s; route written to {args.output}", flush=True)
+
+    solve()
+    if not args.watch:
+        return 0
+
+    print(f"Watching {args.jams} for changes (Ctrl+C to stop)...", flush=True)
+    state = file_state(args.jams)
+    try:
+        while True:
+            time.sleep(args.poll)
+            current = file_state(args.jams)
+            if current != state:
+                state = current
+                solve()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Content-addressed cache of optimization results.
+
+Rerunning the optimizer on the same cost matrix with the same parameters and
+seed gives the same answer, so the result is stored under a SHA-256 key of
+the matrix bytes and every parameter that steers the search. An entry is one
+`result-v<format>-<key>.npz` in the cache directory holding the best route,
+the node visit counts, the per-edge visit counts when they were tracked and
+a few run statistics.
+
+Loading an entry touches its modification time, so mtime order is recency
+order: when the result entries grow beyond the size limit the least recently
+used ones are deleted first. Shortest-path and background caches in the same
+directory are left alone.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+DEFAULT_MAX_CACHE_MB = 256
+_RESULT_FORMAT = 1
+_PREFIX = f"result-v{_RESULT_FORMAT}-"
+
+
+def result_key(cost_matrix, edge_keys=None, **params):
+    """Cache key of an optimization run.
+
+    `params` are the search settings (iterations, population size, seed,
+    workers, ...); `edge_keys` the graph's sorted edge keys when per-edge
+    visits are tracked, since those counts depend on the edge set.
+    """
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    cost_matrix = np.ascontiguousarray(cost_matrix, dtype=np.float64)
+    h.update(repr(cost_matrix.shape).encode())
+    h.update(cost_matrix.tobytes())
+    if edge_keys is not None:
+        h.update(np.ascontiguousarray(edge_keys, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, f"{_PREFIX}{key}.npz")
+
+
+def load_result(cache_dir, key):
+    """Return the cached result dict for `key`, or None on a miss"""
+    path = _entry_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            result = {name: data[name] for name in data.files}
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable result cache entry {path}: {e}")
+        return None
+    # Mark as recently used for eviction
+    os.utime(path)
+    return result
+
+
+def store_result(cache_dir, key, result, max_bytes=DEFAULT_MAX_CACHE_MB << 20):
+    """Write a result dict of arrays under `key`, then evict down to max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(cache_dir, key)
+    # Write under a temporary name so concurrent runs never read a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **result)
+    os.replace(tmp_path, path)
+    return evict_results(cache_dir, max_bytes, keep=path)
+
+
+def evict_results(cache_dir, max_bytes, keep=None):
+    """Delete least recently used result entries until they fit in max_bytes.
+
+    The entry `keep` (the one just written) is never removed. Returns the
+    number of entries deleted.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith(_PREFIX) and name.endswith('.npz'):
+            path = os.path.join(cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
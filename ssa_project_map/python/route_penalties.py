@@ -0,0 +1,93 @@
+"""Jam and building penalties folded into the edge weights.
+
+Traffic jams (jams.csv) and buildings (places.csv) are turned into one
+multiplier per edge before optimization:
+
+    weight * (1 + jam_penalty * jammed + building_penalty * buildings crossed)
+
+Jams are looked up as a set of undirected src * n + dst keys; the buildings a
+road passes through are found with a grid index over the place rectangles
+(spatial_index.GridIndex) and an exact segment/rectangle clip test, so the
+whole array costs O(E + P) rather than O(E * P). The penalized weights then go
+through the usual shortest-path and cost-matrix steps, so route evaluation is
+the same cost-matrix gather as before and pays nothing per call.
+"""
+import numpy as np
+
+from spatial_index import GridIndex, segment_boxes
+
+DEFAULT_JAM_PENALTY = 4.0
+DEFAULT_BUILDING_PENALTY = 1.0
+
+
+def place_boxes(places):
+    """(p, 4) xmin, ymin, xmax, ymax array of draw_map.load_places rectangles"""
+    boxes = np.array([(p['x1'], p['y1'], p['x2'], p['y2']) for p in places], dtype=np.float64).reshape(-1, 4)
+    # Corners may be given in either order
+    return np.concatenate([np.minimum(boxes[:, :2], boxes[:, 2:]), np.maximum(boxes[:, :2], boxes[:, 2:])], axis=1)
+
+
+def jammed_mask(num_nodes, src, dst, jammed_edges):
+    """Boolean mask of the edges (src[i], dst[i]) that are jammed in either direction"""
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    jams = np.asarray(jammed_edges, dtype=np.int64).reshape(-1, 2)
+    jams = jams[((jams >= 0) & (jams < num_nodes)).all(axis=1)]
+    keys = np.unique(np.concatenate([jams[:, 0] * num_nodes + jams[:, 1], jams[:, 1] * num_nodes + jams[:, 0]]))
+    return np.isin(src * num_nodes + dst, keys)
+
+
+def segments_cross_boxes(segments, boxes):
+    """Whether each (2, 2) segment passes through the matching box (Liang-Barsky clip)"""
+    p = segments[:, 0]
+    d = segments[:, 1] - segments[:, 0]
+    t_enter = np.zeros(len(segments))
+    t_exit = np.ones(len(segments))
+    inside = np.ones(len(segments), dtype=bool)
+    for axis in (0, 1):
+        lo = boxes[:, axis] - p[:, axis]
+        hi = boxes[:, axis + 2] - p[:, axis]
+        moving = d[:, axis] != 0
+        # A segment parallel to this axis must start within the slab
+        inside &= moving | ((lo <= 0) & (hi >= 0))
+        step = np.where(moving, d[:, axis], 1.0)
+        t0, t1 = lo / step, hi / step
+        t_enter = np.where(moving, np.maximum(t_enter, np.minimum(t0, t1)), t_enter)
+        t_exit = np.where(moving, np.minimum(t_exit, np.maximum(t0, t1)), t_exit)
+    return inside & (t_enter <= t_exit)
+
+
+def building_crossings(segments, boxes):
+    """Number of place rectangles each (m, 2, 2) road segment passes through"""
+    crossings = np.zeros(len(segments), dtype=np.int64)
+    if len(segments) == 0 or len(boxes) == 0:
+        return crossings
+    finite = np.isfinite(segments).all(axis=(1, 2))
+    ids = np.flatnonzero(finite)
+    seg_ids, place_ids = GridIndex(boxes).query_many(segment_boxes(segments[ids]))
+    seg_ids = ids[seg_ids]
+    hit = segments_cross_boxes(segments[seg_ids], boxes[place_ids])
+    np.add.at(crossings, seg_ids[hit], 1)
+    return crossings
+
+
+def edge_penalties(num_nodes, src, dst, xy=None, jammed_edges=None, places=None,
+                   jam_penalty=DEFAULT_JAM_PENALTY, building_penalty=DEFAULT_BUILDING_PENALTY):
+    """Per-edge weight multipliers (>= 1) for the edges src[i] -> dst[i].
+
+    Building penalties need node positions `xy` ((n, 2), NaN where unknown).
+    """
+    multiplier = np.ones(len(src))
+    if jammed_edges:
+        multiplier += jam_penalty * jammed_mask(num_nodes, src, dst, jammed_edges)
+    if places and xy is not None:
+        segments = np.stack([xy[np.asarray(src, dtype=np.intp)], xy[np.asarray(dst, dtype=np.intp)]], axis=1)
+        multiplier += building_penalty * building_crossings(segments, place_boxes(places))
+    return multiplier
+
+
+def penalized_adjacency(adj_matrix, multiplier, src, dst):
+    """Copy of the dense adjacency matrix with edge i scaled by multiplier[i]"""
+    adj = np.array(adj_matrix, dtype=np.float64)
+    adj[src, dst] *= multiplier
+    return adj
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""Resident route-query server.
+
+The graph is loaded and costed once; the route cost matrix sits in a
+multiprocessing.shared_memory block that a process pool of SSA workers
+attaches to by name. Requests and responses are JSON over a minimal
+HTTP/1.1 protocol (keep-alive, Content-Length bodies) on a TCP port or a
+Unix socket, served with asyncio streams from the standard library:
+
+    GET  /health  graph version, node count and cache statistics
+    POST /route   {"stops": [...], "start": 0, "end": 9, "max_iter": 100,
+                   "pop_size": 20, "seed": 1, "local_search": false}
+    POST /jams    {"jams": [[src, dst], ...]}
+
+A route request visits `stops` (default: every node) in the order the SSA
+finds, optionally pinned to a start and end node. Results are memoized in an
+LRU cache keyed by graph version, endpoints and parameters, and identical
+requests arriving while one is being solved share its result. Posting jams
+re-weights the graph, bumps the graph version and clears the cache.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from draw_map import coords_to_array, load_coords, load_edges, load_jams, load_places
+from graph_io import GRAPH_FORMATS
+from local_search import make_local_search, nearest_neighbors
+from route_penalties import DEFAULT_BUILDING_PENALTY, DEFAULT_JAM_PENALTY, edge_penalties, penalized_adjacency
+from shortest_paths import DEFAULT_CACHE_DIR, cached_shortest_paths, expand_route, file_digest, route_cost_matrix
+from ssa_engine import ssa_search
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 << 20
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# Per-worker state: node positions, their neighbour table and the attached cost matrix block
+_worker = {}
+
+
+def _init_worker(xy, ls_neighbors=0):
+    """Pool initializer: build the full-graph neighbour table for local search once"""
+    _worker['xy'] = xy
+    _worker['neighbors'] = (nearest_neighbors(xy, ls_neighbors).tolist()
+                            if xy is not None and ls_neighbors else None)
+    _worker['blocks'] = {}
+
+
+def _attached_cost_matrix(block_name, num_nodes):
+    """Map the named cost matrix block, dropping the one of an older graph version"""
+    blocks = _worker['blocks']
+    if block_name not in blocks:
+        stale = [shm for shm, _ in blocks.values()]
+        blocks.clear()
+        for shm in stale:
+            shm.close()
+        shm = shared_memory.SharedMemory(name=block_name)
+        blocks[block_name] = (shm, np.ndarray((num_nodes, num_nodes), dtype=np.float64, buffer=shm.buf))
+    return blocks[block_name][1]
+
+
+def _sub_neighbors(neighbors, keep, num_nodes):
+    """Neighbour lists of the nodes `keep`, renumbered to their positions in it.
+
+    Neighbours outside `keep` are dropped, so each row keeps the nearest of
+    its original candidates that are still in the sub-problem.
+    """
+    local = [-1] * num_nodes
+    for i, v in enumerate(keep.tolist()):
+        local[v] = i
+    return [[local[b] for b in neighbors[v] if local[b] >= 0] for v in keep.tolist()]
+
+
+def _request_neighbors(nodes, ls_neighbors):
+    """Neighbour lists of a request's nodes, in their local numbering.
+
+    Stops covering most of the graph slice the worker's full-graph table.
+    Fewer stops would lose most of their candidates that way, so the table
+    is built over the stops instead, at the cost of their cost sub-matrix.
+    """
+    neighbors = _worker['neighbors']
+    if 2 * len(nodes) >= len(neighbors):
+        return _sub_neighbors(neighbors, nodes, len(neighbors))
+    return nearest_neighbors(_worker['xy'][nodes], ls_neighbors).tolist()
+
+
+def _pinned_local_search(costs, search_costs, neighbors, s=None, e=None):
+    """improve(route, active) for a search whose endpoints may be pinned.
+
+    2-opt needs the symmetric `costs`, not the penalized `search_costs`, so
+    the pinned nodes `s` and `e` are taken out, the rest of the route is
+    polished on `costs` and they are put back at the ends. The gain is
+    measured on `search_costs`; a pass that does not lower it changes nothing.
+    The service checked once that the cost matrix is symmetric.
+    """
+    pinned = [v for v in (s, e) if v is not None]
+    if not pinned:
+        return make_local_search(costs, neighbors, check_symmetric=False)
+    keep = np.setdiff1d(np.arange(len(costs)), pinned)
+    local = np.full(len(costs), -1)
+    local[keep] = np.arange(len(keep))
+    inner_improve = make_local_search(costs[np.ix_(keep, keep)], _sub_neighbors(neighbors, keep, len(costs)),
+                                      check_symmetric=False)
+    head, tail = ([s] if s is not None else []), ([e] if e is not None else [])
+
+    def improve(route, active=None):
+        route = np.asarray(route)
+        inner = local[route]
+        inner = inner[inner >= 0]
+        if active is not None:
+            active = [int(v) for v in local[np.asarray(active, dtype=np.intp)] if v >= 0]
+        inner, _ = inner_improve(inner, active)
+        new_route = np.concatenate([head, keep[inner], tail]).astype(route.dtype)
+        gain = (search_costs[route[:-1], route[1:]].sum()
+                - search_costs[new_route[:-1], new_route[1:]].sum())
+        if gain <= 0:
+            return route, 0.0
+        return new_route, float(gain)
+    return improve
+
+
+def _solve(block_name, num_nodes, stops, start, end, max_iter, pop_size, seed, ls_neighbors):
+    """Worker task: SSA over the stops' sub-matrix. Returns (route, cost)."""
+    cost_matrix = _attached_cost_matrix(block_name, num_nodes)
+    nodes = np.arange(num_nodes) if stops is None else np.asarray(stops, dtype=np.intp)
+    if len(nodes) < 2:
+        return nodes.tolist(), 0.0
+    costs = cost_matrix[np.ix_(nodes, nodes)]
+    search_costs = costs
+    s = int(np.searchsorted(nodes, start)) if start is not None else None
+    e = int(np.searchsorted(nodes, end)) if end is not None else None
+    if s is not None or e is not None:
+        # Entering the start or leaving the end costs more than any whole route
+        search_costs = costs.copy()
+        big = float(costs.max()) * len(nodes) + 1.0
+        if s is not None:
+            search_costs[:, s] += big
+        if e is not None:
+            search_costs[e, :] += big
+    improve = None
+    if ls_neighbors:
+        improve = _pinned_local_search(costs, search_costs, _request_neighbors(nodes, ls_neighbors), s, e)
+    best_route, _, _ = ssa_search(search_costs, max_iter, pop_size, np.random.default_rng(seed), improve=improve)
+    route = best_route.tolist()
+    if s is not None:
+        route.remove(s)
+        route.insert(0, s)
+    if e is not None:
+        route.remove(e)
+        route.append(e)
+    return nodes[route].tolist(), float(costs[route[:-1], route[1:]].sum())
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+# One costed version of the graph: shared cost matrix block, the predecessors for path expansion
+# and whether the matrix is symmetric, which local search requires
+GraphVersion = namedtuple('GraphVersion', ['version', 'block', 'pred', 'symmetric'])
+
+
+class RouteService:
+    """Costed graph, worker pool and result cache behind the server"""
+
+    def __init__(self, num_nodes, src, dst, weights, graph_id, xy=None, places=None, jammed_edges=None,
+                 workers=2, cache_size=1024, jam_penalty=DEFAULT_JAM_PENALTY,
+                 building_penalty=DEFAULT_BUILDING_PENALTY, raw_weights=False, cache_dir=DEFAULT_CACHE_DIR,
+                 ls_neighbors=8):
+        self.num_nodes = num_nodes
+        self.src, self.dst, self.weights = src, dst, weights
+        self.graph_id = graph_id
+        self.xy = xy
+        self.places = places or []
+        self.jam_penalty = jam_penalty
+        self.building_penalty = building_penalty
+        self.raw_weights = raw_weights
+        self.cache_dir = cache_dir
+        self.ls_neighbors = ls_neighbors
+        self.cache = LRUCache(cache_size)
+        self.jam_updates = 0
+        self.multiplier = None
+        self.current = None
+        # Shared blocks by name: [SharedMemory, requests in flight]; old blocks go once idle
+        self._blocks = {}
+        self._pending = {}
+        self._jam_lock = asyncio.Lock()
+        self.set_jams(jammed_edges or [])
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(xy, ls_neighbors))
+
+    def _costed(self, jammed_edges):
+        """(multiplier, cost_matrix, pred) for a set of jams, or None if no road changed"""
+        multiplier = edge_penalties(self.num_nodes, self.src, self.dst, self.xy, jammed_edges, self.places,
+                                    self.jam_penalty, self.building_penalty)
+        if self.multiplier is not None and np.array_equal(multiplier, self.multiplier):
+            return None
+        adj_matrix = np.zeros((self.num_nodes, self.num_nodes))
+        adj_matrix[self.src, self.dst] = self.weights
+        route_matrix = penalized_adjacency(adj_matrix, multiplier, self.src, self.dst)
+        if self.raw_weights:
+            return multiplier, route_matrix, None
+        dist, pred = cached_shortest_paths(route_matrix, None, self.cache_dir)
+        return multiplier, route_cost_matrix(dist), pred
+
+    def _install(self, multiplier, cost_matrix, pred):
+        """Publish a new cost matrix block as the current graph version"""
+        shm = shared_memory.SharedMemory(create=True, size=max(cost_matrix.nbytes, 1))
+        np.ndarray(cost_matrix.shape, dtype=np.float64, buffer=shm.buf)[:] = cost_matrix
+        self._blocks[shm.name] = [shm, 0]
+        previous = self.current
+        if previous is not None:
+            self.jam_updates += 1
+        self.multiplier = multiplier
+        self.current = GraphVersion(f"{self.graph_id}-{self.jam_updates}", shm.name, pred,
+                                    bool(np.allclose(cost_matrix, cost_matrix.T)))
+        self.cache.clear()
+        if previous is not None:
+            self._release_block(previous.block, 0)
+
+    def set_jams(self, jammed_edges):
+        """Re-cost the graph for a new set of jams; returns False if no road changed"""
+        costed = self._costed(jammed_edges)
+        if costed is None:
+            return False
+        self._install(*costed)
+        return True
+
+    def _release_block(self, name, count=1):
+        entry = self._blocks[name]
+        entry[1] -= count
+        if entry[1] <= 0 and name != self.current.block:
+            entry[0].close()
+            entry[0].unlink()
+            del self._blocks[name]
+
+    async def update_jams(self, jammed_edges):
+        async with self._jam_lock:
+            loop = asyncio.get_running_loop()
+            # Shortest paths are recomputed off the event loop; the swap happens on it
+            costed = await loop.run_in_executor(None, self._costed, jammed_edges)
+            if costed is not None:
+                self._install(*costed)
+        return {'changed': costed is not None, 'graph_version': self.current.version, 'jams': len(jammed_edges)}
+
+    async def route(self, request):
+        """Answer a parsed route request from the cache or the worker pool"""
+        graph = self.current
+        if request[-1] and not graph.symmetric:
+            raise ValueError("Local search requires a symmetric cost matrix")
+        key = (graph.version,) + request
+        if key in self._pending:
+            # Served by the solve already in flight: one hit, not another miss
+            self.cache.hits += 1
+            return dict(await asyncio.shield(self._pending[key]), cached=True)
+        result = self.cache.get(key)
+        if result is not None:
+            return dict(result, cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self._blocks[graph.block][1] += 1
+        try:
+            stops, start, end, max_iter, pop_size, seed, local_search = request
+            start_time = time.perf_counter()
+            route, cost = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _solve, graph.block, self.num_nodes, stops, start, end, max_iter, pop_size, seed,
+                self.ls_neighbors if local_search else 0)
+            path = route if graph.pred is None else expand_route(route, graph.pred)
+            result = {'route': route, 'path': path, 'cost': cost, 'graph_version': graph.version,
+                      'solve_time': round(time.perf_counter() - start_time, 6)}
+            if graph.version == self.current.version:
+                self.cache.put(key, result)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so waiters that never came do not trigger a warning
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+            self._release_block(graph.block)
+        return dict(result, cached=False)
+
+    def health(self):
+        return {'status': 'ok', 'graph_version': self.current.version, 'nodes': self.num_nodes,
+                'edges': len(self.src), 'cache': self.cache.stats(), 'in_flight': len(self._pending)}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        for shm, _ in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks.clear()
+
+
+def _is_node(value, num_nodes):
+    """True for an int node id in range; JSON true/false decode to bools, which are not ids"""
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value < num_nodes
+
+
+def parse_route_request(body, num_nodes, has_coords):
+    """Validate a /route JSON body into a hashable (stops, start, end, max_iter, pop_size, seed,
+    local_search) tuple; raises ValueError on bad input"""
+    params = json.loads(body or b'{}')
+    if not isinstance(params, dict):
+        raise ValueError("request body must be a JSON object")
+    unknown = set(params) - {'stops', 'start', 'end', 'max_iter', 'pop_size', 'seed', 'local_search'}
+    if unknown:
+        raise ValueError(f"unknown parameters: {', '.join(sorted(unknown))}")
+
+    def node(name):
+        value = params.get(name)
+        if value is None:
+            return None
+        if not _is_node(value, num_nodes):
+            raise ValueError(f"{name} must be a node id in 0..{num_nodes - 1}")
+        return value
+
+    start, end = node('start'), node('end')
+    if start is not None and start == end:
+        raise ValueError("start and end must differ")
+    stops = params.get('stops')
+    if stops is not None:
+        if not isinstance(stops, list) or not all(_is_node(v, num_nodes) for v in stops):
+            raise ValueError(f"stops must be a list of node ids in 0..{num_nodes - 1}")
+        stops = tuple(sorted(set(stops) | {v for v in (start, end) if v is not None}))
+    max_iter, pop_size = params.get('max_iter', 100), params.get('pop_size', 20)
+    for name, value in (('max_iter', max_iter), ('pop_size', pop_size)):
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            raise ValueError(f"{name} must be a positive integer")
+    seed = params.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValueError("seed must be a non-negative integer")
+    local_search = bool(params.get('local_search', False))
+    if local_search and not has_coords:
+        raise ValueError("local_search needs a server started with --coords")
+    return stops, start, end, max_iter, pop_size, seed, local_search
+
+
+def parse_jams_request(body, num_nodes):
+    """Validate a /jams JSON body into a list of (src, dst) pairs; raises ValueError on bad input"""
+    params = json.loads(body or b'{}')
+    jams = params.get('jams') if isinstance(params, dict) else None
+    if not isinstance(jams, list) or not all(
+            isinstance(jam, list) and len(jam) == 2 and all(_is_node(v, num_nodes) for v in jam) for jam in jams):
+        raise ValueError(f"jams must be a list of [src, dst] pairs of node ids in 0..{num_nodes - 1}")
+    return [tuple(jam) for jam in jams]
+
+
+async def dispatch(service, method, path, body):
+    """Return (status, payload) for one HTTP request"""
+    routes = {'/health': 'GET', '/route': 'POST', '/jams': 'POST'}
+    if path not in routes:
+        return 404, {'error': f"unknown path {path}"}
+    if method != routes[path]:
+        return 405, {'error': f"{path} expects {routes[path]}"}
+    try:
+        if path == '/health':
+            return 200, service.health()
+        if path == '/route':
+            request = parse_route_request(body, service.num_nodes, service.xy is not None)
+            return 200, await service.route(request)
+        return 200, await service.update_jams(parse_jams_request(body, service.num_nodes))
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    except Exception as e:
+        return 500, {'error': f"{type(e).__name__}: {e}"}
+
+
+async def handle_connection(service, reader, writer):
+    """Serve HTTP/1.1 requests on one connection until it closes"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            try:
+                method, target, version = request_line.decode('latin1').split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0) or 0)
+            if length > MAX_BODY_BYTES:
+                status, payload, body = 413, {'error': "request body too large"}, None
+            else:
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await dispatch(service, method, target.split('?')[0], body)
+            keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                          and body is not None)
+            data = json.dumps(payload).encode()
+            writer.write((f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix_path=None):
+    handler = functools.partial(handle_connection, service)
+    if unix_path:
+        server = await asyncio.start_unix_server(handler, path=unix_path)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        where = f"http://{host}:{port}"
+    print(f"Serving routes on {where} (graph version {service.current.version}, "
+          f"{service.num_nodes} nodes)", flush=True)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    async with server:
+        await stop.wait()
+    print("Server stopped")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Long-running route server with an in-memory graph and result cache.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--coords', type=str, default=None,
+                   help="Node coordinates .csv, needed for local search and building penalties")
+    p.add_argument('--jams', type=str, default=None, help="Initial jams CSV (src,dst per line)")
+    p.add_argument('--places', type=str, default=None, help="Buildings CSV for building penalties")
+    p.add_argument('--host', type=str, default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    p.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    p.add_argument('--unix', type=str, default=None, help="Listen on this Unix socket instead of TCP")
+    p.add_argument('--workers', type=int, default=2, help="Optimizer worker processes (default: 2)")
+    p.add_argument('--cache-size', type=int, default=1024, help="Cached route results, 0 to disable (default: 1024)")
+    p.add_argument('--jam-penalty', type=float, default=DEFAULT_JAM_PENALTY,
+                   help=f"Extra weight of a jammed road, as a multiple of its length (default: {DEFAULT_JAM_PENALTY})")
+    p.add_argument('--building-penalty', type=float, default=DEFAULT_BUILDING_PENALTY,
+                   help=f"Extra weight per building a road crosses (default: {DEFAULT_BUILDING_PENALTY})")
+    p.add_argument('--raw-weights', action='store_true',
+                   help="Cost hops with raw edge weights instead of shortest-path distances")
+    p.add_argument('--ls-neighbors', type=int, default=8,
+                   help="Candidate neighbours for requests with local_search (default: 8)")
+    p.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                   help=f"Directory for cached shortest-path matrices (default: {DEFAULT_CACHE_DIR})")
+    args = p.parse_args()
+
+    if args.workers <= 0 or args.ls_neighbors <= 0:
+        print("Error: --workers and --ls-neighbors must be positive")
+        return 1
+    if args.cache_size < 0:
+        print("Error: --cache-size cannot be negative")
+        return 1
+    if args.jam_penalty < 0 or args.building_penalty < 0:
+        print("Error: Penalties must be non-negative")
+        return 1
+    if not os.path.exists(args.graph):
+        print(f"Error: Graph file '{args.graph}' not found")
+        return 1
+
+    start = time.perf_counter()
+    num_nodes, src, dst, weights = load_edges(args.graph, args.graph_format)
+    xy = coords_to_array(load_coords(args.coords), num_nodes) if args.coords else None
+    places = load_places(args.places) if xy is not None else []
+    if args.places and xy is None:
+        print("Warning: --places needs --coords, ignoring building penalties")
+    service = RouteService(num_nodes, src, dst, weights, file_digest(args.graph)[:12], xy, places,
+                           load_jams(args.jams), args.workers, args.cache_size, args.jam_penalty,
+                           args.building_penalty, args.raw_weights, args.cache_dir, args.ls_neighbors)
+    print(f"Loaded {num_nodes} nodes and {len(src)} edges in {time.perf_counter() - start:.2f}s")
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    finally:
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""All-pairs shortest paths for route costing.
+
+Routes are permutations of the nodes, so consecutive nodes are often not
+connected by an edge. Costing such a hop with the raw adjacency weight (0 for
+a missing edge) makes jumps look free. Instead the optimizer uses the
+shortest-path distance between the two nodes, and the predecessor table
+expands every hop into the actual road path.
+
+Small graphs are solved with a vectorized Floyd-Warshall, larger sparse ones
+with a batched Dijkstra that relaxes the edges of a block of sources at once
+over the CSR arrays. Results are cached on disk keyed by a hash of the graph
+file, so repeated runs on the same map skip the computation.
+"""
+import hashlib
+import os
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = '.ssa_cache'
+# Floyd-Warshall is O(n^3) but fully vectorized; beyond this Dijkstra wins on sparse graphs
+FLOYD_WARSHALL_MAX_NODES = 500
+# Sources solved together by dijkstra_all, each batch in an (n, batch) block
+DIJKSTRA_BATCH = 128
+_CACHE_FORMAT = 1
+
+
+def floyd_warshall(adj_matrix):
+    """Return (dist, pred) for a dense adjacency matrix (0 = no edge).
+
+    pred[s, v] is the node before v on the shortest s->v path, -1 if v is s
+    or unreachable. Unreachable distances are inf.
+    """
+    adj_matrix = np.asarray(adj_matrix, dtype=np.float64)
+    n = len(adj_matrix)
+    dist = np.where(adj_matrix > 0, adj_matrix, np.inf)
+    np.fill_diagonal(dist, 0.0)
+    pred = np.where(np.isfinite(dist), np.arange(n)[:, None], -1).astype(np.int32)
+    np.fill_diagonal(pred, -1)
+    for k in range(n):
+        through_k = dist[:, k, None] + dist[None, k, :]
+        better = through_k < dist
+        dist = np.where(better, through_k, dist)
+        pred = np.where(better, pred[k][None, :], pred)
+    return dist, pred
+
+
+def _edge_ids(indptr, nodes):
+    """Indices of the CSR edges leaving `nodes`, node by node"""
+    counts = indptr[nodes + 1] - indptr[nodes]
+    starts = np.repeat(indptr[nodes] - (np.cumsum(counts) - counts), counts)
+    return starts + np.arange(int(counts.sum()))
+
+
+def _slot_tables(n, indptr, indices, weights):
+    """Edge tables of a CSR graph for _solve_batch.
+
+    Nodes are relabelled by decreasing out-degree. Slot k holds the k-th
+    out-edge (neighbour label, weight) of every node with more than k edges;
+    after relabelling those nodes are a prefix, so slot k of a frontier
+    sorted by node is relaxed from a prefix of the frontier as well. Returns
+    (order, label, nodes_per_slot, slots, delta) where order[label[v]] == v
+    and delta, the mean edge weight, is the step of the distance limits.
+    """
+    indptr = np.asarray(indptr, dtype=np.int64)
+    indices = np.asarray(indices, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    degree = np.diff(indptr)
+    order = np.argsort(-degree, kind='stable')
+    label = np.empty(n, dtype=np.int64)
+    label[order] = np.arange(n)
+    edges = _edge_ids(indptr, order)
+    firsts = np.cumsum(degree[order]) - degree[order]
+    max_degree = int(degree.max()) if n else 0
+    nodes_per_slot = np.searchsorted(-degree[order], -np.arange(1, max_degree + 1), side='right')
+    slots = [(label[indices[edges[firsts[:m] + k]]], weights[edges[firsts[:m] + k]])
+             for k, m in enumerate(nodes_per_slot.tolist())]
+    delta = float(weights.mean()) if len(weights) else 1.0
+    return order, label, nodes_per_slot, slots, delta
+
+
+def _solve_batch(tables, n, sources):
+    """(dist, pred) rows of `sources`, solved together by frontier relaxation.
+
+    Distances are kept node-major in an (n, len(sources)) block, so the
+    (node, source) pairs of a node are contiguous, and every round relaxes
+    the out-edges of all pending pairs with array operations. As in
+    delta-stepping, each source has a distance limit: only its pending pairs
+    below the limit are relaxed, and when there are none the limit moves to
+    its nearest pending pair plus delta. Pairs then settle in close to
+    Dijkstra order and are seldom relaxed twice.
+    """
+    order, label, nodes_per_slot, slots, delta = tables
+    b = len(sources)
+    dist = np.full(n * b, np.inf)
+    pred = np.full(n * b, -1, dtype=np.int32)
+    pending = np.zeros(n * b, dtype=bool)
+    first = label[sources] * b + np.arange(b)
+    dist[first] = 0.0
+    pending[first] = True
+    limit = np.full(b, delta)
+    while True:
+        pairs = np.flatnonzero(pending)
+        if not len(pairs):
+            break
+        col = pairs % b
+        reached = dist[pairs]
+        ready = reached <= limit[col]
+        if not ready.all():
+            stalled = np.ones(b, dtype=bool)
+            stalled[col[ready]] = False
+            if stalled.any():
+                nearest = np.full(b, np.inf)
+                np.minimum.at(nearest, col, reached)
+                stalled &= np.isfinite(nearest)
+                limit[stalled] = nearest[stalled] + delta
+                ready = reached <= limit[col]
+            pairs, col, reached = pairs[ready], col[ready], reached[ready]
+        pending[pairs] = False
+        node = pairs // b
+        keys, values, tails = [], [], []
+        for (neighbor, weight), m in zip(slots, np.searchsorted(node, nodes_per_slot).tolist()):
+            if not m:
+                break
+            tail = node[:m]
+            value = reached[:m] + weight[tail]
+            key = neighbor[tail] * b + col[:m]
+            better = np.flatnonzero(value < dist[key])
+            keys.append(key.take(better))
+            values.append(value.take(better))
+            tails.append(tail.take(better))
+        if not keys:
+            continue
+        key, value = np.concatenate(keys), np.concatenate(values)
+        np.minimum.at(dist, key, value)
+        won = value == dist[key]
+        pending[key[won]] = True
+        pred[key[won]] = order[np.concatenate(tails)[won]]
+    return dist.reshape(n, b)[label].T, pred.reshape(n, b)[label].T
+
+
+def dijkstra_all(n, indptr, indices, weights, sources=None, out=None, batch_size=DIJKSTRA_BATCH):
+    """Return (dist, pred) of the shortest paths from every source of a CSR graph.
+
+    Sources are solved `batch_size` at a time by _solve_batch, each batch
+    filling its rows of the dense (n, n) outputs. With `sources` only those
+    rows are computed, into the (dist, pred) arrays given as `out` if any.
+    """
+    if out is None:
+        dist = np.full((n, n), np.inf)
+        pred = np.full((n, n), -1, dtype=np.int32)
+    else:
+        dist, pred = out
+    sources = np.arange(n) if sources is None else np.asarray(sources, dtype=np.int64)
+    tables = _slot_tables(n, indptr, indices, weights)
+    for lo in range(0, len(sources), batch_size):
+        batch = sources[lo:lo + batch_size]
+        dist[batch], pred[batch] = _solve_batch(tables, n, batch)
+    return dist, pred
+
+
+def shortest_path_trees(n, indptr, indices, weights, sources, batch_size=DIJKSTRA_BATCH):
+    """Predecessor rows (len(sources), n) of the shortest-path trees from `sources`.
+
+    Only the trees are kept, so memory grows with the number of sources
+    rather than n x n; -1 marks the source itself and unreachable nodes.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    tables = _slot_tables(n, indptr, indices, weights)
+    pred = np.full((len(sources), n), -1, dtype=np.int32)
+    for lo in range(0, len(sources), batch_size):
+        pred[lo:lo + batch_size] = _solve_batch(tables, n, sources[lo:lo + batch_size])[1]
+    return pred
+
+
+def _csr(adj_matrix):
+    """(indptr, indices, weights) of the edges of a dense adjacency matrix"""
+    n = len(adj_matrix)
+    src, dst = np.nonzero(adj_matrix > 0)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst, adj_matrix[src, dst]
+
+
+def update_shortest_paths(dist, pred, adj_matrix, src, dst, old_weights):
+    """Update (dist, pred) in place after edges src[i] -> dst[i] changed weight.
+
+    adj_matrix holds the new weights and old_weights the previous ones.
+    Sources whose shortest-path tree used a now heavier edge (pred[s, v] == u)
+    are re-solved with dijkstra_all, or everything with all_pairs_shortest_paths
+    when that is most of them; every other row stays valid. Lighter edges
+    are then relaxed one at a time: the s->t distance becomes
+    min(dist[s, t], dist[s, u] + w + dist[v, t]). Returns the number of
+    re-solved sources.
+    """
+    adj_matrix = np.asarray(adj_matrix, dtype=np.float64)
+    src = np.asarray(src, dtype=np.intp)
+    dst = np.asarray(dst, dtype=np.intp)
+    new_weights = adj_matrix[src, dst]
+    old_weights = np.asarray(old_weights, dtype=np.float64)
+    # A missing edge (weight 0) is an infinitely heavy one
+    new_cost = np.where(new_weights > 0, new_weights, np.inf)
+    old_cost = np.where(old_weights > 0, old_weights, np.inf)
+
+    heavier = new_cost > old_cost
+    stale = np.zeros(len(dist), dtype=bool)
+    for u, v in zip(src[heavier].tolist(), dst[heavier].tolist()):
+        stale |= pred[:, v] == u
+    sources = np.flatnonzero(stale)
+    if len(sources) > len(dist) // 2:
+        dist[:], pred[:] = all_pairs_shortest_paths(adj_matrix)
+        return len(dist)
+    if len(sources):
+        dijkstra_all(len(dist), *_csr(adj_matrix), sources=sources, out=(dist, pred))
+
+    lighter = new_cost < old_cost
+    for u, v, w in zip(src[lighter].tolist(), dst[lighter].tolist(), new_cost[lighter].tolist()):
+        through = dist[:, u, None] + w + dist[None, v, :]
+        better = through < dist
+        if better.any():
+            # Paths through u -> v end like the best v -> t path, or at v itself
+            tail = pred[v].copy()
+            tail[v] = u
+            np.copyto(dist, through, where=better)
+            np.copyto(pred, np.broadcast_to(tail, pred.shape), where=better)
+    return len(sources)
+
+
+def all_pairs_shortest_paths(adj_matrix, method='auto'):
+    """Solve all-pairs shortest paths with 'floyd-warshall', 'dijkstra' or 'auto'"""
+    adj_matrix = np.asarray(adj_matrix, dtype=np.float64)
+    n = len(adj_matrix)
+    if method == 'auto':
+        method = 'floyd-warshall' if n <= FLOYD_WARSHALL_MAX_NODES else 'dijkstra'
+    if method == 'floyd-warshall':
+        return floyd_warshall(adj_matrix)
+    return dijkstra_all(n, *_csr(adj_matrix))
+
+
+def file_digest(filename):
+    """SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cached_shortest_paths(adj_matrix, graph_file=None, cache_dir=DEFAULT_CACHE_DIR, method='auto'):
+    """Return (dist, pred), reusing a cached result for the same graph file.
+
+    The cache key is the SHA-256 of `graph_file`, or of the matrix bytes when no
+    file is given. Pass cache_dir=None to disable caching.
+    """
+    if cache_dir is None:
+        return all_pairs_shortest_paths(adj_matrix, method)
+    if graph_file is not None:
+        key = file_digest(graph_file)
+    else:
+        key = hashlib.sha256(np.ascontiguousarray(adj_matrix, dtype=np.float64).tobytes()).hexdigest()
+    path = os.path.join(cache_dir, f"sp-v{_CACHE_FORMAT}-{key}.npz")
+    if os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                if data['dist'].shape == (len(adj_matrix), len(adj_matrix)):
+                    return data['dist'], data['pred']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Ignoring unreadable shortest-path cache {path}: {e}")
+
+    dist, pred = all_pairs_shortest_paths(adj_matrix, method)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a temporary name so concurrent runs never read a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, dist=dist, pred=pred)
+    os.replace(tmp_path, path)
+    return dist, pred
+
+
+def route_cost_matrix(dist):
+    """Turn shortest-path distances into a finite cost matrix for the optimizer.
+
+    Unreachable pairs cost more than any route made only of reachable hops.
+    """
+    finite = np.isfinite(dist)
+    max_finite = dist[finite].max() if finite.any() else 0.0
+    penalty = (max_finite + 1.0) * max(len(dist), 1)
+    return np.where(finite, dist, penalty)
+
+
+def expand_route(route, pred):
+    """Expand a route of (possibly non-adjacent) nodes into the full road path.
+
+    Hops between unreachable nodes are kept as direct jumps.
+    """
+    route = [int(node) for node in route]
+    if not route:
+        return []
+    path = [route[0]]
+    for u, v in zip(route, route[1:]):
+        segment = []
+        node = v
+        while node != u and node != -1:
+            segment.append(node)
+            node = int(pred[u, node])
+        if node == -1:
+            segment = [v]
+        path.extend(reversed(segment))
+    return path
@@ -0,0 +1,134 @@
+"""Uniform-grid spatial index over axis-aligned boxes.
+
+Items (points, edge bounding boxes, building rectangles) are bucketed into
+every grid cell their box overlaps, stored CSR-style so a query gathers the
+candidates of the overlapped cells with a few array slices and then keeps
+the ones whose boxes really intersect the query box. morton_order sorts
+points along a Z-order curve to keep spatial neighbours together.
+"""
+import numpy as np
+
+# Upper bound on cells per side, so the index stays small for huge inputs
+MAX_CELLS_PER_SIDE = 1024
+
+
+def segment_boxes(segments):
+    """(m, 4) xmin, ymin, xmax, ymax boxes of (m, 2, 2) line segments"""
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 2, 2)
+    return np.concatenate([segments.min(axis=1), segments.max(axis=1)], axis=1)
+
+
+def point_boxes(points):
+    """(m, 4) zero-extent boxes of (m, 2) points"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.concatenate([points, points], axis=1)
+
+
+class GridIndex:
+    """Grid of cell_size x cell_size cells over `bounds` holding box ids.
+
+    bounds defaults to the extent of the boxes and cell_size to a value that
+    puts about one item in each cell.
+    """
+
+    def __init__(self, boxes, bounds=None, cell_size=None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        m = len(self.boxes)
+        if bounds is None:
+            if m:
+                bounds = (*self.boxes[:, :2].min(axis=0), *self.boxes[:, 2:].max(axis=0))
+            else:
+                bounds = (0.0, 0.0, 1.0, 1.0)
+        self.bounds = tuple(float(v) for v in bounds)
+        span = max(self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1], 1e-12)
+        if cell_size is None:
+            cell_size = span / max(np.sqrt(m), 1.0)
+        self.cell_size = max(float(cell_size), span / MAX_CELLS_PER_SIDE)
+        self.cells_x = int(np.floor((self.bounds[2] - self.bounds[0]) / self.cell_size)) + 1
+        self.cells_y = int(np.floor((self.bounds[3] - self.bounds[1]) / self.cell_size)) + 1
+
+        items, cells = self._covered_cells(self.boxes)
+        order = np.argsort(cells, kind='stable')
+        self.items = items[order]
+        self.indptr = np.zeros(self.cells_x * self.cells_y + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.cells_x * self.cells_y), out=self.indptr[1:])
+
+    def _cell_range(self, boxes):
+        """Inclusive cell index ranges (x0, y0, x1, y1) covered by each box"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        lo = np.floor((boxes[:, :2] - self.bounds[:2]) / self.cell_size).astype(np.int64)
+        hi = np.floor((boxes[:, 2:] - self.bounds[:2]) / self.cell_size).astype(np.int64)
+        limit = np.array([self.cells_x - 1, self.cells_y - 1])
+        lo = np.clip(lo, 0, limit)
+        hi = np.clip(hi, 0, limit)
+        return lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1]
+
+    def _covered_cells(self, boxes):
+        """(box id, cell id) for every grid cell each box overlaps"""
+        x0, y0, x1, y1 = self._cell_range(boxes)
+        widths = x1 - x0 + 1
+        per_box = widths * (y1 - y0 + 1)
+        owners = np.repeat(np.arange(len(per_box), dtype=np.int64), per_box)
+        # Offset of each entry within its box's block of cells
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+        cx = np.repeat(x0, per_box) + local % np.repeat(widths, per_box)
+        cy = np.repeat(y0, per_box) + local // np.repeat(widths, per_box)
+        return owners, cy * self.cells_x + cx
+
+    def query_many(self, boxes):
+        """(query id, item id) pairs for every query box and item box that intersect.
+
+        Vectorized over all queries: the candidates of every covered cell are
+        gathered from the CSR arrays at once, deduplicated and box-filtered.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        owners, cells = self._covered_cells(boxes)
+        starts = self.indptr[cells]
+        counts = self.indptr[cells + 1] - starts
+        owners = np.repeat(owners, counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        items = self.items[np.repeat(starts, counts) + local]
+        pairs = np.unique(owners * max(len(self.boxes), 1) + items)
+        owners, items = np.divmod(pairs, max(len(self.boxes), 1))
+        q, b = boxes[owners], self.boxes[items]
+        hit = (b[:, 0] <= q[:, 2]) & (b[:, 2] >= q[:, 0]) & (b[:, 1] <= q[:, 3]) & (b[:, 3] >= q[:, 1])
+        return owners[hit], items[hit]
+
+    def query(self, box):
+        """Sorted ids of the boxes intersecting box = (xmin, ymin, xmax, ymax)"""
+        (x0,), (y0,), (x1,), (y1,) = self._cell_range(box)
+        rows = [self.items[self.indptr[cy * self.cells_x + x0]:self.indptr[cy * self.cells_x + x1 + 1]]
+                for cy in range(y0, y1 + 1)]
+        candidates = np.unique(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+        b = self.boxes[candidates]
+        hit = (b[:, 0] <= box[2]) & (b[:, 2] >= box[0]) & (b[:, 1] <= box[3]) & (b[:, 3] >= box[1])
+        return candidates[hit]
+
+
+def _spread_bits(v):
+    """Insert a zero bit after each of the low 16 bits of uint64 values"""
+    v = v & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def morton_order(points):
+    """Indices sorting (m, 2) points along a Z-order (Morton) curve.
+
+    Points close together on the curve are close in space, so consecutive
+    runs of the order form compact neighbourhoods. Points with NaN
+    coordinates go last.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    finite = np.isfinite(points).all(axis=1)
+    codes = np.full(len(points), np.iinfo(np.int64).max, dtype=np.int64)
+    if finite.any():
+        p = points[finite]
+        lo = p.min(axis=0)
+        span = np.maximum(p.max(axis=0) - lo, 1e-12)
+        q = np.minimum((p - lo) / span * 65536, 65535).astype(np.uint64)
+        codes[finite] = (_spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << np.uint64(1))).astype(np.int64)
+    return np.argsort(codes, kind='stable')
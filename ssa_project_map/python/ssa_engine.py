@@ -0,0 +1,240 @@
+"""Array-backed Sparrow Search Algorithm engine.
+
+The whole population lives in one (population_size, n) int32 array, one
+permutation of the nodes per row. Fitness for every sparrow comes from a single
+gather over the adjacency matrix, and the producer, scrounger and
+danger-awareness operators are applied to blocks of rows at once using a
+numpy.random.Generator.
+"""
+import time
+
+import numpy as np
+
+
+def random_population(rng, population_size, n):
+    """Return population_size random permutations of range(n) as int32 rows"""
+    base = np.tile(np.arange(n, dtype=np.int32), (population_size, 1))
+    return rng.permuted(base, axis=1)
+
+
+def evaluate_population(adj_matrix, population):
+    """Total route weight of every row of the population"""
+    if population.shape[1] < 2:
+        return np.zeros(len(population))
+    return adj_matrix[population[:, :-1], population[:, 1:]].sum(axis=1)
+
+
+def _swap_edges_cost(adj_matrix, population, rows, a, b):
+    """Weight of the (at most 4) route edges touching positions a and b.
+
+    Edge e joins positions e and e + 1. When a and b are adjacent the shared
+    edge is only counted once.
+    """
+    n = population.shape[1]
+    lo = np.minimum(a, b)
+    hi = np.maximum(a, b)
+    edges = np.stack([lo - 1, lo, hi - 1, hi], axis=1)
+    valid = (edges >= 0) & (edges <= n - 2)
+    valid[:, 2] &= hi - 1 != lo
+    edges = np.clip(edges, 0, max(n - 2, 0))
+    u = population[rows[:, None], edges]
+    v = population[rows[:, None], edges + 1]
+    return np.where(valid, adj_matrix[u, v], 0.0).sum(axis=1)
+
+
+def producer_step(rng, population, num_producers, adj_matrix=None, fitness=None, focus=None):
+    """Swap two distinct random positions in each of the first num_producers rows.
+
+    Returns the swapped position arrays (a, b), or None if nothing was swapped.
+    If adj_matrix and fitness are given, fitness of the producers is updated
+    in place from the 4 edges each swap touches instead of a full re-sum.
+    With `focus`, an array of node ids, the first position of every swap holds
+    a randomly chosen focus node instead of being uniform.
+    """
+    n = population.shape[1]
+    if n < 2 or num_producers == 0:
+        return None
+    rows = np.arange(num_producers)
+    if focus is not None and len(focus):
+        # Position of each chosen node in its row, from the inverse permutations
+        where = np.empty((num_producers, n), dtype=np.int64)
+        where[rows[:, None], population[:num_producers]] = np.arange(n)
+        a = where[rows, focus[rng.integers(0, len(focus), num_producers)]]
+    else:
+        a = rng.integers(0, n, num_producers)
+    b = (a + rng.integers(1, n, num_producers)) % n
+    if fitness is not None:
+        fitness[rows] -= _swap_edges_cost(adj_matrix, population, rows, a, b)
+    tmp = population[rows, a]
+    population[rows, a] = population[rows, b]
+    population[rows, b] = tmp
+    if fitness is not None:
+        fitness[rows] += _swap_edges_cost(adj_matrix, population, rows, a, b)
+    return a, b
+
+
+def scrounger_step(rng, population, num_producers, best_route, adj_matrix=None, fitness=None):
+    """Replace the scroungers with copies of best_route, second half shuffled.
+
+    If adj_matrix and fitness are given, scrounger fitness is the cost of the
+    untouched first half of best_route plus a re-sum of the shuffled half.
+    """
+    half = population.shape[1] // 2
+    population[num_producers:] = best_route
+    population[num_producers:, half:] = rng.permuted(population[num_producers:, half:], axis=1)
+    if fitness is not None:
+        split = max(half - 1, 0)
+        prefix = evaluate_population(adj_matrix, best_route[None, :split + 1])[0]
+        fitness[num_producers:] = prefix + evaluate_population(adj_matrix, population[num_producers:, split:])
+
+
+def danger_step(rng, population, danger_count):
+    """Restart danger_count randomly chosen sparrows from random permutations"""
+    idx = rng.integers(0, len(population), danger_count)
+    population[idx] = random_population(rng, danger_count, population.shape[1])
+    return idx
+
+
+def local_search_step(population, fitness, num_producers, improve, swaps, polished):
+    """Memetic stage: polish the producers with improve(route, active).
+
+    Producers that were already polished are only re-examined around their
+    swapped positions; the others get a full pass.
+    """
+    n = population.shape[1]
+    for r in range(min(num_producers, len(population))):
+        active = None
+        if polished[r] and swaps is not None:
+            a, b = swaps[0][r], swaps[1][r]
+            positions = np.clip([a - 1, a, a + 1, b - 1, b, b + 1], 0, n - 1)
+            active = population[r, positions].tolist()
+        route, gain = improve(population[r], active)
+        population[r] = route
+        fitness[r] -= gain
+        polished[r] = True
+
+
+def iter_ssa(adj_matrix, population, iterations, rng, best_route=None, best_fitness=np.inf,
+             check_fitness=False, improve=None, edge_visits=None, focus_nodes=None, records=True):
+    """Evolve `population` in place, yielding one telemetry record per iteration.
+
+    `best_route`/`best_fitness` carry the best solution found so far (for
+    example by an earlier call); by default they start from the population.
+    Producer and scrounger fitness is maintained incrementally; only sparrows
+    restarted by the danger-awareness stage are fully re-evaluated. With
+    `check_fitness` every incremental value is verified against a full
+    evaluation (slow, for debugging).
+
+    `improve(route, active)`, e.g. from local_search.make_local_search, adds
+    a memetic stage that refines the producers after their swaps.
+    `edge_visits`, a visit_tracking.EdgeVisits, additionally counts the
+    route transitions of every evaluated population. `focus_nodes` restricts
+    the producers' swaps to moving those nodes, e.g. the ends of roads whose
+    cost just changed (see reoptimize.py).
+
+    Each record is a dict with the iteration number, best and mean fitness,
+    population diversity (mean fraction of positions differing from the best
+    route), per-stage wall times in seconds and the current best route.
+    Mean fitness and diversity are O(population) passes over the routes, so
+    with records=False they are left out (None) for callers that discard the
+    records. The generator returns (best_route, best_fitness, visit_counts).
+    """
+    adj_matrix = np.asarray(adj_matrix, dtype=np.float64)
+    population_size, n = population.shape
+    num_producers = max(population_size // 5, 1)
+    danger_count = max(population_size // 10, 1)
+    visit_counts = np.zeros(n, dtype=np.int64)
+    if focus_nodes is not None:
+        focus_nodes = np.asarray(focus_nodes, dtype=np.int64)
+
+    fitness = evaluate_population(adj_matrix, population)
+    polished = np.zeros(population_size, dtype=bool)
+    best_idx = int(np.argmin(fitness))
+    if best_route is None or fitness[best_idx] < best_fitness:
+        best_route = population[best_idx].copy()
+        best_fitness = fitness[best_idx]
+
+    for iteration in range(iterations):
+        t0 = time.perf_counter()
+        # Sort by fitness so the producers are the current elite
+        order = np.argsort(fitness, kind='stable')
+        population[:] = population[order]
+        fitness = fitness[order]
+        polished = polished[order]
+
+        swaps = producer_step(rng, population, num_producers, adj_matrix, fitness, focus_nodes)
+        t1 = time.perf_counter()
+        if improve is not None:
+            local_search_step(population, fitness, num_producers, improve, swaps, polished)
+        t2 = time.perf_counter()
+        scrounger_step(rng, population, num_producers, best_route, adj_matrix, fitness)
+        polished[num_producers:] = False
+        t3 = time.perf_counter()
+        restarted = np.unique(danger_step(rng, population, danger_count))
+        polished[restarted] = False
+        t4 = time.perf_counter()
+
+        # Evaluate restarted routes, update best, and visit tracking
+        fitness[restarted] = evaluate_population(adj_matrix, population[restarted])
+        if check_fitness:
+            full = evaluate_population(adj_matrix, population)
+            if not np.allclose(fitness, full):
+                bad = int(np.argmax(np.abs(fitness - full)))
+                raise AssertionError(
+                    f"Incremental fitness of sparrow {bad} is {fitness[bad]}, full evaluation gives {full[bad]}")
+        visit_counts += np.bincount(population.ravel(), minlength=n)
+        if edge_visits is not None:
+            edge_visits.add(population)
+        best_idx = int(np.argmin(fitness))
+        if fitness[best_idx] < best_fitness:
+            best_fitness = fitness[best_idx]
+            best_route = population[best_idx].copy()
+        t5 = time.perf_counter()
+
+        yield {
+            'iteration': iteration,
+            'best_fitness': float(best_fitness),
+            'mean_fitness': float(fitness.mean()) if records else None,
+            'diversity': float((population != best_route).mean()) if records else None,
+            'time_producer': t1 - t0,
+            'time_local_search': t2 - t1,
+            'time_scrounger': t3 - t2,
+            'time_danger': t4 - t3,
+            'time_evaluate': t5 - t4,
+            'best_route': best_route,
+        }
+
+    return best_route, float(best_fitness), visit_counts
+
+
+def ssa_evolve(adj_matrix, population, iterations, rng, best_route=None, best_fitness=np.inf,
+               check_fitness=False, improve=None, callback=None, edge_visits=None, focus_nodes=None):
+    """Run iter_ssa to completion, passing each record to `callback` if given.
+
+    The record statistics are only computed when there is a callback.
+    Returns (best_route, best_fitness, visit_counts).
+    """
+    run = iter_ssa(adj_matrix, population, iterations, rng, best_route, best_fitness,
+                   check_fitness, improve, edge_visits, focus_nodes, records=callback is not None)
+    while True:
+        try:
+            record = next(run)
+        except StopIteration as done:
+            return done.value
+        if callback is not None:
+            callback(record)
+
+
+def ssa_search(adj_matrix, max_iter=100, population_size=30, rng=None, check_fitness=False,
+               improve=None, callback=None, edge_visits=None):
+    """Run SSA on a dense adjacency matrix from a random initial population.
+
+    Returns (best_route, best_fitness, visit_counts) where best_route is an
+    int32 array and visit_counts holds how often each node appeared in an
+    evaluated route.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    population = random_population(rng, population_size, len(adj_matrix))
+    return ssa_evolve(adj_matrix, population, max_iter, rng, check_fitness=check_fitness,
+                      improve=improve, callback=callback, edge_visits=edge_visits)
@@ -0,0 +1,78 @@
+"""In-process binding to the C SSA engine.
+
+`make lib` builds c_src/ssa.c and c_src/graph.c into libssa.so, and this
+module calls its `ssa_solve_matrix` through ctypes. The cost matrix is
+passed as a pointer to the NumPy buffer. The best route and the visit counts
+are written straight into NumPy arrays. Nothing is copied for C-contiguous
+float64/int32 arrays, and no files are read or written: unlike `ssa_sim`,
+the library path of the C code skips visit_matrix.txt, node_visits.txt and
+route_stats.txt.
+
+The C engine draws from the C library's global rand(), so runs must not
+overlap in several threads of one process.
+"""
+import ctypes
+import os
+import time
+
+import numpy as np
+
+LIBRARY_NAME = 'libssa.so'
+# `make lib` writes the library next to ssa_sim in the project root
+DEFAULT_LIBRARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), LIBRARY_NAME)
+
+_lib = None
+
+
+def load_library(path=None):
+    """Load libssa.so once and declare its signature; raises OSError if it is missing.
+
+    The library is looked up at `path`, then $SSA_LIB, then the project root.
+    """
+    global _lib
+    if _lib is None:
+        lib = ctypes.CDLL(path or os.environ.get('SSA_LIB') or DEFAULT_LIBRARY)
+        lib.ssa_solve_matrix.restype = ctypes.c_double
+        lib.ssa_solve_matrix.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_uint,
+                                         ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p]
+        _lib = lib
+    return _lib
+
+
+def _output(array, shape, name):
+    """Check a caller-provided output array, or allocate one"""
+    if array is None:
+        return np.empty(shape, dtype=np.int32)
+    if array.dtype != np.int32 or array.shape != shape or not array.flags.c_contiguous \
+            or not array.flags.writeable:
+        raise ValueError(f"{name} must be a writeable C-contiguous int32 array of shape {shape}")
+    return array
+
+
+def ssa_solve(cost_matrix, max_iter, population_size, seed=None, best_route=None, visit_counts=None,
+              visit_matrix=None):
+    """Run the C engine on an (n, n) cost matrix.
+
+    Writes the best route into `best_route` (n), each node's outgoing plus
+    incoming transition count into `visit_counts` (n) and, when given, every
+    route transition into `visit_matrix` (n, n). Outputs are int32 arrays,
+    allocated when not passed. Without a `seed` the engine is seeded from the
+    clock like ssa_sim. Returns (best_route, visit_counts, route_cost).
+    """
+    lib = load_library()
+    # A no-op for float64 C-contiguous input, otherwise the only copy made
+    cost_matrix = np.ascontiguousarray(cost_matrix, dtype=np.float64)
+    n = len(cost_matrix)
+    if cost_matrix.shape != (n, n):
+        raise ValueError(f"cost matrix must be square, got shape {cost_matrix.shape}")
+    best_route = _output(best_route, (n,), 'best_route')
+    visit_counts = _output(visit_counts, (n,), 'visit_counts')
+    matrix_ptr = None
+    if visit_matrix is not None:
+        visit_matrix = _output(visit_matrix, (n, n), 'visit_matrix')
+        matrix_ptr = visit_matrix.ctypes.data
+    if seed is None:
+        seed = time.time_ns()
+    route_cost = lib.ssa_solve_matrix(n, cost_matrix.ctypes.data, population_size, max_iter, seed & 0xffffffff,
+                                      best_route.ctypes.data, matrix_ptr, visit_counts.ctypes.data)
+    return best_route, visit_counts, route_cost
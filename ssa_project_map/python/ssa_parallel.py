@@ -0,0 +1,158 @@
+"""Island-model SSA across a process pool.
+
+Each worker process evolves one or more independent islands (populations).
+The adjacency matrix and all island populations live in
+multiprocessing.shared_memory blocks, so workers attach to them by name
+instead of receiving pickled copies. Every `migrate_every` iterations the
+islands report their best routes; each island then receives the best route
+of its neighbour in a ring as a migrant replacing its worst sparrow.
+Telemetry records are streamed to the parent through a queue as the
+islands produce them.
+"""
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from local_search import make_local_search
+from ssa_engine import evaluate_population, random_population, ssa_evolve
+
+# Shared blocks attached once per worker process by _attach_shared
+_shared = {}
+
+
+def _attach_shared(adj_name, adj_shape, pop_name, pop_shape, neighbors=None, telemetry=None):
+    """Pool initializer: map the shared adjacency and population blocks.
+
+    With a `neighbors` table the local search is built here, once per
+    worker; the parent has already checked that the matrix is symmetric.
+    `telemetry` is the queue that carries records back to the parent.
+    """
+    adj_shm = shared_memory.SharedMemory(name=adj_name)
+    pop_shm = shared_memory.SharedMemory(name=pop_name)
+    _shared['blocks'] = (adj_shm, pop_shm)
+    _shared['adj'] = np.ndarray(adj_shape, dtype=np.float64, buffer=adj_shm.buf)
+    _shared['pop'] = np.ndarray(pop_shape, dtype=np.int32, buffer=pop_shm.buf)
+    _shared['improve'] = (make_local_search(_shared['adj'], neighbors, check_symmetric=False)
+                          if neighbors is not None else None)
+    _shared['telemetry'] = telemetry
+
+
+def _run_island(island, iterations, first_iteration, seed_seq, best_route, best_fitness, migrant,
+                check_fitness, edge_visits=None):
+    """Evolve one island in place for `iterations` iterations.
+
+    Returns (best_route, best_fitness, visit_counts, records_sent,
+    edge_visits). With a telemetry queue attached, every iteration's record
+    (without the route, numbered from `first_iteration`) is put on it as
+    soon as it is produced; records_sent counts them. edge_visits holds the
+    island's edge counts if a counter was passed in.
+    """
+    adj_matrix = _shared['adj']
+    improve = _shared['improve']
+    telemetry = _shared['telemetry']
+    population = _shared['pop'][island]
+    if migrant is not None:
+        fitness = evaluate_population(adj_matrix, population)
+        population[int(np.argmax(fitness))] = migrant
+    rng = np.random.default_rng(seed_seq)
+    sent = 0
+
+    def collect(record):
+        nonlocal sent
+        record = dict(record, island=island, iteration=record['iteration'] + first_iteration)
+        del record['best_route']
+        telemetry.put(record)
+        sent += 1
+
+    result = ssa_evolve(adj_matrix, population, iterations, rng, best_route, best_fitness, check_fitness,
+                        improve, collect if telemetry is not None else None, edge_visits)
+    return result + (sent, edge_visits)
+
+
+def _stream_records(telemetry, futures, callback):
+    """Pass the islands' queued records to callback until every island has finished and been drained"""
+    received = 0
+    while not (all(future.done() for future in futures)
+               and received == sum(future.result()[3] for future in futures)):
+        try:
+            record = telemetry.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        callback(record)
+        received += 1
+
+
+def ssa_search_parallel(adj_matrix, max_iter=100, population_size=30, workers=2, migrate_every=10,
+                        seed=None, check_fitness=False, neighbors=None, callback=None, edge_visits=None):
+    """Run `workers` SSA islands in parallel and merge their results.
+
+    Each island has its own population of `population_size` sparrows and runs
+    `max_iter` iterations. Passing a k-nearest `neighbors` table enables the
+    2-opt/Or-opt local search stage on every island. `callback` receives the
+    telemetry records of every island (tagged with 'island') while they run,
+    through a queue the parent drains. An `edge_visits` counter receives the edge counts of all
+    islands. Returns (best_route, best_fitness, visit_counts)
+    with the best route over all islands and visit counts summed across them.
+    """
+    adj_matrix = np.ascontiguousarray(adj_matrix, dtype=np.float64)
+    if neighbors is not None:
+        # Validate here once; the workers build their local search without re-checking
+        make_local_search(adj_matrix, neighbors)
+    n = len(adj_matrix)
+    pop_shape = (workers, population_size, n)
+    migrate_every = max(1, migrate_every)
+    root = np.random.SeedSequence(seed)
+    island_seeds = root.spawn(workers)
+
+    adj_shm = shared_memory.SharedMemory(create=True, size=max(adj_matrix.nbytes, 1))
+    pop_shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(pop_shape)) * 4, 1))
+    populations = None
+    telemetry = multiprocessing.Queue() if callback is not None else None
+    try:
+        np.ndarray(adj_matrix.shape, dtype=np.float64, buffer=adj_shm.buf)[:] = adj_matrix
+        populations = np.ndarray(pop_shape, dtype=np.int32, buffer=pop_shm.buf)
+        for island, island_seed in enumerate(island_seeds):
+            init_rng = np.random.default_rng(island_seed.spawn(1)[0])
+            populations[island] = random_population(init_rng, population_size, n)
+
+        best = [(None, np.inf)] * workers
+        visit_counts = np.zeros(n, dtype=np.int64)
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared,
+                                 initargs=(adj_shm.name, adj_matrix.shape, pop_shm.name, pop_shape,
+                                           neighbors, telemetry)) as pool:
+            while done < max_iter:
+                iterations = min(migrate_every, max_iter - done)
+                futures = []
+                for island in range(workers):
+                    # Ring migration: receive the best route of the previous island
+                    migrant = best[island - 1][0] if done else None
+                    futures.append(pool.submit(
+                        _run_island, island, iterations, done, island_seeds[island].spawn(1)[0],
+                        best[island][0], best[island][1], migrant, check_fitness,
+                        edge_visits.spawn() if edge_visits is not None else None))
+                if telemetry is not None:
+                    _stream_records(telemetry, futures, callback)
+                best = []
+                for future in futures:
+                    route, fitness, counts, _, island_edges = future.result()
+                    best.append((route, fitness))
+                    visit_counts += counts
+                    if island_edges is not None:
+                        edge_visits.merge(island_edges)
+                done += iterations
+    finally:
+        # Views must be dropped before the blocks can be closed
+        populations = None
+        adj_shm.close()
+        adj_shm.unlink()
+        pop_shm.close()
+        pop_shm.unlink()
+        if telemetry is not None:
+            telemetry.close()
+
+    best_route, best_fitness = min(best, key=lambda item: item[1])
+    return best_route, float(best_fitness), visit_counts
@@ -0,0 +1,41 @@
+"""Streaming per-iteration optimizer telemetry.
+
+Records produced by ssa_engine.iter_ssa are written as one JSON object per
+line and flushed immediately, so a dashboard can tail the file while the run
+is still going. Nothing is buffered beyond the current line.
+"""
+import json
+import time
+
+# Record keys written to disk; the best route itself is left out
+TELEMETRY_FIELDS = (
+    'island', 'iteration', 'best_fitness', 'mean_fitness', 'diversity',
+    'time_producer', 'time_local_search', 'time_scrounger', 'time_danger', 'time_evaluate',
+)
+
+
+class TelemetryWriter:
+    """Callback that appends SSA records to a JSON Lines file.
+
+    Use as a context manager; every call writes and flushes one line.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = None
+        self._start = None
+
+    def __enter__(self):
+        self._file = open(self.filename, 'w')
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        self._file = None
+
+    def __call__(self, record):
+        line = {key: record[key] for key in TELEMETRY_FIELDS if key in record}
+        line['elapsed'] = round(time.perf_counter() - self._start, 6)
+        self._file.write(json.dumps(line) + '\n')
+        self._file.flush()
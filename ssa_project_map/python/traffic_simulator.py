@@ -1,122 +1,402 @@
+#!/usr/bin/env python3
+"""Time-stepped multi-vehicle traffic simulation over the road network.
+
+Every vehicle drives a precomputed shortest road path, stored for all vehicles
+as one flat array of edge indices (CSR layout). Vehicle state lives in flat
+NumPy arrays (current edge, position in the path, offset along the edge,
+speed), so a step is a handful of array operations whatever the fleet size:
+
+1. Edge occupancy is one bincount over the driving vehicles.
+2. Edge speeds follow Greenshields' model,
+   speed * max(min_speed, 1 - (occupancy - 1) / capacity).
+3. Vehicles advance by speed * dt. Those reaching the end of their edge
+   request the next one, and each edge admits as many as its free capacity
+   allows, longest-waiting first (one lexsort over the requests). A vehicle
+   that has waited --max-wait seconds squeezes in regardless, at most one
+   per edge and step and never more than one past an edge's capacity, which
+   breaks gridlock cycles of full edges waiting on each other.
+4. Every --record-every steps the occupancy vector is appended to an .npy
+   file on disk.
+
+Jams from load_jams reduce the capacity of the jammed roads (both
+directions) to --jam-capacity of normal.
+"""
 import argparse
-import csv
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-
-def load_coords(filename):
-    coords = {}
-    with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            coords[int(row['node'])] = (float(row['x']), float(row['y']))
-    return coords
-
-def load_graph(filename):
-    with open(filename) as f:
-        reader = csv.reader(f)
-        n = int(next(reader)[0])
-        G = nx.DiGraph()
-        for i in range(n):
-            row = list(map(float, next(reader)))
-            for j, w in enumerate(row):
-                if w > 0:
-                    G.add_edge(i, j, weight=w)
-    return G
-
-def load_places(filename):
-    places = []
-    if filename is None:
-        return places
-    with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Supports both rectangles (x1,y1,x2,y2) and polygons (list of x/y pairs, if you want to extend)
-            place = {
-                'name': row['name'],
-                'x1': float(row['x1']),
-                'y1': float(row['y1']),
-                'x2': float(row['x2']),
-                'y2': float(row['y2'])
-            }
-            places.append(place)
-    return places
-
-def load_jams(filename):
-    jammed_edges = []
-    if filename is None:
-        return jammed_edges
-    with open(filename) as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) >= 2:
-                jammed_edges.append((int(row[0]), int(row[1])))
-    return jammed_edges
-
-def draw_map(G, coords, route, places=None, jammed_edges=None):
-    fig, ax = plt.subplots(figsize=(8, 8))
-
-    # Draw buildings/places as rectangles
-    if places:
-        for p in places:
-            rect = Rectangle((p['x1'], p['y1']),
-                             p['x2'] - p['x1'],
-                             p['y2'] - p['y1'],
-                             linewidth=1.5, edgecolor='brown', facecolor='tan', alpha=0.35)
-            ax.add_patch(rect)
-            # Label the building in the center
-            cx = (p['x1'] + p['x2']) / 2
-            cy = (p['y1'] + p['y2']) / 2
-            ax.text(cx, cy, p['name'], fontsize=10, ha='center', va='center', color='brown', alpha=0.8)
-
-    # Draw all edges as light grey
-    nx.draw_networkx_edges(G, coords, ax=ax, edge_color='lightgrey', width=1, alpha=0.6)
-
-    # Draw jammed edges as red
-    if jammed_edges:
-        nx.draw_networkx_edges(G, coords, edgelist=jammed_edges, ax=ax,
-                               edge_color='red', width=3, alpha=0.8, label="Traffic Jam")
-
-    # Draw nodes
-    nx.draw_networkx_nodes(G, coords, ax=ax, node_size=30, node_color='black')
-
-    # Highlight optimal route in green
-    route_edges = list(zip(route, route[1:]))
-    nx.draw_networkx_edges(G, coords, edgelist=route_edges, ax=ax,
-                           edge_color='green', width=4, alpha=0.95, label="Optimal Route")
-
-    # Add a legend
-    from matplotlib.lines import Line2D
-    legend_elements = [
-        Line2D([0], [0], color='lightgrey', lw=2, label='Regular Traffic'),
-        Line2D([0], [0], color='red', lw=3, label='Traffic Jam'),
-        Line2D([0], [0], color='green', lw=4, label='Optimal Route'),
-        Line2D([0], [0], marker='s', color='w', label='Building', markerfacecolor='tan', alpha=0.5, markersize=15)
-    ]
-    ax.legend(handles=legend_elements, loc='upper left')
-
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig('map.png', dpi=300)
-    plt.show()
+import sys
+import time
 
-if __name__ == "__main__":
-    p = argparse.ArgumentParser(description="Draw road network with buildings, jams, and optimal route.")
-    p.add_argument('--graph', type=str, required=True, help="Adjacency matrix .csv")
-    p.add_argument('--coords', type=str, required=True, help="Node coordinates .csv")
-    p.add_argument('--route', type=str, required=True, help="File with optimal route (list of node indices)")
-    p.add_argument('--places', type=str, required=False, help="CSV with building outlines")
-    p.add_argument('--jams', type=str, required=False, help="CSV with jammed edges (src,dst per line)")
+import numpy as np
+
+from draw_map import load_edges, load_jams, load_route
+from graph_io import GRAPH_FORMATS, edges_to_csr
+from route_penalties import jammed_mask
+from shortest_paths import shortest_path_trees
+
+# Vehicle states
+PENDING, DRIVING, ARRIVED = 0, 1, 2
+
+
+def edge_capacity(lengths, spacing=0.5, lanes=1, jammed=None, jam_capacity=0.25):
+    """Vehicles each edge holds at standstill, at least 1 per edge"""
+    capacity = np.floor(np.asarray(lengths, dtype=np.float64) * lanes / spacing)
+    if jammed is not None:
+        capacity = np.where(jammed, np.floor(capacity * jam_capacity), capacity)
+    return np.maximum(capacity, 1).astype(np.int64)
+
+
+def sample_trips(pred, rng, num_vehicles):
+    """Random (source row, destination) pairs, each destination reachable from its source.
+
+    `pred` holds one shortest-path tree per source row; sources that reach no
+    other node get no trips.
+    """
+    reachable = [np.flatnonzero(row >= 0) for row in pred]
+    usable = np.array([i for i, nodes in enumerate(reachable) if len(nodes)], dtype=np.int64)
+    if len(usable) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    rows = usable[rng.integers(0, len(usable), num_vehicles)]
+    destinations = np.empty(num_vehicles, dtype=np.int64)
+    for i in usable:
+        mine = np.flatnonzero(rows == i)
+        destinations[mine] = rng.choice(reachable[i], len(mine))
+    return rows, destinations
+
+
+def trip_paths(num_nodes, src, dst, pred, sources, rows, destinations):
+    """Shortest road paths of trips sources[rows[i]] -> destinations[i] as edge indices.
+
+    Returns (trip_ptr, trip_edges): the path of trip i is
+    trip_edges[trip_ptr[i]:trip_ptr[i + 1]]. All trips are walked back from
+    their destinations together, one hop per array step; unreachable trips
+    get an empty path.
+    """
+    n = num_nodes
+    keys = np.asarray(src, dtype=np.int64) * n + np.asarray(dst, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    origins = np.asarray(sources, dtype=np.int64)[rows]
+
+    num_trips = len(rows)
+    cur = np.asarray(destinations, dtype=np.int64).copy()
+    walking = np.flatnonzero(cur != origins)
+    hops = np.zeros(num_trips, dtype=np.int64)
+    unreachable = np.zeros(num_trips, dtype=bool)
+    who, step, edge = [], [], []
+    while len(walking):
+        prev = pred[rows[walking], cur[walking]].astype(np.int64)
+        lost = prev < 0
+        unreachable[walking[lost]] = True
+        walking, prev = walking[~lost], prev[~lost]
+        idx = np.searchsorted(keys, prev * n + cur[walking])
+        who.append(walking)
+        step.append(hops[walking])
+        edge.append(order[idx])
+        hops[walking] += 1
+        cur[walking] = prev
+        walking = walking[prev != origins[walking]]
+
+    hops[unreachable] = 0
+    trip_ptr = np.zeros(num_trips + 1, dtype=np.int64)
+    np.cumsum(hops, out=trip_ptr[1:])
+    trip_edges = np.empty(trip_ptr[-1], dtype=np.int64)
+    if who:
+        who, step, edge = (np.concatenate(a) for a in (who, step, edge))
+        keep = ~unreachable[who]
+        who, step, edge = who[keep], step[keep], edge[keep]
+        # Steps count back from the destination
+        trip_edges[trip_ptr[who] + hops[who] - 1 - step] = edge
+    return trip_ptr, trip_edges
+
+
+class OccupancyWriter:
+    """Appends per-edge occupancy rows to an .npy file as the simulation runs.
+
+    The header is written up front with a fixed size and rewritten with the
+    final row count on close, so rows go straight to disk and the file is a
+    valid int32 .npy (rows x edges) even if the run stops early.
+    """
+
+    HEADER_SIZE = 128
+
+    def __init__(self, filename, num_edges):
+        self.filename = filename
+        self.num_edges = num_edges
+        self.rows = 0
+        self._file = None
+
+    def _header(self):
+        header = repr({'descr': '<i4', 'fortran_order': False, 'shape': (self.rows, self.num_edges)})
+        header = header.encode('latin1').ljust(self.HEADER_SIZE - 11) + b'\n'
+        return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header
+
+    def __enter__(self):
+        self._file = open(self.filename, 'wb')
+        self._file.write(self._header())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+        self._file = None
+
+    def write(self, occupancy):
+        self._file.write(np.asarray(occupancy, dtype='<i4').tobytes())
+        self.rows += 1
+
+
+class TrafficSimulation:
+    """Vehicle and edge state of a running simulation"""
+
+    def __init__(self, lengths, capacity, free_speed, trip_edges, trip_start, trip_end, departures, min_speed=0.05,
+                 max_wait=120.0):
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.capacity = np.asarray(capacity, dtype=np.int64)
+        self.free_speed = np.broadcast_to(np.asarray(free_speed, dtype=np.float64), self.lengths.shape)
+        self.min_speed = min_speed
+        self.max_wait = max_wait
+        self.trip_edges = np.asarray(trip_edges, dtype=np.int64)
+        self.trip_end = np.asarray(trip_end, dtype=np.int64)
+        self.departures = np.asarray(departures, dtype=np.float64)
+
+        num_vehicles = len(self.departures)
+        # Index into trip_edges of each vehicle's current (or first) edge
+        self.pos = np.asarray(trip_start, dtype=np.int64).copy()
+        self.edge = np.full(num_vehicles, -1, dtype=np.int64)
+        self.offset = np.zeros(num_vehicles)
+        self.speed = np.zeros(num_vehicles)
+        self.state = np.full(num_vehicles, PENDING, dtype=np.int8)
+        # Time each vehicle started waiting for its next edge, inf while it moves
+        self.waiting_since = self.departures.copy()
+        self.arrival = np.full(num_vehicles, np.nan)
+        # Edge entries past a full edge's capacity through the --max-wait escape
+        self.over_capacity = 0
+        self.time = 0.0
+
+    def occupancy(self):
+        """Vehicles on each edge"""
+        driving = self.state == DRIVING
+        return np.bincount(self.edge[driving], minlength=len(self.lengths))
+
+    def step(self, dt):
+        """Advance every vehicle by dt seconds"""
+        now = self.time + dt
+        driving = np.flatnonzero(self.state == DRIVING)
+        edge = self.edge[driving]
+        occupancy = np.bincount(edge, minlength=len(self.lengths))
+        # A vehicle slows down for the others on its edge, not for itself
+        edge_speed = self.free_speed * np.maximum(self.min_speed, 1 - (occupancy - 1) / self.capacity)
+        self.speed[driving] = edge_speed[edge]
+        self.offset[driving] += self.speed[driving] * dt
+
+        at_end = self.offset[driving] >= self.lengths[edge]
+        done, done_edge = driving[at_end], edge[at_end]
+        last = self.pos[done] + 1 >= self.trip_end[done]
+        arrived = done[last]
+        self.state[arrived] = ARRIVED
+        self.arrival[arrived] = now
+        self.edge[arrived] = -1
+        self.speed[arrived] = 0
+        occupancy -= np.bincount(done_edge[last], minlength=len(occupancy))
+
+        # Vehicles at the end of an edge and vehicles departing now queue for their next edge
+        movers = done[~last]
+        self.waiting_since[movers] = np.minimum(self.waiting_since[movers], self.time)
+        starters = np.flatnonzero((self.state == PENDING) & (self.departures <= now))
+        who = np.concatenate([movers, starters])
+        wanted = self.trip_edges[np.concatenate([self.pos[movers] + 1, self.pos[starters]])]
+        order = np.lexsort((self.waiting_since[who], wanted))
+        who, wanted = who[order], wanted[order]
+        rank = np.arange(len(wanted)) - np.searchsorted(wanted, wanted)
+        admit = rank < self.capacity[wanted] - occupancy[wanted]
+        if self.max_wait:
+            overdue = np.flatnonzero(~admit & (self.waiting_since[who] <= now - self.max_wait))
+            # The longest-waiting overdue vehicle of each edge
+            overdue = overdue[np.unique(wanted[overdue], return_index=True)[1]]
+            if len(overdue):
+                self.over_capacity += self._squeeze(who, wanted, admit, overdue, occupancy)
+
+        entering, target = who[admit], wanted[admit]
+        moving = self.state[entering] == DRIVING
+        overshoot = np.where(moving, self.offset[entering] - self.lengths[self.edge[entering]], 0.0)
+        self.pos[entering[moving]] += 1
+        self.edge[entering] = target
+        self.offset[entering] = np.minimum(overshoot, self.lengths[target])
+        self.state[entering] = DRIVING
+        self.waiting_since[entering] = np.inf
+
+        # Blocked vehicles wait at the end of their edge
+        blocked = who[~admit]
+        blocked = blocked[self.state[blocked] == DRIVING]
+        self.offset[blocked] = self.lengths[self.edge[blocked]]
+        self.speed[blocked] = 0
+        self.time = now
+
+    def _squeeze(self, who, wanted, admit, overdue, occupancy):
+        """Admit overdue vehicles so that no edge holds more than capacity + 1.
+
+        A vehicle leaving a full edge makes room for one entering it, so all
+        candidates start admitted and those whose edge would still end up
+        over the limit are dropped until the rest is consistent; a gridlocked
+        cycle of full edges then moves as a whole. Updates `admit` in place
+        and returns the number of vehicles admitted.
+        """
+        n = len(self.lengths)
+        driving = self.state[who] == DRIVING
+        load = (occupancy + np.bincount(wanted[admit], minlength=n)
+                - np.bincount(self.edge[who[admit & driving]], minlength=n))
+        # Work on the few edges the candidates enter or leave
+        source = np.where(driving[overdue], self.edge[who[overdue]], -1)
+        edges = np.unique(np.concatenate([wanted[overdue], source[source >= 0]]))
+        target = np.searchsorted(edges, wanted[overdue])
+        source = np.where(source >= 0, np.searchsorted(edges, source), len(edges))
+        limit = self.capacity[edges] + 1 - load[edges]
+        chosen = np.arange(len(overdue))
+        while len(chosen):
+            net = (np.bincount(target[chosen], minlength=len(edges) + 1)
+                   - np.bincount(source[chosen], minlength=len(edges) + 1))[:-1]
+            fits = net[target[chosen]] <= limit[target[chosen]]
+            if fits.all():
+                break
+            chosen = chosen[fits]
+        admit[overdue[chosen]] = True
+        return len(chosen)
+
+    def counts(self):
+        """Number of pending, driving and arrived vehicles"""
+        return np.bincount(self.state, minlength=3)
+
+
+def run_simulation(sim, duration, dt, writer=None, record_every=1, report_every=None):
+    """Step until `duration` seconds or until every vehicle has arrived"""
+    steps = int(np.ceil(duration / dt))
+    report_steps = max(1, int(round(report_every / dt))) if report_every else 0
+    for k in range(1, steps + 1):
+        sim.step(dt)
+        if writer is not None and k % record_every == 0:
+            writer.write(sim.occupancy())
+        pending, driving, arrived = sim.counts()
+        if report_steps and k % report_steps == 0:
+            moving = sim.state == DRIVING
+            mean_speed = sim.speed[moving].mean() if driving else 0.0
+            print(f"t={sim.time:8.1f}s  pending {pending:7d}  driving {driving:7d}  "
+                  f"arrived {arrived:7d}  mean speed {mean_speed:.3f}")
+        if pending == 0 and driving == 0:
+            break
+
+
+def main():
+    p = argparse.ArgumentParser(description="Simulate vehicles driving shortest paths over the road network.")
+    p.add_argument('--graph', type=str, default="graph.csv", help="Graph file (default: graph.csv)")
+    p.add_argument('--graph-format', choices=GRAPH_FORMATS, default='auto',
+                   help="Graph file format: dense csv or binary CSR (default: by extension)")
+    p.add_argument('--jams', type=str, default=None, help="CSV with jammed edges (src,dst per line)")
+    p.add_argument('--route', type=str, default=None,
+                   help="Optimized route file; vehicles drive its legs instead of random trips")
+    p.add_argument('--vehicles', type=int, default=1000, help="Number of vehicles (default: 1000)")
+    p.add_argument('--origins', type=int, default=256,
+                   help="Shortest-path trees to draw trips from; random trips start anywhere along them "
+                        "(default: 256)")
+    p.add_argument('--duration', type=float, default=600.0, help="Simulated seconds (default: 600)")
+    p.add_argument('--dt', type=float, default=0.5, help="Time step in seconds (default: 0.5)")
+    p.add_argument('--departure-window', type=float, default=300.0,
+                   help="Departures are spread uniformly over this many seconds (default: 300)")
+    p.add_argument('--speed', type=float, default=1.0,
+                   help="Free-flow speed in edge weight units per second (default: 1.0)")
+    p.add_argument('--min-speed', type=float, default=0.05,
+                   help="Speed floor on a full edge, as a fraction of free flow (default: 0.05)")
+    p.add_argument('--spacing', type=float, default=0.5,
+                   help="Road length per stopped vehicle, in edge weight units (default: 0.5)")
+    p.add_argument('--lanes', type=int, default=1, help="Lanes per edge (default: 1)")
+    p.add_argument('--jam-capacity', type=float, default=0.25,
+                   help="Capacity of a jammed edge as a fraction of normal (default: 0.25)")
+    p.add_argument('--max-wait', type=float, default=120.0,
+                   help="Seconds a vehicle waits for a full edge before entering anyway, 0 to never (default: 120)")
+    p.add_argument('--occupancy', type=str, default="occupancy.npy",
+                   help="Per-edge occupancy time series .npy, rows x edges (default: occupancy.npy)")
+    p.add_argument('--record-every', type=int, default=2, help="Steps between occupancy rows (default: 2)")
+    p.add_argument('--report-every', type=float, default=60.0,
+                   help="Simulated seconds between progress lines, 0 for none (default: 60)")
+    p.add_argument('--seed', type=int, default=None, help="Random seed")
     args = p.parse_args()
 
-    coords = load_coords(args.coords)
-    G = load_graph(args.graph)
-    with open(args.route) as f:
-        route = [int(line.strip()) for line in f if line.strip().isdigit()]
+    for name in ('vehicles', 'origins', 'duration', 'dt', 'speed', 'spacing', 'lanes', 'record_every'):
+        if getattr(args, name) <= 0:
+            print(f"Error: --{name.replace('_', '-')} must be positive")
+            return 1
+    if not 0 < args.min_speed <= 1 or not 0 <= args.jam_capacity <= 1:
+        print("Error: --min-speed must be in (0, 1] and --jam-capacity in [0, 1]")
+        return 1
+    if args.departure_window < 0 or args.report_every < 0 or args.max_wait < 0:
+        print("Error: --departure-window, --report-every and --max-wait must be non-negative")
+        return 1
 
-    # Optional: Load buildings/places and jammed edges
-    places = load_places(args.places) if args.places else None
-    jammed_edges = load_jams(args.jams) if args.jams else None
+    start = time.perf_counter()
+    num_nodes, src, dst, lengths = load_edges(args.graph, args.graph_format)
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    if len(src) == 0:
+        print(f"Error: {args.graph} has no edges")
+        return 1
+    jammed = None
+    if args.jams:
+        jams = load_jams(args.jams)
+        jammed = jammed_mask(num_nodes, src, dst, jams) if jams else None
+    capacity = edge_capacity(lengths, args.spacing, args.lanes, jammed, args.jam_capacity)
+    rng = np.random.default_rng(args.seed)
 
-    print("Simulating traffic on route:", route)
-    draw_map(G, coords, route, places, jammed_edges)
+    indptr, indices, weights = edges_to_csr(num_nodes, (src, dst, lengths))
+    if args.route:
+        route = load_route(args.route)
+        if len(route) < 2 or max(route) >= num_nodes:
+            print(f"Error: {args.route} is not a route over the {num_nodes}-node graph")
+            return 1
+        legs = rng.choice(len(route) - 1, min(args.origins, len(route) - 1), replace=False)
+        sources, leg_rows = np.unique(np.asarray(route)[legs], return_inverse=True)
+        pick = rng.integers(0, len(legs), args.vehicles)
+        rows, destinations = leg_rows[pick], np.asarray(route)[legs + 1][pick]
+        pred = shortest_path_trees(num_nodes, indptr, indices, weights, sources)
+    else:
+        sources = rng.choice(num_nodes, min(args.origins, num_nodes), replace=False)
+        pred = shortest_path_trees(num_nodes, indptr, indices, weights, sources)
+        rows, destinations = sample_trips(pred, rng, args.vehicles)
+    trip_ptr, trip_edges = trip_paths(num_nodes, src, dst, pred, sources, rows, destinations)
+
+    # Trips without a road path (unreachable or origin == destination) are dropped
+    routed = np.flatnonzero(np.diff(trip_ptr) > 0)
+    if len(routed) == 0:
+        print("Error: No vehicle has a road path to drive")
+        return 1
+    trip_start, trip_end = trip_ptr[:-1][routed], trip_ptr[1:][routed]
+    if not args.route:
+        # Any tail of a shortest path is a shortest path, so starting each trip
+        # at a random node of its path spreads the origins over the network
+        trip_start = trip_start + rng.integers(0, trip_end - trip_start)
+    print(f"Planned {len(routed)} trips over {len(src)} edges in {time.perf_counter() - start:.2f}s "
+          f"({args.vehicles - len(routed)} without a road path)")
+
+    departures = np.sort(rng.uniform(0, args.departure_window, len(routed)))
+    sim = TrafficSimulation(lengths, capacity, args.speed, trip_edges, trip_start, trip_end, departures,
+                            args.min_speed, args.max_wait)
+    start = time.perf_counter()
+    with OccupancyWriter(args.occupancy, len(src)) as writer:
+        run_simulation(sim, args.duration, args.dt, writer, args.record_every, args.report_every)
+    wall = time.perf_counter() - start
+
+    pending, driving, arrived = sim.counts()
+    print(f"Simulated {sim.time:.1f}s in {wall:.2f}s wall time ({sim.time / wall:.0f}x real time)")
+    print(f"Arrived: {arrived}, still driving: {driving}, not yet departed: {pending}")
+    if sim.over_capacity:
+        print(f"{sim.over_capacity} edge entries past a full edge after waiting {args.max_wait:g}s (--max-wait)")
+    if arrived:
+        done = sim.state == ARRIVED
+        travel = sim.arrival[done] - sim.departures[done]
+        print(f"Travel time: mean {travel.mean():.1f}s, median {np.median(travel):.1f}s, "
+              f"95th percentile {np.percentile(travel, 95):.1f}s")
+    print(f"Occupancy of {len(src)} edges every {args.record_every * args.dt:g}s "
+          f"({writer.rows} rows) written to {args.occupancy}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Edge-level visit counts for the Python optimizer.
+
+The C program counts every route transition in a dense n x n visit matrix.
+Here only transitions along existing graph edges get a counter: the edges are
+encoded as sorted src * n + dst keys, and a whole population of routes is
+matched against them with one searchsorted and accumulated with one bincount.
+Hops between nodes that share no edge are only counted as a total. Both
+written files count the same transitions: node_visits.txt holds each node's
+in + out transitions along edges, the row plus column sums of
+visit_matrix.txt, so generate_histogram.py derives the same counts from
+either. Unlike the C output they leave out the off-edge hops.
+"""
+import numpy as np
+
+
+class EdgeVisits:
+    """Sparse visit counter over the edges (src[i], dst[i]) of an n-node graph"""
+
+    def __init__(self, num_nodes, src, dst):
+        self.num_nodes = int(num_nodes)
+        keys = np.asarray(src, dtype=np.int64) * self.num_nodes + np.asarray(dst, dtype=np.int64)
+        self.keys = np.unique(keys)
+        self.counts = np.zeros(len(self.keys), dtype=np.int64)
+        # Transitions between nodes that share no edge
+        self.off_edge = 0
+
+    @classmethod
+    def from_adjacency(cls, adj_matrix):
+        src, dst = np.nonzero(np.asarray(adj_matrix) > 0)
+        return cls(len(adj_matrix), src, dst)
+
+    def add(self, population):
+        """Count every consecutive pair of every route in a (rows, n) population"""
+        population = np.asarray(population)
+        if population.shape[-1] < 2:
+            return
+        u = population[..., :-1].ravel().astype(np.int64)
+        v = population[..., 1:].ravel().astype(np.int64)
+        n = self.num_nodes
+        if len(self.keys) == 0:
+            self.off_edge += len(u)
+            return
+        keys = u * n + v
+        idx = np.searchsorted(self.keys, keys)
+        idx[idx == len(self.keys)] = 0
+        hit = self.keys[idx] == keys
+        self.counts += np.bincount(idx[hit], minlength=len(self.keys))
+        self.off_edge += int(len(keys) - hit.sum())
+
+    def add_matrix(self, visit_matrix):
+        """Count the transitions of a dense n x n visit matrix, e.g. from the C engine"""
+        visit_matrix = np.asarray(visit_matrix)
+        flat = visit_matrix.ravel()
+        hits = flat[self.keys]
+        self.counts += hits
+        self.off_edge += int(flat.sum(dtype=np.int64) - hits.sum(dtype=np.int64))
+
+    def spawn(self):
+        """Empty counter over the same edges, e.g. for a worker process"""
+        other = EdgeVisits.__new__(EdgeVisits)
+        other.num_nodes = self.num_nodes
+        other.keys = self.keys
+        other.counts = np.zeros_like(self.counts)
+        other.off_edge = 0
+        return other
+
+    def merge(self, other):
+        """Add the counts of another counter over the same edges"""
+        self.counts += other.counts
+        self.off_edge += other.off_edge
+
+    def edges(self):
+        """Return (src, dst, count) arrays for every tracked edge"""
+        return self.keys // self.num_nodes, self.keys % self.num_nodes, self.counts
+
+    def node_visits(self):
+        """In + out transition counts of each node along the tracked edges"""
+        src, dst, counts = self.edges()
+        n = self.num_nodes
+        return (np.bincount(src, counts, minlength=n) + np.bincount(dst, counts, minlength=n)).astype(np.int64)
+
+    def dense_rows(self, lo, hi):
+        """Dense int64 block of the visit matrix for rows lo..hi-1"""
+        n = self.num_nodes
+        start, stop = np.searchsorted(self.keys, [lo * n, hi * n])
+        block = np.zeros((hi - lo, n), dtype=np.int64)
+        keys = self.keys[start:stop]
+        block[keys // n - lo, keys % n] = self.counts[start:stop]
+        return block
+
+
+def save_visit_files(edge_visits, matrix_file="visit_matrix.txt", visits_file="node_visits.txt",
+                     chunk_rows=256):
+    """Write visit_matrix.txt and node_visits.txt in the C program's format.
+
+    The matrix is written in row blocks so it never exists densely in memory;
+    a matrix_file ending in .npy is written as an int32 .npy file like
+    `ssa_sim --visits-npy`. Pass matrix_file=None to skip it for very large graphs.
+    Both files count only the transitions along edges.
+    """
+    n = edge_visits.num_nodes
+    if matrix_file is not None and matrix_file.endswith('.npy'):
+        matrix = np.lib.format.open_memmap(matrix_file, mode='w+', dtype=np.int32, shape=(n, n))
+        for lo in range(0, n, chunk_rows):
+            hi = min(lo + chunk_rows, n)
+            matrix[lo:hi] = edge_visits.dense_rows(lo, hi)
+        matrix.flush()
+        del matrix
+    elif matrix_file is not None:
+        with open(matrix_file, 'w') as f:
+            for lo in range(0, n, chunk_rows):
+                np.savetxt(f, edge_visits.dense_rows(lo, min(lo + chunk_rows, n)), fmt='%d')
+    with open(visits_file, 'w') as f:
+        np.savetxt(f, np.column_stack([np.arange(n), edge_visits.node_visits()]), fmt='%d')
@@ -301,11 +301,46 @@ fi
 
 echo ""
 
-# Test 10: Clean up test files
-print_status "Test 10: Cleaning up test files..."
+# Test 10: Route server request pinning both endpoints with local search
+print_status "Test 10: Testing a route request with start, end and local_search..."
+if venv/bin/python - > /dev/null 2>&1 <<'EOF'
+import asyncio
+import json
+import sys
+sys.path.insert(0, 'python')
+from draw_map import coords_to_array, load_coords, load_edges
+from route_server import RouteService, dispatch
+
+async def main():
+    # The performance test's graph and coordinates come from the same run
+    n, src, dst, weights = load_edges('perf_test.csv')
+    xy = coords_to_array(load_coords('perf_test_coords.csv'), n)
+    service = RouteService(n, src, dst, weights, 'test', xy, workers=1, cache_dir=None)
+    try:
+        body = {'start': 0, 'end': n - 1, 'local_search': True, 'max_iter': 20, 'seed': 1}
+        status, reply = await dispatch(service, 'POST', '/route', json.dumps(body).encode())
+    finally:
+        service.close()
+    route = reply.get('route', [])
+    return status == 200 and route[0] == 0 and route[-1] == n - 1 and sorted(route) == list(range(n))
+
+sys.exit(0 if asyncio.run(main()) else 1)
+EOF
+then
+    print_success "Route server honours start and end with local search"
+    ((tests_passed++))
+else
+    print_error "Route request with start, end and local_search failed"
+    ((tests_failed++))
+fi
+
+echo ""
+
+# Test 11: Clean up test files
+print_status "Test 11: Cleaning up test files..."
 rm -f test_small.csv test_small_route.txt
 rm -f test_medium.csv test_medium_route.txt
-rm -f perf_test.csv perf_test_route.txt
+rm -f perf_test.csv perf_test_coords.csv perf_test_route.txt
 rm -f invalid.csv invalid_route.txt invalid2.csv invalid2_route.txt
 print_success "Test files cleaned up"
 ((tests_passed++))